@@ -0,0 +1,180 @@
+"""Configuration keys a charger supports, remembered per model.
+
+After a boot the central needs the charger's supported configuration keys.
+Those decide whether ``AuthorizeRemoteTxRequests`` can be set and where the
+QR code goes.  Discovering them takes a GetConfiguration round-trip.  All
+chargers of one vendor, model and firmware answer it the same way.
+:class:`CapabilityCache` therefore keeps the answer per
+``(vendor, model, firmware)`` for ``ttl`` seconds.  An operator can pin the
+keys of a single cpid with an override, which wins over the model entry and
+does not expire.  Overrides are read from the database on each boot, so an
+override set through one worker applies in all of them.
+
+Entries live in memory and in two SQLite tables (by default in the
+history database).  They survive restarts, and workers sharing the file
+see each other's discoveries.  :meth:`CapabilityCache.resolve`
+also coalesces concurrent discoveries for the same model.  After an outage,
+a thousand identical chargers cost one GetConfiguration, not a thousand.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Iterable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_capabilities (
+    vendor TEXT NOT NULL,
+    model TEXT NOT NULL,
+    firmware TEXT NOT NULL,
+    keys TEXT NOT NULL,
+    discovered REAL NOT NULL,
+    PRIMARY KEY (vendor, model, firmware)
+);
+CREATE TABLE IF NOT EXISTS cp_capabilities (
+    cpid TEXT PRIMARY KEY,
+    keys TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+ModelKey = tuple[str, str, str]
+
+
+class CapabilityCache:
+    """Supported configuration keys by model, with per-cpid overrides."""
+
+    def __init__(self, path: str = "history.db", ttl: float = 7 * 86400) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._models: dict[ModelKey, tuple[frozenset[str], float]] = {}
+        self._inflight: dict[ModelKey, asyncio.Future] = {}
+
+    @staticmethod
+    def model_key(vendor: str, model: str, firmware: str | None) -> ModelKey:
+        return (vendor or "", model or "", firmware or "")
+
+    def get(self, cpid: str, vendor: str, model: str, firmware: str | None = None) -> frozenset[str] | None:
+        """Cached keys for this charger, or ``None`` when discovery is needed.
+
+        An entry missing from memory is looked up in the database, because
+        another worker may have discovered it.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT keys FROM cp_capabilities WHERE cpid = ?", (cpid,)).fetchone()
+        if row is not None:
+            self.hits += 1
+            return frozenset(json.loads(row[0]))
+        key = self.model_key(vendor, model, firmware)
+        entry = self._models.get(key)
+        if entry is None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT keys, discovered FROM model_capabilities WHERE vendor = ? AND model = ? AND firmware = ?",
+                    key,
+                ).fetchone()
+            if row is not None:
+                entry = self._models[key] = (frozenset(json.loads(row[0])), row[1])
+        if entry is None or time.time() - entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, vendor: str, model: str, firmware: str | None, keys: Iterable[str]) -> frozenset[str]:
+        key = self.model_key(vendor, model, firmware)
+        keys = frozenset(keys)
+        now = time.time()
+        self._models[key] = (keys, now)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO model_capabilities (vendor, model, firmware, keys, discovered) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(sorted(keys)), now),
+            )
+        return keys
+
+    def forget(self, vendor: str, model: str, firmware: str | None = None) -> None:
+        """Drop a model entry so that its next boot rediscovers it (e.g. after a firmware fix)."""
+        key = self.model_key(vendor, model, firmware)
+        self._models.pop(key, None)
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM model_capabilities WHERE vendor = ? AND model = ? AND firmware = ?", key
+            )
+
+    def set_override(self, cpid: str, keys: Iterable[str]) -> frozenset[str]:
+        keys = frozenset(keys)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cp_capabilities (cpid, keys, updated) VALUES (?, ?, ?)",
+                (cpid, json.dumps(sorted(keys)), time.time()),
+            )
+        return keys
+
+    def clear_override(self, cpid: str) -> bool:
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM cp_capabilities WHERE cpid = ?", (cpid,))
+        return cur.rowcount > 0
+
+    def overrides(self) -> dict[str, frozenset[str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT cpid, keys FROM cp_capabilities").fetchall()
+        return {cpid: frozenset(json.loads(keys)) for cpid, keys in rows}
+
+    async def resolve(
+        self,
+        cpid: str,
+        vendor: str,
+        model: str,
+        firmware: str | None,
+        discover: Callable[[], Awaitable[Iterable[str] | None]],
+    ) -> frozenset[str] | None:
+        """Cached keys, or the result of ``discover()``, which is then cached.
+
+        ``discover`` returns ``None`` when it fails.  Failures are not
+        cached.  While one charger of a model is being asked, other chargers
+        of that model wait for its answer.  They only ask for themselves if
+        it fails.
+        """
+        keys = self.get(cpid, vendor, model, firmware)
+        if keys is not None:
+            return keys
+        key = self.model_key(vendor, model, firmware)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            keys = await asyncio.shield(inflight)
+            if keys is not None:
+                return keys
+            return await self._discover(vendor, model, firmware, discover)
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        keys = None
+        try:
+            keys = await self._discover(vendor, model, firmware, discover)
+        finally:
+            del self._inflight[key]
+            future.set_result(keys)
+        return keys
+
+    async def _discover(self, vendor, model, firmware, discover) -> frozenset[str] | None:
+        found = await discover()
+        if found is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.put, vendor, model, firmware, found)
+        except sqlite3.Error as e:
+            logging.warning(f"could not persist capabilities of {vendor}/{model}: {e}")
+            return frozenset(found)
+
+    def close(self) -> None:
+        self._db.close()
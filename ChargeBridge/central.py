@@ -1,9 +1,10 @@
+import argparse
 import asyncio
 import logging
 import json
+import os
 from datetime import datetime
-from typing import List, Any, Dict
-import itertools
+from typing import List, Any, AsyncIterator, Dict, Iterable
 import threading
 
 from websockets import serve
@@ -17,14 +18,59 @@ from ocpp.v16.enums import (
     DataTransferStatus,
 )
 
-from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi import FastAPI, HTTPException, Query, Request, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, ConfigDict, AliasChoices
 import uvicorn
 
+from capability_cache import CapabilityCache
+from history_store import HistoryStore
+from id_allocator import HiLoAllocator
+from live_cache import LiveCache
+from meter_store import MeterStore
+from provisioning import ProvisioningQueue
+from workers import Registry, RemoteError, WorkerLink, reuse_port_socket, supervise
+
 logging.basicConfig(level=logging.INFO)
 
 connected_cps: Dict[str, "CentralSystem"] = {}
-_tx_counter = itertools.count(1)
+# transaction id -> {"cpid", "connector_id", "session"} for every active transaction
+tx_index: Dict[int, Dict[str, Any]] = {}
+live = LiveCache()
+# opened by open_stores() when main() starts, so importing this module
+# creates no files, and each worker process opens them exactly once
+history: HistoryStore | None = None
+meters: MeterStore | None = None
+_tx_ids: HiLoAllocator | None = None
+capabilities: CapabilityCache | None = None
+provisioning: ProvisioningQueue | None = None
+
+# multi-worker mode (``--workers N``); all None/1 when running as one process
+RUN_DIR = os.getenv("CENTRAL_RUN_DIR", "run")
+WORKER: int | None = None
+WORKERS = 1
+registry: Registry | None = None
+link: WorkerLink | None = None
+
+
+def index_tx(cpid: str, connector_id: int, session: Dict[str, Any]) -> None:
+    tx_index[session["transaction_id"]] = {
+        "cpid": cpid,
+        "connector_id": connector_id,
+        "session": session,
+    }
+
+
+def unindex_tx(transaction_id: int) -> Dict[str, Any] | None:
+    return tx_index.pop(transaction_id, None)
+
+
+def find_tx(transaction_id: int, cpid: str | None = None) -> Dict[str, Any] | None:
+    """Index entry of an active transaction, optionally only if it belongs to ``cpid``."""
+    entry = tx_index.get(transaction_id)
+    if entry is None or (cpid is not None and entry["cpid"] != cpid):
+        return None
+    return entry
 
 
 def _parse_timestamp(ts: str) -> datetime:
@@ -34,17 +80,30 @@ def _parse_timestamp(ts: str) -> datetime:
     except Exception:
         return datetime.utcnow()
 
-def make_display_message_call(message_type: str, uri: str):
-    payload = {"message_type": message_type, "uri": uri}
+def _resolve_display_builder():
+    """Find which request this ocpp version can carry a QR code in."""
     if hasattr(call, "DisplayMessage"):
         DisplayMessageCls = getattr(call, "DisplayMessage")
         for attempt_kwargs in ("message", "payload", "content", "display"):
             try:
-                return DisplayMessageCls(**{attempt_kwargs: payload})  # type: ignore
+                DisplayMessageCls(**{attempt_kwargs: {"message_type": "QRCode", "uri": ""}})  # type: ignore
             except Exception:
                 continue
+            return lambda payload, kw=attempt_kwargs: DisplayMessageCls(**{kw: payload})  # type: ignore
+    return lambda payload: call.DataTransfer("com.yourcompany.payment", "DisplayQRCode", json.dumps(payload))
+
+
+_display_builder = None
+
+
+def make_display_message_call(message_type: str, uri: str):
+    global _display_builder
+    if _display_builder is None:
+        # resolved once; the answer only depends on the installed ocpp package
+        _display_builder = _resolve_display_builder()
+    payload = {"message_type": message_type, "uri": uri}
     try:
-        return call.DataTransfer("com.yourcompany.payment", "DisplayQRCode", json.dumps(payload))
+        return _display_builder(payload)
     except Exception as e:
         logging.error(f"Failed to build DataTransfer fallback: {e}")
         raise
@@ -58,7 +117,6 @@ class CentralSystem(ChargePoint):
         self.pending_start: Dict[int, Dict[str, Any]] = {}
         self.connector_status: Dict[int, str] = {}
         self.no_session_tasks: Dict[int, asyncio.Task] = {}
-        self.completed_sessions: List[Dict[str, Any]] = []
 
     async def remote_start(self, connector_id: int, id_tag: str):
         req = call.RemoteStartTransaction(
@@ -74,6 +132,13 @@ class CentralSystem(ChargePoint):
             logging.warning(f"RemoteStartTransaction rejected: {status}")
         return status
 
+    def drop_transactions(self):
+        """Remove this CP's transactions from ``tx_index``, e.g. when it disconnects."""
+        for info in self.active_tx.values():
+            entry = tx_index.get(info["transaction_id"])
+            if entry is not None and entry["session"] is info:
+                unindex_tx(info["transaction_id"])
+
     async def remote_stop(self, transaction_id: int):
         req = call.RemoteStopTransaction(transaction_id=transaction_id)
         logging.info(f"→ RemoteStopTransaction to {self.id} (tx={transaction_id})")
@@ -115,13 +180,48 @@ class CentralSystem(ChargePoint):
 
     @on(Action.boot_notification)
     async def on_boot_notification(self, charge_point_model, charge_point_vendor, **kwargs):
-        logging.info(f"← BootNotification from vendor={charge_point_vendor}, model={charge_point_model}")
-        response = call_result.BootNotification(
+        firmware = kwargs.get("firmware_version")
+        logging.info(
+            f"← BootNotification from vendor={charge_point_vendor}, model={charge_point_model}, firmware={firmware}"
+        )
+        # provisioning talks to the charger, so it runs after this reply is sent
+        provisioning.submit(
+            self.id,
+            lambda attempt: self._provision(charge_point_vendor, charge_point_model, firmware, attempt),
+        )
+        return call_result.BootNotification(
             current_time=datetime.utcnow().isoformat() + "Z",
             interval=300,
             status=RegistrationStatus.accepted
         )
 
+    async def _provision(self, vendor: str, model: str, firmware: str | None, attempt: int):
+        """Post-boot configuration, run by the provisioning queue; raising retries it."""
+        supported_keys = await capabilities.resolve(
+            self.id, vendor, model, firmware, self._fetch_configuration_keys
+        )
+        if supported_keys is None:
+            if attempt < provisioning.retries:
+                raise RuntimeError("configuration discovery failed")
+            logging.warning(f"{self.id}: provisioning without supported keys")
+            supported_keys = frozenset()
+
+        if "AuthorizeRemoteTxRequests" in supported_keys:
+            cfg_req = call.ChangeConfiguration(
+                key="AuthorizeRemoteTxRequests", value="true"
+            )
+            logging.info(f"→ ChangeConfiguration response: {await self.call(cfg_req)}")
+
+        qr_url = "https://your-domain.com/qr?order_id=TEST123"
+        target_key = "QRcodeConnectorID1"
+        if target_key in supported_keys:
+            change_req = call.ChangeConfiguration(key=target_key, value=qr_url)
+        else:
+            change_req = make_display_message_call(message_type="QRCode", uri=qr_url)
+        logging.info(f"→ QR code response: {await self.call(change_req)}")
+
+    async def _fetch_configuration_keys(self) -> List[str] | None:
+        """Supported configuration keys from GetConfiguration, or None if it fails."""
         supported_keys: List[str] = []
         try:
             conf_req = call.GetConfiguration()
@@ -142,35 +242,11 @@ class CentralSystem(ChargePoint):
                     supported_keys.append(key_name)
         except asyncio.TimeoutError:
             logging.warning("Timeout fetching GetConfiguration; proceeding without supported keys.")
+            return None
         except Exception as e:
             logging.warning(f"Failed to fetch supported configuration keys: {e}")
-
-        if "AuthorizeRemoteTxRequests" in supported_keys:
-            cfg_req = call.ChangeConfiguration(
-                key="AuthorizeRemoteTxRequests", value="true"
-            )
-            asyncio.create_task(self._send_change_configuration(cfg_req))
-
-        qr_url = "https://your-domain.com/qr?order_id=TEST123"
-        target_key = "QRcodeConnectorID1"
-        if target_key in supported_keys:
-            change_req = call.ChangeConfiguration(key=target_key, value=qr_url)
-            asyncio.create_task(self._send_change_configuration(change_req))
-        else:
-            try:
-                fallback = make_display_message_call(message_type="QRCode", uri=qr_url)
-                asyncio.create_task(self._send_change_configuration(fallback))
-            except Exception as e:
-                logging.error(f"Failed to send fallback display message: {e}")
-
-        return response
-
-    async def _send_change_configuration(self, request_payload):
-        try:
-            resp = await self.call(request_payload)
-            logging.info(f"→ ChangeConfiguration / Custom response: {resp}")
-        except Exception as e:
-            logging.error(f"!!! ChangeConfiguration/custom failed: {e}")
+            return None
+        return supported_keys
 
     @on(Action.authorize)
     async def on_authorize(self, id_tag, **kwargs):
@@ -201,8 +277,12 @@ class CentralSystem(ChargePoint):
         return call_result.Heartbeat(current_time=datetime.utcnow().isoformat() + "Z")
 
     @on(Action.meter_values)
-    async def on_meter_values(self, connector_id, meter_value, **kwargs):
-        logging.info(f"← MeterValues from connector {connector_id}: {meter_value}")
+    async def on_meter_values(self, connector_id, meter_value, transaction_id=None, **kwargs):
+        logging.debug(f"← MeterValues from connector {connector_id}: {meter_value}")
+        if transaction_id is None:
+            transaction_id = self.active_tx.get(int(connector_id), {}).get("transaction_id")
+        meters.ingest(self.id, int(connector_id), transaction_id, meter_value)
+        live.update(self.id, int(connector_id), transaction_id, meter_value)
         return call_result.MeterValues()
 
     @on(Action.data_transfer)
@@ -238,7 +318,7 @@ class CentralSystem(ChargePoint):
         pending = self.pending_start.pop(int(connector_id), None)
         self.pending_remote.pop(int(connector_id), None)
 
-        tx_id = next(_tx_counter)
+        tx_id = _tx_ids.next_id()
         info = {
             "transaction_id": tx_id,
             "id_tag": id_tag,
@@ -247,7 +327,13 @@ class CentralSystem(ChargePoint):
         }
         if pending and "vid" in pending:
             info["vid"] = pending["vid"]
+        stale = self.active_tx.get(int(connector_id))
+        if stale is not None:
+            # a new start on a busy connector: the old transaction is gone
+            unindex_tx(stale["transaction_id"])
         self.active_tx[int(connector_id)] = info
+        index_tx(self.id, int(connector_id), info)
+        live.start(self.id, int(connector_id), tx_id, meter_start, info["start_time"])
         task = self.no_session_tasks.pop(int(connector_id), None)
         if task:
             task.cancel()
@@ -264,13 +350,13 @@ class CentralSystem(ChargePoint):
     async def on_stop_transaction(self, transaction_id, meter_stop, timestamp, **kwargs):
         session_info = None
         c_id = None
-        for conn_id, info in list(self.active_tx.items()):
-            if info.get("transaction_id") == int(transaction_id):
-                session_info = info
-                c_id = conn_id
-                self.active_tx.pop(conn_id, None)
-                break
+        entry = find_tx(int(transaction_id), self.id)
+        if entry is not None:
+            unindex_tx(int(transaction_id))
+            session_info, c_id = entry["session"], entry["connector_id"]
+            self.active_tx.pop(c_id, None)
         logging.info(f"← StopTransaction from {self.id}: tx={transaction_id}, meterStop={meter_stop}")
+        live.stop(int(transaction_id), meter_stop)
         if session_info:
             start_time = session_info.get("start_time")
             stop_time = _parse_timestamp(timestamp)
@@ -281,6 +367,7 @@ class CentralSystem(ChargePoint):
                 "connectorId": c_id,
                 "transactionId": int(transaction_id),
                 "idTag": session_info.get("id_tag", ""),
+                "vid": session_info.get("vid"),
                 "meterStart": meter_start,
                 "meterStop": meter_stop,
                 "energy": energy,
@@ -288,7 +375,7 @@ class CentralSystem(ChargePoint):
                 "stopTime": stop_time.isoformat(),
                 "durationSecs": duration_secs,
             }
-            self.completed_sessions.append(record)
+            history.add(self.id, record)
             logging.info(f"Session summary: {record}")
         return call_result.StopTransactionPayload(
             id_tag_info={"status": AuthorizationStatus.accepted}
@@ -333,7 +420,7 @@ class StartReq(BaseModel):
 
 
 class StopReq(BaseModel):
-    cpid: str
+    cpid: str | None = None
     transactionId: int | None = None
     connectorId: int | None = None
     idTag: str | None = None
@@ -354,6 +441,10 @@ class ReleaseReq(BaseModel):
     connectorId: int
 
 
+class CapabilityOverride(BaseModel):
+    keys: List[str]
+
+
 class ActiveSession(BaseModel):
     cpid: str
     connectorId: int
@@ -368,10 +459,11 @@ class CompletedSession(BaseModel):
     connectorId: int
     idTag: str
     transactionId: int
+    vid: str | None = None
     meterStart: int
     meterStop: int
     energy: int
-    startTime: str
+    startTime: str | None
     stopTime: str
     durationSecs: float
 
@@ -382,6 +474,45 @@ class ConnectorStatus(BaseModel):
     status: str
 
 
+async def _forward(cpid: str, op: str, req: BaseModel):
+    """Run a command on the worker that holds ``cpid``'s socket."""
+    owner = await asyncio.to_thread(registry.owner, cpid) if registry else None
+    if owner is None or owner == WORKER:
+        raise HTTPException(status_code=404, detail=f"ChargePoint '{cpid}' not connected")
+    try:
+        return await link.call(owner, op, req.model_dump(by_alias=True))
+    except RemoteError as e:
+        raise HTTPException(status_code=e.status, detail=e.detail)
+
+
+async def _locate_tx(transaction_id: int) -> str | None:
+    """cpid of a transaction that another worker holds, if any."""
+    if link is None:
+        return None
+    for reply in await asyncio.gather(
+        *(link.call(w, "find_tx", {"transactionId": transaction_id}) for w in range(WORKERS) if w != WORKER),
+        return_exceptions=True,
+    ):
+        if isinstance(reply, dict):
+            return reply["cpid"]
+    return None
+
+
+async def _everywhere(op: str, key: str, rows: list) -> list:
+    """``rows`` plus the ``key`` list of every other worker's answer to ``op``."""
+    if link is None:
+        return rows
+    replies = await asyncio.gather(
+        *(link.call(w, op) for w in range(WORKERS) if w != WORKER), return_exceptions=True
+    )
+    for reply in replies:
+        if isinstance(reply, Exception):
+            logging.warning(f"{op} from another worker failed: {reply}")
+        else:
+            rows.extend(reply[key])
+    return rows
+
+
 def require_key(x_api_key: str | None):
     if API_KEY and x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="invalid api key")
@@ -391,7 +522,7 @@ def require_key(x_api_key: str | None):
 async def api_start(req: StartReq):
     cp = connected_cps.get(req.cpid)
     if not cp:
-        raise HTTPException(status_code=404, detail=f"ChargePoint '{req.cpid}' not connected")
+        return await _forward(req.cpid, "start", req)
     try:
         id_tag = req.id_tag or DEFAULT_ID_TAG
         cp.pending_start[int(req.connectorId)] = {"id_tag": id_tag}
@@ -408,16 +539,22 @@ async def api_start(req: StartReq):
 
 @app.post("/api/v1/stop")
 async def api_stop(req: StopReq):
+    """Stop by ``transactionId`` (``cpid`` optional) or by ``cpid`` + ``connectorId``."""
+    if req.cpid is None:
+        if req.transactionId is None:
+            raise HTTPException(status_code=422, detail="cpid or transactionId required")
+        entry = find_tx(req.transactionId)
+        cpid = entry["cpid"] if entry else await _locate_tx(req.transactionId)
+        if cpid is None:
+            raise HTTPException(status_code=404, detail="No matching active transaction")
+        req = req.model_copy(update={"cpid": cpid})
     cp = connected_cps.get(req.cpid)
     if not cp:
-        raise HTTPException(status_code=404, detail=f"ChargePoint '{req.cpid}' not connected")
+        return await _forward(req.cpid, "stop", req)
     try:
         tx_id = req.transactionId
         if tx_id is not None:
-            if not any(
-                session.get("transaction_id") == tx_id
-                for session in cp.active_tx.values()
-            ):
+            if find_tx(tx_id, req.cpid) is None:
                 raise HTTPException(status_code=404, detail="No matching active transaction")
         elif req.connectorId is not None:
             session = cp.active_tx.get(req.connectorId)
@@ -428,7 +565,7 @@ async def api_stop(req: StopReq):
         status = await cp.remote_stop(tx_id)
         if status != RemoteStartStopStatus.accepted:
             raise HTTPException(status_code=409, detail=f"RemoteStop rejected: {status}")
-        return {"ok": True, "transactionId": tx_id, "message": "RemoteStopTransaction sent"}
+        return {"ok": True, "cpid": req.cpid, "transactionId": tx_id, "message": "RemoteStopTransaction sent"}
     except HTTPException:
         raise
     except Exception as e:
@@ -439,7 +576,7 @@ async def api_stop(req: StopReq):
 async def api_stop_by_connector(req: StopByConnectorReq):
     cp = connected_cps.get(req.cpid)
     if not cp:
-        raise HTTPException(status_code=404, detail=f"ChargePoint '{req.cpid}' not connected")
+        return await _forward(req.cpid, "charge_stop", req)
     session = cp.active_tx.get(req.connectorId)
     if session is None:
         raise HTTPException(status_code=404, detail="No active transaction for this connector")
@@ -459,7 +596,7 @@ async def api_stop_by_connector(req: StopByConnectorReq):
 async def api_release(req: ReleaseReq):
     cp = connected_cps.get(req.cpid)
     if not cp:
-        raise HTTPException(status_code=404, detail=f"ChargePoint '{req.cpid}' not connected")
+        return await _forward(req.cpid, "release", req)
     if req.connectorId in cp.active_tx:
         raise HTTPException(status_code=400, detail="Connector has active transaction")
     task = cp.no_session_tasks.pop(req.connectorId, None)
@@ -476,47 +613,325 @@ async def api_release(req: ReleaseReq):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/v1/active")
-async def api_active_sessions():
+@app.get("/api/v1/capabilities")
+async def api_capabilities():
+    """Per-cpid overrides of the supported configuration keys, and cache hit counts."""
+    overrides = await asyncio.to_thread(capabilities.overrides)
+    return {
+        "overrides": {cpid: sorted(keys) for cpid, keys in overrides.items()},
+        "hits": capabilities.hits,
+        "misses": capabilities.misses,
+    }
+
+
+@app.get("/api/v1/provisioning")
+async def api_provisioning():
+    """Post-boot provisioning queue depth, outcomes and time-to-provisioned (seconds)."""
+    return provisioning.stats()
+
+
+@app.put("/api/v1/capabilities/{cpid}")
+async def api_set_capabilities(cpid: str, req: CapabilityOverride):
+    """Pin the supported keys of one charger; its next boot skips discovery."""
+    keys = await asyncio.to_thread(capabilities.set_override, cpid, req.keys)
+    return {"cpid": cpid, "keys": sorted(keys)}
+
+
+@app.delete("/api/v1/capabilities/{cpid}")
+async def api_clear_capabilities(cpid: str):
+    if not await asyncio.to_thread(capabilities.clear_override, cpid):
+        raise HTTPException(status_code=404, detail=f"No override for '{cpid}'")
+    return {"ok": True}
+
+
+def _local_active() -> list[dict]:
     sessions: list[ActiveSession] = []
-    for cpid, cp in connected_cps.items():
-        for conn_id, info in cp.active_tx.items():
-            sessions.append(
-                ActiveSession(
-                    cpid=cpid,
-                    connectorId=conn_id,
-                    idTag=info.get("id_tag", ""),
-                    transactionId=info.get("transaction_id", 0),
-                )
+    for tx_id, entry in list(tx_index.items()):
+        sessions.append(
+            ActiveSession(
+                cpid=entry["cpid"],
+                connectorId=entry["connector_id"],
+                idTag=entry["session"].get("id_tag", ""),
+                transactionId=tx_id,
             )
-    return {"sessions": [s.dict() for s in sessions]}
+        )
+    return [s.dict() for s in sessions]
+
+
+@app.get("/api/v1/active")
+async def api_active_sessions():
+    return {"sessions": await _everywhere("active", "sessions", _local_active())}
 
 
 @app.get("/api/v1/history")
-async def api_session_history():
-    sessions: list[CompletedSession] = []
-    for cpid, cp in connected_cps.items():
-        for record in cp.completed_sessions:
-            sessions.append(CompletedSession(cpid=cpid, **record))
-    return {"sessions": [s.dict() for s in sessions]}
+async def api_session_history(
+    cpid: str | None = None,
+    idTag: str | None = None,
+    vid: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    startedAfter: str | None = None,
+    startedBefore: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """Completed sessions, newest first; pass ``nextCursor`` back as ``cursor`` for the next page."""
+    try:
+        records, next_cursor = await history.query(
+            cpid=cpid,
+            id_tag=idTag,
+            vid=vid,
+            since=since,
+            until=until,
+            started_after=startedAfter,
+            started_before=startedBefore,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    sessions = [CompletedSession(**record) for record in records]
+    return {"sessions": [s.dict() for s in sessions], "nextCursor": next_cursor}
 
 
-@app.get("/api/v1/status")
-async def api_connector_status():
+def _local_status() -> list[dict]:
     statuses: list[ConnectorStatus] = []
     for cpid, cp in connected_cps.items():
         for conn_id, status in cp.connector_status.items():
             statuses.append(ConnectorStatus(cpid=cpid, connectorId=conn_id, status=status))
-    return {"connectors": [s.dict() for s in statuses]}
+    return [s.dict() for s in statuses]
+
+
+@app.get("/api/v1/status")
+async def api_connector_status():
+    return {"connectors": await _everywhere("status", "connectors", _local_status())}
+
+
+@app.get("/api/v1/live")
+async def api_live(
+    cpid: str | None = None,
+    connectorId: int | None = None,
+    transactionId: int | None = None,
+    charging: bool | None = None,
+):
+    """Latest power, energy and session aggregates per connector, from memory."""
+    return {
+        "connectors": [
+            {
+                "cpid": e.cpid,
+                "connectorId": e.connector_id,
+                "transactionId": e.transaction_id,
+                "powerKw": None if e.power_w is None else round(e.power_w / 1000, 3),
+                "energyWh": e.energy_wh,
+                "sessionKwh": round(e.energy_delivered_wh / 1000, 3),
+                "avgPowerKw": None if e.avg_power_w is None else round(e.avg_power_w / 1000, 3),
+                "peakPowerKw": None if e.peak_power_w is None else round(e.peak_power_w / 1000, 3),
+                "soc": e.soc,
+                "lastSeen": e.last_seen and datetime.utcfromtimestamp(e.last_seen).isoformat() + "Z",
+            }
+            for e in live.select(cpid, connectorId, transactionId, charging)
+        ]
+    }
+
+
+# ----- streaming variants -----
+# Rows are written as NDJSON straight from the in-memory state (and from the
+# history store page by page), without building models or a full list, so
+# large fleets can be polled often.  Only the cpid list is copied up front;
+# a charger that disconnects mid-stream is skipped.
+
+NDJSON_CHUNK = 500
+
+
+def _dumps(row: Dict[str, Any]) -> str:
+    return json.dumps(row, separators=(",", ":"), default=str) + "\n"
+
+
+async def _ndjson(rows: Iterable[Dict[str, Any]] | AsyncIterator[Dict[str, Any]]):
+    """Encode rows as NDJSON, ``NDJSON_CHUNK`` lines per chunk, yielding to the loop between chunks."""
+    lines: list[str] = []
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            lines.append(_dumps(row))
+            if len(lines) >= NDJSON_CHUNK:
+                yield "".join(lines)
+                lines.clear()
+    else:
+        for row in rows:
+            lines.append(_dumps(row))
+            if len(lines) >= NDJSON_CHUNK:
+                yield "".join(lines)
+                lines.clear()
+                await asyncio.sleep(0)
+    if lines:
+        yield "".join(lines)
+
+
+def _ndjson_response(rows) -> StreamingResponse:
+    return StreamingResponse(_ndjson(rows), media_type="application/x-ndjson")
+
+
+def _charge_points(cpid: str | None):
+    if cpid is not None:
+        cp = connected_cps.get(cpid)
+        return [(cpid, cp)] if cp else []
+    return list(connected_cps.items())
+
+
+def _iter_active(cpid: str | None, connector_id: int | None, status: str | None):
+    if cpid is None and connector_id is None:
+        # every active transaction: walk the index, not every charge point
+        items = [(e["cpid"], e["connector_id"], e["session"]) for e in list(tx_index.values())]
+    else:
+        items = []
+        for cp_id, cp in _charge_points(cpid):
+            if connector_id is None:
+                items.extend((cp_id, conn_id, info) for conn_id, info in cp.active_tx.items())
+            elif connector_id in cp.active_tx:
+                items.append((cp_id, connector_id, cp.active_tx[connector_id]))
+    for cp_id, conn_id, info in items:
+        if status is not None:
+            cp = connected_cps.get(cp_id)
+            if cp is None or cp.connector_status.get(conn_id) != status:
+                continue
+        yield {
+            "cpid": cp_id,
+            "connectorId": conn_id,
+            "idTag": info.get("id_tag", ""),
+            "transactionId": info.get("transaction_id", 0),
+        }
+
+
+def _iter_status(cpid: str | None, connector_id: int | None, status: str | None):
+    for cp_id, cp in _charge_points(cpid):
+        if connector_id is not None:
+            items = [(connector_id, cp.connector_status[connector_id])] if connector_id in cp.connector_status else []
+        else:
+            items = list(cp.connector_status.items())
+        for conn_id, conn_status in items:
+            if status is None or conn_status == status:
+                yield {"cpid": cp_id, "connectorId": conn_id, "status": conn_status}
+
+
+@app.get("/api/v1/active/stream")
+async def api_active_stream(cpid: str | None = None, connectorId: int | None = None, status: str | None = None):
+    """Active sessions as NDJSON; ``status`` filters on the connector's current status."""
+    return _ndjson_response(_iter_active(cpid, connectorId, status))
+
+
+@app.get("/api/v1/status/stream")
+async def api_status_stream(cpid: str | None = None, connectorId: int | None = None, status: str | None = None):
+    """Connector statuses as NDJSON."""
+    return _ndjson_response(_iter_status(cpid, connectorId, status))
+
+
+@app.get("/api/v1/history/stream")
+async def api_history_stream(
+    cpid: str | None = None,
+    connectorId: int | None = None,
+    idTag: str | None = None,
+    vid: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    max_rows: int | None = Query(default=None, alias="limit", ge=1),
+):
+    """Completed sessions as NDJSON, newest first, read from the store one page at a time."""
+    filters = dict(cpid=cpid, connector_id=connectorId, id_tag=idTag, vid=vid, since=since, until=until)
+    try:
+        first, cursor = await history.query(**filters, limit=1000)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def rows():
+        nonlocal cursor
+        page, sent = first, 0
+        while True:
+            for record in page:
+                if max_rows is not None and sent >= max_rows:
+                    return
+                yield record
+                sent += 1
+            if cursor is None:
+                return
+            page, cursor = await history.query(**filters, cursor=cursor, limit=1000)
+
+    return _ndjson_response(rows())
+
+
+def _rpc(endpoint, model):
+    """Serve a forwarded command with the endpoint that handles it locally."""
+    async def handle(body: dict):
+        try:
+            return 200, await endpoint(model.model_validate(body))
+        except HTTPException as e:
+            return e.status_code, {"detail": e.detail}
+    return handle
+
+
+async def _rpc_find_tx(body: dict):
+    entry = find_tx(int(body["transactionId"]))
+    if entry is None:
+        return 404, {"detail": "No matching active transaction"}
+    return 200, {"cpid": entry["cpid"]}
 
 
-async def run_http_api():
+async def _rpc_active(body: dict):
+    return 200, {"sessions": _local_active()}
+
+
+async def _rpc_status(body: dict):
+    return 200, {"connectors": _local_status()}
+
+
+RPC_HANDLERS = {
+    "start": _rpc(api_start, StartReq),
+    "stop": _rpc(api_stop, StopReq),
+    "charge_stop": _rpc(api_stop_by_connector, StopByConnectorReq),
+    "release": _rpc(api_release, ReleaseReq),
+    "active": _rpc_active,
+    "find_tx": _rpc_find_tx,
+    "status": _rpc_status,
+}
+
+
+async def run_http_api(sock=None):
     config = uvicorn.Config(app, host="0.0.0.0", port=8080, loop="asyncio", log_level="info")
     server = uvicorn.Server(config)
-    await server.serve()
-
+    await server.serve(sockets=[sock] if sock else None)
+
+
+def open_stores(worker: int | None = None) -> None:
+    global history, meters, _tx_ids, capabilities, provisioning
+    db_path = os.getenv("HISTORY_DB", "history.db")
+    meter_path = os.getenv("METER_STORE", "meters")
+    if worker is not None:
+        # segment files are append-only per process, so each worker gets its own directory
+        meter_path = os.path.join(meter_path, f"worker-{worker}")
+    history = HistoryStore(db_path)
+    meters = MeterStore(meter_path)
+    _tx_ids = HiLoAllocator(db_path)
+    capabilities = CapabilityCache(db_path, ttl=float(os.getenv("CAPABILITY_TTL", 7 * 86400)))
+    provisioning = ProvisioningQueue(concurrency=int(os.getenv("PROVISION_CONCURRENCY", "50")))
+
+
+async def close_stores() -> None:
+    await provisioning.close()
+    await history.close()
+    await meters.close()
+    _tx_ids.close()
+    capabilities.close()
+
+
+async def main(worker: int | None = None, workers: int = 1):
+    global WORKER, WORKERS, registry, link
+    open_stores(worker)
+    if worker is not None:
+        WORKER, WORKERS = worker, workers
+        registry = Registry(os.path.join(RUN_DIR, "registry.db"))
+        await asyncio.to_thread(registry.clear, worker)
+        link = WorkerLink(RUN_DIR, worker, RPC_HANDLERS)
+        await link.start()
 
-async def main():
     async def handler(websocket, path=None):
         if path is None:
             try:
@@ -528,10 +943,19 @@ async def main():
 
         central = CentralSystem(cp_id, websocket)
         connected_cps[cp_id] = central
+        if registry:
+            await asyncio.to_thread(registry.claim, cp_id, WORKER)
         try:
             await central.start()
         finally:
-            connected_cps.pop(cp_id, None)
+            central.drop_transactions()
+            # a reconnect may already have replaced this connection
+            if connected_cps.get(cp_id) is central:
+                connected_cps.pop(cp_id)
+                live.drop(cp_id)
+                provisioning.discard(cp_id)
+                if registry:
+                    await asyncio.to_thread(registry.release, cp_id, WORKER)
             logging.info(f"[Central] Disconnected: {cp_id}")
 
     def console_thread(loop: asyncio.AbstractEventLoop):
@@ -580,32 +1004,59 @@ async def main():
                     txid = session.get("transaction_id", num)
                     asyncio.run_coroutine_threadsafe(cp.remote_stop(txid), loop)
                     continue
-                tx_match = None
-                for info in cp.active_tx.values():
-                    if info.get("transaction_id") == num:
-                        tx_match = num
-                        break
-                if tx_match is not None:
-                    asyncio.run_coroutine_threadsafe(cp.remote_stop(tx_match), loop)
+                if find_tx(num, cpid) is not None:
+                    asyncio.run_coroutine_threadsafe(cp.remote_stop(num), loop)
                 else:
                     asyncio.run_coroutine_threadsafe(cp.unlock_connector(num), loop)
                 continue
-            print("Unknown command. Examples: start CP_123 1 TESTTAG | stop CP_123 42 | ls | map CP_123")
+            if parts[0] == "stop" and len(parts) == 2:
+                entry = find_tx(int(parts[1]))
+                cp = connected_cps.get(entry["cpid"]) if entry else None
+                if not cp:
+                    print("No such transaction")
+                    continue
+                asyncio.run_coroutine_threadsafe(cp.remote_stop(int(parts[1])), loop)
+                continue
+            print("Unknown command. Examples: start CP_123 1 TESTTAG | stop CP_123 42 | stop 42 | ls | map CP_123")
 
     loop = asyncio.get_running_loop()
-    threading.Thread(target=console_thread, args=(loop,), daemon=True).start()
+    if worker is None:
+        threading.Thread(target=console_thread, args=(loop,), daemon=True).start()
 
-    api_task = asyncio.create_task(run_http_api())
+    api_task = asyncio.create_task(run_http_api(reuse_port_socket("0.0.0.0", 8080) if link else None))
 
     async with serve(
         handler,
         host='0.0.0.0',
         port=9000,
-        subprotocols=['ocpp1.6']
+        subprotocols=['ocpp1.6'],
+        reuse_port=link is not None,
     ):
-        logging.info("⚡ Central listening on ws://0.0.0.0:9000/ocpp/<ChargePointID> | HTTP :8080")
-        await asyncio.Future()
+        label = "" if worker is None else f" (worker {worker}/{workers})"
+        logging.info(f"⚡ Central listening on ws://0.0.0.0:9000/ocpp/<ChargePointID> | HTTP :8080{label}")
+        try:
+            await asyncio.Future()
+        finally:
+            await close_stores()
+            if link:
+                await link.close()
+                registry.close()
+
+
+def run_worker(worker: int, workers: int):
+    asyncio.run(main(worker, workers))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="OCPP 1.6 central system")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("CENTRAL_WORKERS", "1")),
+        help="processes sharing ports 9000 and 8080 (default 1, with the console)",
+    )
+    args = parser.parse_args()
+    if args.workers > 1:
+        os.makedirs(RUN_DIR, exist_ok=True)
+        Registry(os.path.join(RUN_DIR, "registry.db")).clear()
+        supervise(args.workers, run_worker)
+    else:
+        asyncio.run(main())
@@ -3,12 +3,34 @@
 central.py coordinates the high-level flow while delegating OCPP
 communication and meter handling to dedicated modules.  This layout keeps
 responsibilities separated and makes the system easier to extend for other
-charging networks.  The demo focuses on Gresgying 120–180 kW DC chargers
+charging networks.  The demo focuses on Gresgying 120–180 kW DC chargers
 but the code paths remain compatible with other vendors and OCPP versions.
+
+:func:`run_sessions` is the concurrent variant: it takes session specs from
+a list or an async stream, runs up to ``concurrency`` of them at once over
+shared per-charger connections, sends MeterValues while each one charges
+and reports per-session timing and CSMS response latency per action::
+
+    python charging_controller.py --uri ws://localhost:9000/ocpp \\
+        --specs sessions.jsonl --concurrency 50
+
+A spec file holds one JSON object per line, e.g.
+``{"charger": "CP_1", "connector": 2, "idTag": "TAG1", "power_kw": [50, 120, 120, 60]}``.
 """
+from __future__ import annotations
 
+import argparse
 import asyncio
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterable, Iterable
+
 from charging_session import ChargingSession
+from connection_manager import ConnectionManager
 from ocpp_client import OCPPClient
 
 
@@ -31,5 +53,253 @@ async def run_demo() -> None:
     print("StopTransaction response:", stop_response)
 
 
+@dataclass
+class SessionSpec:
+    """One session to run: where, who, and how much power per meter interval.
+
+    ``power_kw`` is either a constant (held for ``duration_sec``) or a
+    profile with one value per ``interval_sec`` step.
+    """
+
+    charger: str
+    connector: int = 1
+    id_tag: str = "GUEST"
+    power_kw: float | list[float] = 7.0
+    duration_sec: float = 10.0
+    interval_sec: float = 1.0
+    meter_start: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SessionSpec":
+        data = dict(data)
+        if "idTag" in data:
+            data["id_tag"] = data.pop("idTag")
+        return cls(**data)
+
+    def profile(self) -> list[float]:
+        if isinstance(self.power_kw, list):
+            return self.power_kw
+        steps = max(1, round(self.duration_sec / self.interval_sec))
+        return [self.power_kw] * steps
+
+
+@dataclass
+class SessionResult:
+    spec: SessionSpec
+    transaction_id: int | None = None
+    energy_wh: int = 0
+    started: float = 0.0
+    elapsed_sec: float = 0.0
+    error: str | None = None
+    # CSMS response time per action, in ms
+    latency_ms: dict[str, list[float]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "charger": self.spec.charger,
+            "connector": self.spec.connector,
+            "transactionId": self.transaction_id,
+            "energy_wh": self.energy_wh,
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "error": self.error,
+            "latency_ms": {
+                action: round(statistics.fmean(values), 2)
+                for action, values in self.latency_ms.items()
+            },
+        }
+
+
+async def _timed(result: SessionResult, action: str, call):
+    t0 = time.perf_counter()
+    response = await call
+    result.latency_ms.setdefault(action, []).append((time.perf_counter() - t0) * 1000)
+    return response
+
+
+def _meter_value(meter_wh: int, power_w: float) -> list[dict]:
+    return [{
+        "timestamp": datetime.utcnow().isoformat(),
+        "sampledValue": [
+            {"value": str(meter_wh), "measurand": "Energy.Active.Import.Register", "unit": "Wh"},
+            {"value": str(round(power_w)), "measurand": "Power.Active.Import", "unit": "W"},
+        ],
+    }]
+
+
+async def run_session(manager: ConnectionManager, spec: SessionSpec) -> SessionResult:
+    """Start, meter and stop one session; failures end up in ``error``."""
+    result = SessionResult(spec, started=time.time())
+    session = ChargingSession(
+        connector_id=spec.connector,
+        id_tag=spec.id_tag,
+        manager=manager,
+        charge_point_id=spec.charger,
+    )
+    t0 = time.perf_counter()
+    metering = False
+    try:
+        await _timed(result, "StartTransaction", session.start(meter_start=spec.meter_start))
+        result.transaction_id = session.transaction_id
+        metering = True
+        meter = float(spec.meter_start)
+        for power_kw in spec.profile():
+            await asyncio.sleep(spec.interval_sec)
+            meter += power_kw * 1000 * spec.interval_sec / 3600
+            await _timed(
+                result,
+                "MeterValues",
+                session.ocpp.meter_values(
+                    spec.connector, session.transaction_id, _meter_value(int(meter), power_kw * 1000)
+                ),
+            )
+        result.energy_wh = int(meter) - spec.meter_start
+        metering = False
+        await _timed(result, "StopTransaction", session.stop(meter_stop=int(meter)))
+    except Exception as e:
+        result.error = repr(e)
+        if metering:
+            # start() and stop() release on their own; a failed MeterValues
+            # must not leave the shared connection referenced forever
+            await manager.release(spec.charger)
+    result.elapsed_sec = time.perf_counter() - t0
+    return result
+
+
+async def _iterate(specs: Iterable[SessionSpec] | AsyncIterable[SessionSpec]):
+    if hasattr(specs, "__aiter__"):
+        async for spec in specs:
+            yield spec
+    else:
+        for spec in specs:
+            yield spec
+
+
+async def run_sessions(
+    specs: Iterable[SessionSpec] | AsyncIterable[SessionSpec],
+    manager: ConnectionManager,
+    concurrency: int = 50,
+    on_result=None,
+) -> list[SessionResult]:
+    """Run ``specs`` with at most ``concurrency`` sessions in flight.
+
+    Specs are pulled from the source only when a slot is free, so an
+    unbounded stream works too.  ``on_result`` is called with each
+    :class:`SessionResult` as it completes; results are also returned in
+    completion order.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    results: list[SessionResult] = []
+    tasks: set[asyncio.Task] = set()
+
+    async def worker(spec: SessionSpec) -> None:
+        try:
+            result = await run_session(manager, spec)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        finally:
+            slots.release()
+
+    try:
+        async for spec in _iterate(specs):
+            await slots.acquire()
+            task = asyncio.create_task(worker(spec))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return results
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(results: list[SessionResult]) -> dict:
+    """Session counts, wall time and latency percentiles per OCPP action."""
+    latency: dict[str, list[float]] = {}
+    for result in results:
+        for action, values in result.latency_ms.items():
+            latency.setdefault(action, []).extend(values)
+    wall = 0.0
+    if results:
+        wall = max(r.started + r.elapsed_sec for r in results) - min(r.started for r in results)
+    return {
+        "sessions": len(results),
+        "failed": sum(1 for r in results if r.error),
+        "energy_wh": sum(r.energy_wh for r in results),
+        "wall_sec": round(wall, 3),
+        "latency_ms": {
+            action: {
+                "count": len(values),
+                "p50": round(_percentile(values, 50), 2),
+                "p95": round(_percentile(values, 95), 2),
+                "max": round(max(values), 2),
+            }
+            for action, values in latency.items()
+        },
+    }
+
+
+def load_specs(path: str) -> Iterable[SessionSpec]:
+    """Read JSONL session specs from ``path`` (``-`` for stdin)."""
+    fh = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with fh:
+        for line in fh:
+            if line.strip():
+                yield SessionSpec.from_dict(json.loads(line))
+
+
+async def _main(args) -> None:
+    if args.specs:
+        specs = load_specs(args.specs)
+    else:
+        specs = (
+            SessionSpec(
+                charger=f"CP_{i % args.chargers + 1}",
+                connector=i // args.chargers % args.connectors + 1,
+                id_tag=f"TAG{i}",
+                power_kw=args.power_kw,
+                duration_sec=args.duration,
+                interval_sec=args.interval,
+            )
+            for i in range(args.sessions)
+        )
+    manager = ConnectionManager(args.uri, call_timeout=args.timeout)
+
+    def report(result: SessionResult) -> None:
+        print(json.dumps(result.to_dict()), flush=True)
+
+    try:
+        results = await run_sessions(specs, manager, args.concurrency, on_result=report)
+    finally:
+        await manager.close_all()
+    print(json.dumps(summarize(results)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run ChargeBridge charging sessions concurrently")
+    parser.add_argument("--uri", default="ws://localhost:9000/ocpp", help="CSMS URL without the charger id")
+    parser.add_argument("--specs", help="JSONL file of session specs, - for stdin")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0, help="CSMS call timeout")
+    # generated specs when no --specs file is given
+    parser.add_argument("--sessions", type=int, help="number of generated sessions")
+    parser.add_argument("--chargers", type=int, default=5)
+    parser.add_argument("--connectors", type=int, default=2)
+    parser.add_argument("--power-kw", type=float, default=120.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+    if args.specs is None and args.sessions is None:
+        asyncio.run(run_demo())
+    else:
+        asyncio.run(_main(args))
+
+
 if __name__ == "__main__":
-    asyncio.run(run_demo())
\ No newline at end of file
+    main()
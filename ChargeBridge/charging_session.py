@@ -1,37 +1,84 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import AsyncIterable
 
+from connection_manager import ConnectionManager
+from meter_stream import MeterStream, Reading
 from ocpp_client import OCPPClient
 
 
 @dataclass
 class ChargingSession:
-    """Track a charging session and communicate via OCPP."""
+    """Track a charging session and communicate via OCPP.
 
-    ocpp: OCPPClient
+    With a ``manager`` the session borrows the shared connection of
+    ``charge_point_id`` instead of opening its own socket.  Readings from
+    :meth:`stream_meter` are sent as MeterValues until the session stops.
+    """
+
+    ocpp: OCPPClient | None = None
     connector_id: int = 1
     id_tag: str = "GUEST"
     transaction_id: int | None = None
     meter_start: int | None = None
+    manager: ConnectionManager | None = None
+    charge_point_id: str | None = None
+    meter_stream: MeterStream | None = field(default=None, repr=False)
 
     async def start(self, meter_start: int) -> dict:
         """Begin a charging session and record the starting meter value."""
         self.meter_start = meter_start
-        await self.ocpp.connect()
-        response = await self.ocpp.start_transaction(
-            self.connector_id, self.id_tag, self.meter_start
-        )
+        if self.manager is not None:
+            self.charge_point_id = self.charge_point_id or self.ocpp.charge_point_id
+            self.ocpp = await self.manager.acquire(self.charge_point_id)
+        else:
+            await self.ocpp.connect()
+        try:
+            response = await self.ocpp.start_transaction(
+                self.connector_id, self.id_tag, self.meter_start
+            )
+        except BaseException:
+            if self.manager is not None:
+                await self.manager.release(self.charge_point_id)
+            raise
         self.transaction_id = response.get("transactionId")
         return response
 
-    async def stop(self, meter_stop: int) -> dict:
-        """Stop an active charging session and send the final meter value."""
+    def stream_meter(self, readings: AsyncIterable[Reading], **options) -> MeterStream:
+        """Forward ``readings`` as MeterValues; ``options`` go to :class:`MeterStream`."""
+        if self.transaction_id is None:
+            raise RuntimeError("Session not started")
+        if self.meter_stream is not None:
+            raise RuntimeError("Session already has a meter stream")
+        self.meter_stream = MeterStream(self._send_meter_values, readings, **options).start()
+        return self.meter_stream
+
+    async def _send_meter_values(self, meter_value: list[dict]) -> dict:
+        return await self.ocpp.meter_values(self.connector_id, self.transaction_id, meter_value)
+
+    async def stop(self, meter_stop: int | None = None) -> dict:
+        """Stop an active charging session and send the final meter value.
+
+        A running meter stream is flushed first; without ``meter_stop`` its
+        last reading is used.
+        """
         if self.transaction_id is None:
             raise RuntimeError("Session not started")
-        response = await self.ocpp.stop_transaction(
-            self.transaction_id, self.id_tag, meter_stop
-        )
-        await self.ocpp.close()
+        if self.meter_stream is not None:
+            await self.meter_stream.close()
+            if meter_stop is None and self.meter_stream.last is not None:
+                meter_stop = int(self.meter_stream.last.energy_wh)
+        if meter_stop is None:
+            raise ValueError("meter_stop is required without meter readings")
+        try:
+            response = await self.ocpp.stop_transaction(
+                self.transaction_id, self.id_tag, meter_stop
+            )
+        finally:
+            if self.manager is not None:
+                await self.manager.release(self.charge_point_id)
+            else:
+                await self.ocpp.close()
         return response
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Shared OCPP connections for ChargeBridge sessions.
+
+Real chargers keep exactly one WebSocket to the CSMS and run every
+connector's sessions over it.  :class:`ConnectionManager` does the same for
+ChargeBridge: sessions acquire the ``OCPPClient`` of their
+``charge_point_id`` and release it when done.  The first acquire opens the
+socket, the last release closes it, and in between a supervisor task sends
+Heartbeats as keepalive and reconnects with exponential backoff when the
+link drops.  Every connect and close of a charge point's socket happens
+under its entry lock, so ``acquire`` and the supervisor never race on it.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from ocpp_client import OCPPClient
+
+
+@dataclass
+class _Entry:
+    client: OCPPClient
+    refs: int = 0
+    supervisor: asyncio.Task | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    reconnects: int = 0
+
+
+class ConnectionManager:
+    """One reference-counted, self-healing ``OCPPClient`` per charge point."""
+
+    def __init__(
+        self,
+        base_uri: str,
+        ocpp_protocol: str = "ocpp1.6",
+        charger_model: str = "Gresgying 120-180 kW DC",
+        keepalive_sec: float = 60.0,
+        reconnect_min_sec: float = 1.0,
+        reconnect_max_sec: float = 30.0,
+        call_timeout: float = 30.0,
+    ) -> None:
+        self.base_uri = base_uri.rstrip("/")
+        self.ocpp_protocol = ocpp_protocol
+        self.charger_model = charger_model
+        self.keepalive_sec = keepalive_sec
+        self.reconnect_min_sec = reconnect_min_sec
+        self.reconnect_max_sec = reconnect_max_sec
+        self.call_timeout = call_timeout
+        self._entries: dict[str, _Entry] = {}
+
+    def client(self, charge_point_id: str) -> OCPPClient:
+        """The charge point's client, e.g. to register CSMS CALL handlers."""
+        entry = self._entries.get(charge_point_id)
+        if entry is None:
+            entry = self._entries[charge_point_id] = _Entry(
+                OCPPClient(
+                    f"{self.base_uri}/{charge_point_id}",
+                    charge_point_id,
+                    ocpp_protocol=self.ocpp_protocol,
+                    charger_model=self.charger_model,
+                    call_timeout=self.call_timeout,
+                )
+            )
+        return entry.client
+
+    async def acquire(self, charge_point_id: str) -> OCPPClient:
+        """Return the connected client for ``charge_point_id``, connecting if needed."""
+        client = self.client(charge_point_id)
+        entry = self._entries[charge_point_id]
+        async with entry.lock:
+            if entry.refs == 0 or not client.connected:
+                if not client.connected:
+                    await client.connect()
+                if entry.supervisor is None:
+                    entry.supervisor = asyncio.create_task(self._supervise(entry))
+            entry.refs += 1
+        return client
+
+    async def release(self, charge_point_id: str) -> None:
+        entry = self._entries.get(charge_point_id)
+        if entry is None or entry.refs == 0:
+            return
+        async with entry.lock:
+            entry.refs -= 1
+            if entry.refs:
+                return
+            supervisor, entry.supervisor = entry.supervisor, None
+            if supervisor is not None:
+                # wait for it to stop; it only touches the socket under the lock we hold
+                supervisor.cancel()
+                await asyncio.gather(supervisor, return_exceptions=True)
+            await entry.client.close()
+
+    @asynccontextmanager
+    async def connection(self, charge_point_id: str):
+        client = await self.acquire(charge_point_id)
+        try:
+            yield client
+        finally:
+            await self.release(charge_point_id)
+
+    async def close_all(self) -> None:
+        for entry in self._entries.values():
+            entry.refs = 1
+        for charge_point_id in list(self._entries):
+            await self.release(charge_point_id)
+
+    def stats(self) -> dict:
+        return {
+            cpid: {"refs": e.refs, "connected": e.client.connected, "reconnects": e.reconnects}
+            for cpid, e in self._entries.items()
+        }
+
+    async def _supervise(self, entry: _Entry) -> None:
+        client = entry.client
+        delay = self.reconnect_min_sec
+        while True:
+            if not client.connected:
+                try:
+                    async with entry.lock:
+                        # acquire() may have connected while we waited for the lock
+                        reconnect = not client.connected
+                        if reconnect:
+                            await client.connect()
+                except Exception as e:
+                    logging.warning(f"[{client.charge_point_id}] reconnect failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.reconnect_max_sec)
+                    continue
+                delay = self.reconnect_min_sec
+                if reconnect:
+                    entry.reconnects += 1
+                    logging.info(f"[{client.charge_point_id}] reconnected")
+            closed = asyncio.ensure_future(client.wait_closed())
+            done, _ = await asyncio.wait([closed], timeout=self.keepalive_sec)
+            if done:
+                async with entry.lock:
+                    if not client.connected:
+                        await client.close()
+                continue
+            closed.cancel()
+            try:
+                await client.heartbeat(timeout=self.keepalive_sec)
+            except Exception as e:
+                # unanswered keepalive: treat the link as dead (half-open)
+                logging.warning(f"[{client.charge_point_id}] keepalive failed: {e}")
+                async with entry.lock:
+                    await client.close()
@@ -0,0 +1,237 @@
+"""Durable store for completed charging sessions.
+
+Sessions go to an SQLite database in WAL mode, so the history outlives
+charger disconnects and central restarts, and readers never block the
+writer.  :meth:`HistoryStore.add` only appends to an in-memory batch.  A
+background task writes the batch in one transaction every
+``flush_interval`` seconds, or as soon as it reaches ``batch_size``
+records.  All SQLite work runs in worker threads, off the event loop.
+
+:meth:`HistoryStore.query` pages newest-first by ``(stop_time, id)``
+(keyset pagination).  A page costs the same however deep into the history
+it is, and memory is bounded by ``limit``.  Filters on cpid, idTag, vid,
+and start/stop time ranges use the indexes created below.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+MAX_PAGE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    cpid TEXT NOT NULL,
+    connector_id INTEGER NOT NULL,
+    transaction_id INTEGER NOT NULL,
+    id_tag TEXT NOT NULL,
+    vid TEXT,
+    meter_start INTEGER NOT NULL,
+    meter_stop INTEGER NOT NULL,
+    energy INTEGER NOT NULL,
+    start_time REAL,
+    stop_time REAL NOT NULL,
+    duration_secs REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_stop ON sessions (stop_time, id);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS sessions_cpid ON sessions (cpid, stop_time, id);
+CREATE INDEX IF NOT EXISTS sessions_id_tag ON sessions (id_tag, stop_time, id);
+CREATE INDEX IF NOT EXISTS sessions_vid ON sessions (vid, stop_time, id) WHERE vid IS NOT NULL;
+"""
+
+_COLUMNS = (
+    "cpid", "connector_id", "transaction_id", "id_tag", "vid", "meter_start",
+    "meter_stop", "energy", "start_time", "stop_time", "duration_secs",
+)
+
+
+def _epoch(value: datetime | str | float | None) -> float | None:
+    """Seconds since the epoch; naive datetimes are taken as UTC."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _iso(epoch: float | None) -> str | None:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def encode_cursor(stop_time: float, row_id: int) -> str:
+    return f"{stop_time!r}:{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        stop_time, row_id = cursor.rsplit(":", 1)
+        return float(stop_time), int(row_id)
+    except ValueError:
+        raise ValueError(f"invalid cursor {cursor!r}") from None
+
+
+class HistoryStore:
+    """Completed sessions in SQLite, written in batches from the event loop."""
+
+    def __init__(self, path: str = "history.db", batch_size: int = 500, flush_interval: float = 0.5) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: list[tuple] = []
+        self._flush_lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        self._reader = self._connect()
+        self.written = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add(self, cpid: str, record: dict[str, Any]) -> None:
+        """Queue one session record (the dict ``on_stop_transaction`` builds)."""
+        self._pending.append((
+            cpid,
+            record["connectorId"],
+            record["transactionId"],
+            record.get("idTag") or "",
+            record.get("vid"),
+            record["meterStart"],
+            record["meterStop"],
+            record["energy"],
+            _epoch(record.get("startTime")),
+            _epoch(record["stopTime"]),
+            record.get("durationSecs", 0),
+        ))
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    def _write(self, rows: list[tuple]) -> None:
+        placeholders = ", ".join("?" * len(_COLUMNS))
+        with self._write_lock, self._writer:
+            self._writer.executemany(
+                f"INSERT INTO sessions ({', '.join(_COLUMNS)}) VALUES ({placeholders})", rows
+            )
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except Exception:
+                # keep the batch for the next flush rather than losing it
+                self._pending[:0] = rows
+                raise
+            self.written += len(rows)
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("history flush failed, retrying")
+
+    def _select(self, sql: str, params: Iterable[Any]) -> list[sqlite3.Row]:
+        with self._read_lock:
+            return self._reader.execute(sql, list(params)).fetchall()
+
+    async def query(
+        self,
+        cpid: str | None = None,
+        id_tag: str | None = None,
+        vid: str | None = None,
+        connector_id: int | None = None,
+        since: datetime | str | None = None,
+        until: datetime | str | None = None,
+        started_after: datetime | str | None = None,
+        started_before: datetime | str | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """One page of sessions, newest stop time first, and the cursor of the next page.
+
+        ``since``/``until`` bound the stop time and ``started_after``/
+        ``started_before`` the start time (``since`` and ``started_after``
+        inclusive).  The next-page cursor is ``None`` on the last page.
+        """
+        await self.flush()
+        where, params = [], []
+        for column, value in (("cpid", cpid), ("id_tag", id_tag), ("vid", vid), ("connector_id", connector_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        for clause, value in (
+            ("stop_time >= ?", since),
+            ("stop_time < ?", until),
+            ("start_time >= ?", started_after),
+            ("start_time < ?", started_before),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(_epoch(value))
+        if cursor:
+            where.append("(stop_time, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        limit = max(1, min(limit, MAX_PAGE))
+        sql = "SELECT * FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY stop_time DESC, id DESC LIMIT ?"
+        rows = await asyncio.to_thread(self._select, sql, params + [limit])
+        sessions = [
+            {
+                "cpid": row["cpid"],
+                "connectorId": row["connector_id"],
+                "transactionId": row["transaction_id"],
+                "idTag": row["id_tag"],
+                "vid": row["vid"],
+                "meterStart": row["meter_start"],
+                "meterStop": row["meter_stop"],
+                "energy": row["energy"],
+                "startTime": _iso(row["start_time"]),
+                "stopTime": _iso(row["stop_time"]),
+                "durationSecs": row["duration_secs"],
+            }
+            for row in rows
+        ]
+        next_cursor = encode_cursor(rows[-1]["stop_time"], rows[-1]["id"]) if len(rows) == limit else None
+        return sessions, next_cursor
+
+    async def close(self) -> None:
+        # let a write in progress finish: cancelling it would drop its batch
+        # and close the connection under the worker thread
+        self._closing = True
+        self._full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        self._writer.close()
+        self._reader.close()
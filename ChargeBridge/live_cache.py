@@ -0,0 +1,197 @@
+"""Latest meter state per connector and per transaction, kept in memory.
+
+:class:`LiveCache` is fed from the central's StartTransaction,
+MeterValues and StopTransaction handlers.  Each update touches one
+connector entry and is O(sampled values in the message), so dashboards
+can read live kW, session kWh and charging speed without querying the
+history or meter stores.
+
+Per connector it keeps the latest power (``Power.Active.Import``, or the
+rate of change of the energy register when the charger does not report
+power), the energy register, SoC, and ``last_seen``.  While a transaction
+runs it also keeps the energy delivered since ``meter_start``, the
+session's average and peak power, and the number of readings.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from meter_store import parse_meter_values
+
+ENERGY = "Energy.Active.Import.Register"
+POWER = "Power.Active.Import"
+SOC = "SoC"
+
+
+def _epoch(value: datetime | str | float | None) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@dataclass
+class LiveConnector:
+    cpid: str
+    connector_id: int
+    transaction_id: int | None = None
+    power_w: float | None = None
+    energy_wh: float | None = None
+    soc: float | None = None
+    # epoch seconds of the newest reading (charger clock) and when it arrived
+    reading_ts: float | None = None
+    last_seen: float | None = None
+    # session aggregates, reset by start()
+    meter_start: float | None = None
+    start_ts: float | None = None
+    energy_delivered_wh: float = 0.0
+    avg_power_w: float | None = None
+    peak_power_w: float | None = None
+    readings: int = 0
+    _derived_from: tuple[float, float] | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        del data["_derived_from"]
+        return data
+
+
+class LiveCache:
+    def __init__(self) -> None:
+        # cpid -> connector id -> entry
+        self._connectors: dict[str, dict[int, LiveConnector]] = {}
+        self._by_tx: dict[int, LiveConnector] = {}
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self._connectors.values())
+
+    def _entry(self, cpid: str, connector_id: int) -> LiveConnector:
+        connectors = self._connectors.setdefault(cpid, {})
+        entry = connectors.get(connector_id)
+        if entry is None:
+            entry = connectors[connector_id] = LiveConnector(cpid, connector_id)
+        return entry
+
+    def start(self, cpid: str, connector_id: int, transaction_id: int, meter_start: float, timestamp=None) -> None:
+        entry = self._entry(cpid, int(connector_id))
+        if entry.transaction_id is not None:
+            self._by_tx.pop(entry.transaction_id, None)
+        entry.transaction_id = transaction_id
+        entry.meter_start = float(meter_start)
+        entry.start_ts = _epoch(timestamp)
+        entry.energy_wh = float(meter_start)
+        entry.energy_delivered_wh = 0.0
+        entry.avg_power_w = None
+        entry.peak_power_w = None
+        entry.readings = 0
+        entry._derived_from = None
+        self._by_tx[transaction_id] = entry
+
+    def update(self, cpid: str, connector_id: int, transaction_id: int | None, meter_value: list) -> LiveConnector:
+        """Apply one MeterValues message and return the connector's entry."""
+        entry = self._entry(cpid, int(connector_id))
+        if transaction_id is not None and transaction_id != entry.transaction_id:
+            # session started before this central did, or its StartTransaction was missed
+            self.start(cpid, connector_id, transaction_id, meter_start=0, timestamp=None)
+            entry.meter_start = None
+        newest = entry.reading_ts
+        for ts, values in _by_timestamp(parse_meter_values(cpid, int(connector_id), transaction_id, meter_value)):
+            if newest is not None and ts < newest:
+                # an older reading (e.g. a resent batch) does not overwrite newer state
+                continue
+            newest = ts
+            energy = values.get((ENERGY, ""))
+            power = values.get((POWER, ""))
+            if power is None:
+                phases = [v for (m, phase), v in values.items() if m == POWER and phase]
+                power = sum(phases) if phases else None
+            if energy is not None:
+                if power is None and entry._derived_from is not None:
+                    prev_ts, prev_wh = entry._derived_from
+                    if ts > prev_ts:
+                        power = (energy - prev_wh) * 3600 / (ts - prev_ts)
+                entry._derived_from = (ts, energy)
+                entry.energy_wh = energy
+                if entry.meter_start is None and entry.transaction_id is not None:
+                    entry.meter_start = energy
+            if power is not None:
+                entry.power_w = power
+                if entry.transaction_id is not None and (entry.peak_power_w is None or power > entry.peak_power_w):
+                    entry.peak_power_w = power
+            soc = values.get((SOC, ""))
+            if soc is not None:
+                entry.soc = soc
+            entry.reading_ts = ts
+            entry.readings += 1
+        if entry.transaction_id is not None and entry.energy_wh is not None and entry.meter_start is not None:
+            entry.energy_delivered_wh = entry.energy_wh - entry.meter_start
+            if entry.start_ts is not None and entry.reading_ts is not None and entry.reading_ts > entry.start_ts:
+                entry.avg_power_w = entry.energy_delivered_wh * 3600 / (entry.reading_ts - entry.start_ts)
+        entry.last_seen = time.time()
+        return entry
+
+    def stop(self, transaction_id: int, meter_stop: float | None = None) -> LiveConnector | None:
+        """End the transaction; the connector keeps its latest readings."""
+        entry = self._by_tx.pop(transaction_id, None)
+        if entry is None:
+            return None
+        if meter_stop is not None:
+            entry.energy_wh = float(meter_stop)
+        entry.transaction_id = None
+        entry.power_w = 0.0
+        return entry
+
+    def drop(self, cpid: str) -> None:
+        """Forget a charge point, e.g. when it disconnects."""
+        for entry in self._connectors.pop(cpid, {}).values():
+            if entry.transaction_id is not None:
+                self._by_tx.pop(entry.transaction_id, None)
+
+    def get(self, cpid: str, connector_id: int) -> LiveConnector | None:
+        return self._connectors.get(cpid, {}).get(connector_id)
+
+    def by_transaction(self, transaction_id: int) -> LiveConnector | None:
+        return self._by_tx.get(transaction_id)
+
+    def select(
+        self,
+        cpid: str | None = None,
+        connector_id: int | None = None,
+        transaction_id: int | None = None,
+        charging: bool | None = None,
+    ) -> Iterator[LiveConnector]:
+        if transaction_id is not None:
+            entries = [self._by_tx[transaction_id]] if transaction_id in self._by_tx else []
+        elif cpid is not None:
+            entries = list(self._connectors.get(cpid, {}).values())
+        else:
+            entries = [e for connectors in list(self._connectors.values()) for e in list(connectors.values())]
+        for entry in entries:
+            if cpid is not None and entry.cpid != cpid:
+                continue
+            if connector_id is not None and entry.connector_id != connector_id:
+                continue
+            if charging is not None and (entry.transaction_id is not None) != charging:
+                continue
+            yield entry
+
+
+def _by_timestamp(rows) -> Iterator[tuple[float, dict[tuple[str, str], float]]]:
+    """Group parsed rows into one ``{(measurand, phase): value}`` per meterValue timestamp."""
+    current_ts, values = None, {}
+    for ts, _, _, _, measurand, phase, value in rows:
+        if ts != current_ts and values:
+            yield current_ts, values
+            values = {}
+        current_ts = ts
+        values[(measurand, phase)] = value
+    if values:
+        yield current_ts, values
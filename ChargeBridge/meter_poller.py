@@ -0,0 +1,360 @@
+"""Poll charger cabinet energy meters over Modbus-TCP.
+
+One :class:`MeterPoller` drives any number of cabinets from a single event
+loop, with one task and one persistent TCP connection per cabinet:
+
+- **batched reads**: the register fields of all of a cabinet's meters are
+  merged into as few *Read Holding Registers* requests as possible.  Gaps
+  up to ``max_gap`` registers are read through, and a request covers at
+  most 125 registers.
+- **adaptive rate**: a cabinet with a session running is polled every
+  ``active_interval`` seconds, an idle one every ``idle_interval``.
+  :meth:`MeterPoller.set_session` switches the rate at once.
+- **measurements**: per cabinet, the latency of each poll and its jitter
+  (how late it started against its schedule) are kept for :meth:`stats`.
+
+Readings are published as :class:`meter_stream.Reading`, so a subscription
+can be handed straight to ``ChargingSession.stream_meter``::
+
+    session.stream_meter(poller.subscribe("cab1", 1))
+
+``python meter_poller.py --standins 40`` polls 40 local stand-in cabinets
+(see ``modbus_standin.py``) and prints the statistics.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import struct
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator
+
+from meter_stream import Reading
+
+# Modbus limit for one Read Holding Registers request
+MAX_REGISTERS = 125
+
+
+class ModbusError(Exception):
+    """The device answered with a Modbus exception response."""
+
+    def __init__(self, code: int):
+        super().__init__(f"Modbus exception {code}")
+        self.code = code
+
+
+@dataclass(frozen=True)
+class Field:
+    """One value in a meter's register block, ``words`` 16-bit registers wide."""
+
+    name: str
+    offset: int
+    words: int = 1
+    scale: float = 1.0
+    signed: bool = False
+
+    def decode(self, registers: list[int]) -> float:
+        raw = 0
+        for word in registers:
+            raw = raw << 16 | word
+        if self.signed and raw >= 1 << (16 * self.words - 1):
+            raw -= 1 << (16 * self.words)
+        return raw * self.scale
+
+    def encode(self, value: float) -> int:
+        return round(value / self.scale) & ((1 << (16 * self.words)) - 1)
+
+
+# register layout of one meter, relative to its base register
+DEFAULT_MAP = (
+    Field("energy_wh", 0, 2),
+    Field("power_w", 2, 2),
+    Field("voltage_v", 4, 1, 0.1),
+    Field("current_a", 5, 1, 0.1),
+    Field("soc", 6, 1),
+)
+
+
+def plan_reads(spans: list[tuple[int, int]], max_gap: int = 8) -> list[tuple[int, int]]:
+    """Merge ``(address, count)`` spans into as few requests as possible."""
+    blocks: list[list[int]] = []
+    for start, count in sorted(spans):
+        end = start + count
+        if blocks and start - blocks[-1][1] <= max_gap and end - blocks[-1][0] <= MAX_REGISTERS:
+            blocks[-1][1] = max(blocks[-1][1], end)
+        else:
+            blocks.append([start, end])
+    return [(start, end - start) for start, end in blocks]
+
+
+class ModbusTCPClient:
+    """Persistent Modbus-TCP connection; requests are sent one at a time."""
+
+    def __init__(self, host: str, port: int = 502, timeout: float = 2.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connects = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._tid = 0
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self.connects += 1
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def read_holding_registers(self, unit: int, address: int, count: int) -> list[int]:
+        if not 1 <= count <= MAX_REGISTERS:
+            raise ValueError(f"count must be 1..{MAX_REGISTERS}")
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                await self._connect()
+            self._tid = (self._tid + 1) & 0xFFFF
+            request = struct.pack(">HHHBBHH", self._tid, 0, 6, unit, 0x03, address, count)
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+                header = await asyncio.wait_for(self._reader.readexactly(7), self.timeout)
+                tid, _, length, _ = struct.unpack(">HHHB", header)
+                pdu = await asyncio.wait_for(self._reader.readexactly(length - 1), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                # the stream is out of step now; start over on the next read
+                await self.close()
+                raise
+            if tid != self._tid:
+                await self.close()
+                raise ConnectionError(f"transaction id {tid} != {self._tid}")
+        if pdu[0] & 0x80:
+            raise ModbusError(pdu[1])
+        return list(struct.unpack(f">{pdu[1] // 2}H", pdu[2:2 + pdu[1]]))
+
+
+@dataclass
+class Cabinet:
+    """A Modbus-TCP device with one meter per connector at a base register."""
+
+    name: str
+    host: str
+    port: int = 502
+    unit: int = 1
+    # connector id -> base register of its meter
+    connectors: dict[int, int] = field(default_factory=lambda: {1: 10})
+    register_map: tuple[Field, ...] = DEFAULT_MAP
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(pct: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+    return {"p50": pick(50), "p95": pick(95), "max": round(ordered[-1], 2)}
+
+
+class _CabinetState:
+    def __init__(self, cabinet: Cabinet, timeout: float, max_gap: int, history: int) -> None:
+        self.cabinet = cabinet
+        self.client = ModbusTCPClient(cabinet.host, cabinet.port, timeout)
+        spans = [
+            (base + f.offset, f.words)
+            for base in cabinet.connectors.values()
+            for f in cabinet.register_map
+        ]
+        self.blocks = plan_reads(spans, max_gap)
+        self.active: set[int] = set()
+        self.wake = asyncio.Event()
+        self.subscribers: dict[int, list[asyncio.Queue]] = {}
+        self.last: dict[int, dict] = {}
+        self.polls = 0
+        self.errors = 0
+        self.overruns = 0
+        self.latency_ms: deque[float] = deque(maxlen=history)
+        self.jitter_ms: deque[float] = deque(maxlen=history)
+
+
+class MeterPoller:
+    """Poll many :class:`Cabinet` meters concurrently on one event loop."""
+
+    def __init__(
+        self,
+        cabinets: list[Cabinet],
+        active_interval: float = 1.0,
+        idle_interval: float = 15.0,
+        max_gap: int = 8,
+        timeout: float = 2.0,
+        history: int = 1000,
+    ) -> None:
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self._states = {c.name: _CabinetState(c, timeout, max_gap, history) for c in cabinets}
+        self._tasks: list[asyncio.Task] = []
+
+    def set_session(self, cabinet: str, connector_id: int, active: bool) -> None:
+        """Mark a connector as charging (fast polling) or idle."""
+        state = self._states[cabinet]
+        if active:
+            state.active.add(connector_id)
+        else:
+            state.active.discard(connector_id)
+        state.wake.set()
+
+    def interval(self, cabinet: str) -> float:
+        return self.active_interval if self._states[cabinet].active else self.idle_interval
+
+    async def subscribe(self, cabinet: str, connector_id: int, maxsize: int = 100) -> AsyncIterator[Reading]:
+        """Readings of one connector's meter, newest kept if the consumer lags."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        subscribers = self._states[cabinet].subscribers.setdefault(connector_id, [])
+        subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers.remove(queue)
+
+    def latest(self, cabinet: str) -> dict[int, dict]:
+        return self._states[cabinet].last
+
+    async def poll_once(self, cabinet: str) -> dict[int, dict]:
+        """Read every meter of ``cabinet`` and publish the values."""
+        state = self._states[cabinet]
+        registers: dict[int, int] = {}
+        for address, count in state.blocks:
+            values = await state.client.read_holding_registers(state.cabinet.unit, address, count)
+            registers.update(zip(range(address, address + count), values))
+        timestamp = datetime.utcnow().isoformat()
+        for cid, base in state.cabinet.connectors.items():
+            values = {
+                f.name: f.decode([registers[base + f.offset + i] for i in range(f.words)])
+                for f in state.cabinet.register_map
+            }
+            state.last[cid] = values
+            reading = Reading(values["energy_wh"], values.get("power_w"), values.get("soc"), timestamp)
+            for queue in state.subscribers.get(cid, ()):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(reading)
+        return state.last
+
+    async def _run_cabinet(self, name: str) -> None:
+        state = self._states[name]
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        last_poll = float("-inf")
+        while True:
+            delay = due - loop.time()
+            if delay > 0:
+                state.wake.clear()
+                try:
+                    await asyncio.wait_for(state.wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    continue
+                # a session started: don't sit out the idle interval
+                due = min(due, last_poll + self.interval(name))
+                continue
+            started = loop.time()
+            state.jitter_ms.append((started - due) * 1000)
+            try:
+                await self.poll_once(name)
+                state.latency_ms.append((loop.time() - started) * 1000)
+                state.polls += 1
+            except Exception as e:
+                state.errors += 1
+                logging.warning(f"[{name}] meter poll failed: {e!r}")
+            last_poll = started
+            due += self.interval(name)
+            if due < loop.time():
+                # slower than the interval: skip the missed slots
+                state.overruns += 1
+                due = loop.time() + self.interval(name)
+
+    def start(self) -> "MeterPoller":
+        self._tasks = [asyncio.create_task(self._run_cabinet(name)) for name in self._states]
+        return self
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for state in self._states.values():
+            await state.client.close()
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "interval": self.interval(name),
+                "reads_per_poll": len(state.blocks),
+                "polls": state.polls,
+                "errors": state.errors,
+                "overruns": state.overruns,
+                "connects": state.client.connects,
+                "latency_ms": _percentiles(state.latency_ms),
+                "jitter_ms": _percentiles(state.jitter_ms),
+            }
+            for name, state in self._states.items()
+        }
+
+
+async def _demo(args) -> None:
+    from modbus_standin import ModbusStandIn
+
+    devices, cabinets = [], []
+    for n in range(args.standins):
+        device = ModbusStandIn(latency_sec=args.latency)
+        for cid in range(1, args.connectors + 1):
+            device.add_meter(cid * 10, power_w=args.power_w)
+        await device.start()
+        devices.append(device)
+        cabinets.append(Cabinet(f"cab{n + 1}", device.host, device.port,
+                                connectors={cid: cid * 10 for cid in range(1, args.connectors + 1)}))
+    poller = MeterPoller(cabinets, args.active, args.idle).start()
+    for cabinet in cabinets:
+        poller.set_session(cabinet.name, 1, True)
+    await asyncio.sleep(args.seconds)
+    await poller.close()
+    for device in devices:
+        await device.stop()
+    stats = poller.stats()
+    for name, row in stats.items():
+        print(json.dumps({"cabinet": name, **row}))
+    latency = [v for s in poller._states.values() for v in s.latency_ms]
+    jitter = [v for s in poller._states.values() for v in s.jitter_ms]
+    print(json.dumps({
+        "cabinets": len(cabinets),
+        "polls": sum(row["polls"] for row in stats.values()),
+        "errors": sum(row["errors"] for row in stats.values()),
+        "latency_ms": _percentiles(latency),
+        "jitter_ms": _percentiles(jitter),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Poll local Modbus stand-in cabinets")
+    parser.add_argument("--standins", type=int, default=10, help="number of stand-in cabinets")
+    parser.add_argument("--connectors", type=int, default=2)
+    parser.add_argument("--power-w", type=float, default=120000)
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in reply delay")
+    parser.add_argument("--active", type=float, default=1.0, help="poll interval while charging")
+    parser.add_argument("--idle", type=float, default=15.0, help="poll interval when idle")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    asyncio.run(_demo(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""Keep the meter readings chargers send in MeterValues.
+
+:meth:`MeterStore.ingest` is called from the OCPP handler.  It only
+appends the raw ``meterValue`` list to an in-memory buffer, so the handler
+never waits on parsing or disk.  Every ``flush_interval`` seconds, or
+sooner once ``batch_size`` samples are waiting, a worker thread parses the
+buffer into typed columns and appends them to an append-only columnar
+store under ``path``:
+
+- ``series.jsonl``: one line per series, ``[id, cpid, connector_id,
+  measurand, phase]``.  A series id is assigned the first time the series
+  is seen.
+- ``raw/YYYYMMDDHH.seg``: one block per flush, holding the columns series
+  id, ``ts`` (epoch seconds), ``value`` and ``transaction_id`` (-1 when
+  absent) as packed native arrays.  kW/kWh/kvar values are scaled to
+  W/Wh/var.
+- ``rollup_<sec>/YYYYMMDD.seg``: count, sum, min and max per series and
+  bucket, one directory per ``rollups`` interval.  A bucket is written
+  once it has been closed for ``rollup_grace_sec``.  Samples arriving
+  later add another partial row for the same bucket, and :meth:`query`
+  merges them.  For the cumulative energy register, max - min is the
+  energy delivered in the bucket.
+
+A block has a small header (row count and time range), so queries skip
+blocks outside the requested range without reading them.  A block cut
+short by a crash is ignored.  Files whose period is older than
+``raw_retention_sec``, or than a rollup's retention, are deleted once per
+``retention_every_sec``.  The buffer holds at most ``max_buffer`` samples.
+Past that, the oldest MeterValues are dropped and counted in
+:attr:`stats`.
+
+``python meter_store.py --rate 100000 --seconds 10`` runs the sustained
+ingest benchmark.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator
+
+DAY = 86400
+
+# multiplier to the base unit
+_SCALE = {"kW": 1000.0, "kWh": 1000.0, "kvar": 1000.0, "kvarh": 1000.0, "kVA": 1000.0}
+
+# magic, row count, min time, max time
+_HEADER = struct.Struct("<4sIdd")
+_RAW = (b"MSR1", (("series", "I"), ("ts", "d"), ("value", "d"), ("transaction_id", "q")))
+_ROLLUP = (b"MSU1", (("series", "I"), ("bucket", "d"), ("count", "I"), ("sum", "d"), ("min", "d"), ("max", "d")))
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_meter_values(
+    cpid: str, connector_id: int, transaction_id: int | None, meter_value: list
+) -> Iterator[tuple[float, str, int, int | None, str, str, float]]:
+    """Typed ``(ts, cpid, connector_id, transaction_id, measurand, phase, value)`` rows.
+
+    Accepts camelCase or snake_case keys.  Entries without a valid
+    timestamp and values that are not numbers are skipped.
+    """
+    for entry in meter_value:
+        try:
+            ts = _timestamp(entry["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            logging.warning(f"MeterValues from {cpid} without a valid timestamp dropped: {entry!r}")
+            continue
+        for sv in entry.get("sampled_value") or entry.get("sampledValue") or ():
+            try:
+                value = float(sv["value"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            unit = sv.get("unit")
+            if unit in _SCALE:
+                value *= _SCALE[unit]
+            yield (
+                ts,
+                cpid,
+                connector_id,
+                transaction_id,
+                sv.get("measurand") or "Energy.Active.Import.Register",
+                sv.get("phase") or "",
+                value,
+            )
+
+
+def _write_block(path: str, kind: tuple, columns: dict[str, array], min_t: float, max_t: float) -> None:
+    magic, layout = kind
+    with open(path, "ab") as fh:
+        fh.write(_HEADER.pack(magic, len(columns["series"]), min_t, max_t))
+        for name, _ in layout:
+            columns[name].tofile(fh)
+
+
+def _read_blocks(path: str, kind: tuple, since: float | None, until: float | None) -> Iterator[dict[str, array]]:
+    magic, layout = kind
+    widths = [array(code).itemsize for _, code in layout]
+    with open(path, "rb") as fh:
+        while True:
+            header = fh.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            found, n, min_t, max_t = _HEADER.unpack(header)
+            if found != magic:
+                logging.warning(f"{path}: bad block header, rest of file skipped")
+                return
+            size = n * sum(widths)
+            if (since is not None and max_t < since) or (until is not None and min_t >= until):
+                fh.seek(size, os.SEEK_CUR)
+                continue
+            data = fh.read(size)
+            if len(data) < size:
+                # cut short by a crash
+                return
+            columns, offset = {}, 0
+            for (name, code), width in zip(layout, widths):
+                column = array(code)
+                column.frombytes(data[offset:offset + n * width])
+                columns[name] = column
+                offset += n * width
+            yield columns
+
+
+@dataclass
+class IngestStats:
+    received: int = 0
+    written: int = 0
+    dropped: int = 0
+    flushes: int = 0
+    errors: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+
+class MeterStore:
+    """Buffered, batched columnar meter-sample storage with retention and rollups."""
+
+    def __init__(
+        self,
+        path: str = "meters",
+        batch_size: int = 50_000,
+        flush_interval: float = 1.0,
+        max_buffer: int = 1_000_000,
+        raw_retention_sec: float = 7 * DAY,
+        rollups: dict[int, float] | None = None,
+        rollup_grace_sec: float = 60.0,
+        retention_every_sec: float = 3600.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.raw_retention_sec = raw_retention_sec
+        # bucket seconds -> retention seconds, shortest first
+        self.rollups = dict(sorted((rollups if rollups is not None else {60: 30 * DAY, 3600: 730 * DAY}).items()))
+        if self.rollups and any(bucket % min(self.rollups) for bucket in self.rollups):
+            raise ValueError("every rollup interval must be a multiple of the shortest one")
+        self.rollup_grace_sec = rollup_grace_sec
+        self.retention_every_sec = retention_every_sec
+        self.stats = IngestStats()
+        # (sample count, cpid, connector, tx, meterValue list)
+        self._buffer: deque[tuple] = deque()
+        self._buffered = 0
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._last_retention = 0.0
+        # guards the series table and open buckets, which the worker thread updates
+        self._io_lock = threading.Lock()
+        # bucket seconds -> {(series, bucket start): [count, sum, min, max]} not yet written
+        self._open: dict[int, dict[tuple[int, float], list]] = {b: {} for b in self.rollups}
+        self._series: dict[tuple, int] = {}
+        self._series_info: list[tuple] = []
+        os.makedirs(os.path.join(path, "raw"), exist_ok=True)
+        for bucket in self.rollups:
+            os.makedirs(os.path.join(path, f"rollup_{int(bucket)}"), exist_ok=True)
+        self._series_path = os.path.join(path, "series.jsonl")
+        if os.path.exists(self._series_path):
+            with open(self._series_path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        sid, *key = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._series[tuple(key)] = sid
+                    self._series_info.append(tuple(key))
+
+    @property
+    def pending(self) -> int:
+        return self._buffered
+
+    def ingest(self, cpid: str, connector_id: int, transaction_id: int | None, meter_value: list) -> None:
+        """Queue one MeterValues payload; O(number of meterValue entries), no parsing or I/O."""
+        count = 0
+        for entry in meter_value:
+            count += len(entry.get("sampled_value") or entry.get("sampledValue") or ())
+        self._buffer.append((count, cpid, int(connector_id), transaction_id, meter_value))
+        self._buffered += count
+        self.stats.received += count
+        while self._buffered > self.max_buffer and len(self._buffer) > 1:
+            dropped = self._buffer.popleft()[0]
+            self._buffered -= dropped
+            self.stats.dropped += dropped
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+        if self._buffered >= self.batch_size:
+            self._full.set()
+
+    # ----- worker thread -----
+
+    def _emit(self, now: float, final: bool) -> None:
+        """Write closed buckets, folding each level into the next coarser one first."""
+        levels = list(self._open.items())
+        for i, (bucket, agg) in enumerate(levels):
+            closed = [key for key in agg if final or key[1] + bucket + self.rollup_grace_sec <= now]
+            if not closed:
+                continue
+            wider = levels[i + 1] if i + 1 < len(levels) else None
+            columns = {name: array(code) for name, code in _ROLLUP[1]}
+            for key in closed:
+                count, total, lo, hi = agg.pop(key)
+                columns["series"].append(key[0])
+                columns["bucket"].append(key[1])
+                columns["count"].append(count)
+                columns["sum"].append(total)
+                columns["min"].append(lo)
+                columns["max"].append(hi)
+                if wider is not None:
+                    wkey = (key[0], key[1] - key[1] % wider[0])
+                    a = wider[1].get(wkey)
+                    if a is None:
+                        wider[1][wkey] = [count, total, lo, hi]
+                    else:
+                        a[0] += count
+                        a[1] += total
+                        a[2] = min(a[2], lo)
+                        a[3] = max(a[3], hi)
+            day = time.strftime("%Y%m%d", time.gmtime(now))
+            _write_block(
+                os.path.join(self.path, f"rollup_{int(bucket)}", f"{day}.seg"),
+                _ROLLUP, columns, min(columns["bucket"]), max(columns["bucket"]),
+            )
+
+    def _expire(self, now: float) -> None:
+        targets = [("raw", "%Y%m%d%H", 3600, self.raw_retention_sec)]
+        targets += [(f"rollup_{int(b)}", "%Y%m%d", DAY, retention) for b, retention in self.rollups.items()]
+        for folder, fmt, period, retention in targets:
+            for name in os.listdir(os.path.join(self.path, folder)):
+                try:
+                    start = datetime.strptime(name[:-4], fmt).replace(tzinfo=timezone.utc).timestamp()
+                except ValueError:
+                    continue
+                if start + period < now - retention:
+                    os.remove(os.path.join(self.path, folder, name))
+
+    def _write(self, batch: list[tuple], now: float, final: bool = False) -> int:
+        series, ts_col, values, txs = array("I"), array("d"), array("d"), array("q")
+        new_series: list = []
+        finest = next(iter(self.rollups), None)
+        with self._io_lock:
+            agg = self._open[finest] if finest else None
+            lookup = self._series.get
+            add_series, add_ts, add_value, add_tx = series.append, ts_col.append, values.append, txs.append
+            for _, cpid, connector_id, tx, meter_value in batch:
+                tx = -1 if tx is None else int(tx)
+                for ts, _, _, _, measurand, phase, value in parse_meter_values(cpid, connector_id, None, meter_value):
+                    key = (cpid, connector_id, measurand, phase)
+                    sid = lookup(key)
+                    if sid is None:
+                        sid = self._series[key] = len(self._series_info)
+                        self._series_info.append(key)
+                        new_series.append([sid, *key])
+                    add_series(sid)
+                    add_ts(ts)
+                    add_value(value)
+                    add_tx(tx)
+                    if agg is not None:
+                        start = ts - ts % finest
+                        a = agg.get((sid, start))
+                        if a is None:
+                            agg[(sid, start)] = [1, value, value, value]
+                        else:
+                            a[0] += 1
+                            a[1] += value
+                            if value < a[2]:
+                                a[2] = value
+                            if value > a[3]:
+                                a[3] = value
+            if new_series:
+                # series first, so a block never refers to an unknown id
+                with open(self._series_path, "a", encoding="utf-8") as fh:
+                    fh.write("".join(json.dumps(s) + "\n" for s in new_series))
+            if len(series):
+                hour = time.strftime("%Y%m%d%H", time.gmtime(now))
+                _write_block(
+                    os.path.join(self.path, "raw", f"{hour}.seg"),
+                    _RAW,
+                    {"series": series, "ts": ts_col, "value": values, "transaction_id": txs},
+                    min(ts_col), max(ts_col),
+                )
+            self._emit(now, final)
+            if now - self._last_retention >= self.retention_every_sec:
+                self._last_retention = now
+                self._expire(now)
+        return len(series)
+
+    # ----- event loop side -----
+
+    async def flush(self, final: bool = False) -> None:
+        """Write what is buffered; ``final=True`` also writes all open rollup buckets."""
+        async with self._flush_lock:
+            if not self._buffer and not final:
+                return
+            batch = list(self._buffer)
+            self._buffer.clear()
+            self._buffered = 0
+            t0 = time.perf_counter()
+            try:
+                self.stats.written += await asyncio.to_thread(self._write, batch, time.time(), final)
+            except Exception:
+                lost = sum(b[0] for b in batch)
+                self.stats.errors += 1
+                self.stats.dropped += lost
+                logging.exception(f"meter flush failed, {lost} samples dropped")
+                return
+            ms = (time.perf_counter() - t0) * 1000
+            self.stats.flushes += 1
+            self.stats.last_flush_ms = round(ms, 2)
+            self.stats.max_flush_ms = round(max(self.stats.max_flush_ms, ms), 2)
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    def _select(self, cpid, connector_id, measurand, since, until, bucket, limit) -> list[dict]:
+        with self._io_lock:
+            info = list(self._series_info)
+        wanted = {
+            sid for sid, (c, conn, m, _) in enumerate(info)
+            if (cpid is None or c == cpid)
+            and (connector_id is None or conn == connector_id)
+            and (measurand is None or m == measurand)
+        }
+        if not wanted:
+            return []
+        kind, folder, time_col = (_RAW, "raw", "ts") if bucket is None else (_ROLLUP, f"rollup_{int(bucket)}", "bucket")
+        directory = os.path.join(self.path, folder)
+        rows: list[dict] = []
+        merged: dict[tuple[int, float], list] = {}
+        for name in sorted(os.listdir(directory)):
+            for block in _read_blocks(os.path.join(directory, name), kind, since, until):
+                times, sids = block[time_col], block["series"]
+                for i, sid in enumerate(sids):
+                    t = times[i]
+                    if sid not in wanted or (since is not None and t < since) or (until is not None and t >= until):
+                        continue
+                    if bucket is None:
+                        tx = block["transaction_id"][i]
+                        rows.append({"ts": t, "series": sid, "transaction_id": None if tx < 0 else tx,
+                                     "value": block["value"][i]})
+                        continue
+                    c, s, lo, hi = block["count"][i], block["sum"][i], block["min"][i], block["max"][i]
+                    a = merged.get((sid, t))
+                    if a is None:
+                        merged[(sid, t)] = [c, s, lo, hi]
+                    else:
+                        a[0] += c
+                        a[1] += s
+                        a[2] = min(a[2], lo)
+                        a[3] = max(a[3], hi)
+        if bucket is not None:
+            rows = [
+                {"bucket": t, "series": sid, "count": c, "sum": s, "min": lo, "max": hi}
+                for (sid, t), (c, s, lo, hi) in merged.items()
+            ]
+        rows.sort(key=lambda r: r[time_col])
+        del rows[limit:]
+        for row in rows:
+            row["cpid"], row["connector_id"], row["measurand"], row["phase"] = info[row.pop("series")]
+        return rows
+
+    async def query(
+        self,
+        cpid: str | None = None,
+        connector_id: int | None = None,
+        measurand: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        bucket: int | None = None,
+        limit: int = 10_000,
+    ) -> list[dict]:
+        """Raw samples, or rollup rows for the ``bucket``-second interval, oldest first.
+
+        Buffered samples are written first.  Rollup buckets still open
+        (see ``rollup_grace_sec``) are not included.
+        """
+        if bucket is not None and bucket not in self.rollups:
+            raise ValueError(f"no rollup with bucket {bucket}s (have {sorted(self.rollups)})")
+        await self.flush()
+        return await asyncio.to_thread(self._select, cpid, connector_id, measurand, since, until, bucket, limit)
+
+    async def close(self) -> None:
+        # let a write in progress finish: its worker thread cannot be cancelled
+        self._closing = True
+        self._full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush(final=True)
+
+
+def _payload(i: int, per_call: int, ts: str) -> list:
+    measurands = (
+        ("Energy.Active.Import.Register", "Wh", None),
+        ("Power.Active.Import", "W", None),
+        ("Current.Import", "A", "L1"),
+        ("Current.Import", "A", "L2"),
+        ("Current.Import", "A", "L3"),
+        ("Voltage", "V", "L1-N"),
+        ("Voltage", "V", "L2-N"),
+        ("Voltage", "V", "L3-N"),
+        ("SoC", "Percent", None),
+        ("Temperature", "Celsius", None),
+    )
+    sampled = []
+    for n in range(per_call):
+        measurand, unit, phase = measurands[n % len(measurands)]
+        sv = {"value": str(i + n), "measurand": measurand, "unit": unit}
+        if phase:
+            sv["phase"] = phase
+        sampled.append(sv)
+    return [{"timestamp": ts, "sampled_value": sampled}]
+
+
+async def _bench(args) -> dict:
+    path = args.path or tempfile.mkdtemp()
+    store = MeterStore(path, flush_interval=args.flush_interval)
+    calls_per_sec = args.rate / args.per_call
+    tick = 0.01
+    lags: list[float] = []
+    due = 0.0
+    i = 0
+    start = time.perf_counter()
+    next_tick = start
+    while time.perf_counter() - start < args.seconds:
+        ts = datetime.now(timezone.utc).isoformat()
+        due += calls_per_sec * tick
+        while due >= 1:
+            store.ingest(f"CP{i % args.chargers}", 1 + (i // args.chargers) % 2, i, _payload(i, args.per_call, ts))
+            i += 1
+            due -= 1
+        next_tick += tick
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+        lags.append(max(0.0, time.perf_counter() - next_tick))
+    elapsed = time.perf_counter() - start
+    backlog = store.pending
+    t0 = time.perf_counter()
+    await store.close()
+    drain = time.perf_counter() - t0
+    lags.sort()
+    return {
+        "target_rate": args.rate,
+        "offered": store.stats.received,
+        "ingest_rate": round(store.stats.received / elapsed),
+        "written": store.stats.written,
+        "write_rate": round(store.stats.written / (elapsed + drain)),
+        "dropped": store.stats.dropped,
+        "backlog_at_end": backlog,
+        "drain_sec": round(drain, 3),
+        "flushes": store.stats.flushes,
+        "max_flush_ms": store.stats.max_flush_ms,
+        "loop_lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 2) if lags else 0.0,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+        "path": path,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sustained MeterValues ingest benchmark")
+    parser.add_argument("--rate", type=int, default=100_000, help="samples per second")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--per-call", type=int, default=10, help="sampled values per MeterValues")
+    parser.add_argument("--chargers", type=int, default=5000)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--path", help="store directory (default: a temporary directory)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_bench(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Forward a live meter-reading stream as OCPP MeterValues.
+
+A meter that reports at 1 Hz or faster would need one MeterValues CALL per
+reading, which a slow link or a busy CSMS cannot keep up with.
+:class:`MeterStream` sits between the reading source (an async iterator)
+and the OCPP client:
+
+- **buffer**: readings queue in a bounded buffer (``buffer_size``).  When
+  it is full the stream either drops the oldest reading
+  (``overflow="drop_oldest"``) or stops pulling from the source until
+  there is room (``overflow="block"``), which pushes back on the producer.
+- **coalescing**: a reading that arrives less than ``coalesce_sec`` after
+  the last buffered one replaces it.  The energy register is cumulative,
+  so only resolution is lost, never energy.
+- **batching**: one CALL carries up to ``batch_size`` readings as separate
+  ``meterValue`` entries.  A partial batch waits at most ``max_delay_sec``
+  for more readings.  With the default of 0 it goes out immediately, so
+  batches only form while a previous CALL is still in flight.
+
+Only one MeterValues CALL is outstanding at a time.  A failed CALL puts its
+readings back at the head of the buffer and is retried after ``retry_sec``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterable, Awaitable, Callable
+
+
+@dataclass
+class Reading:
+    """One meter sample; ``energy_wh`` is the cumulative import register."""
+
+    energy_wh: float
+    power_w: float | None = None
+    soc: float | None = None
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    def to_meter_value(self) -> dict:
+        sampled = [
+            {"value": str(int(self.energy_wh)), "measurand": "Energy.Active.Import.Register", "unit": "Wh"}
+        ]
+        if self.power_w is not None:
+            sampled.append({"value": str(round(self.power_w)), "measurand": "Power.Active.Import", "unit": "W"})
+        if self.soc is not None:
+            sampled.append({"value": str(round(self.soc)), "measurand": "SoC", "unit": "Percent"})
+        return {"timestamp": self.timestamp, "sampledValue": sampled}
+
+
+@dataclass
+class StreamStats:
+    received: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    calls: int = 0
+    sent: int = 0
+    errors: int = 0
+
+
+# sends one MeterValues CALL carrying the given meterValue entries
+Sender = Callable[[list[dict]], Awaitable[dict]]
+
+
+class MeterStream:
+    """Pump readings from ``source`` into MeterValues CALLs made by ``send``."""
+
+    def __init__(
+        self,
+        send: Sender,
+        source: AsyncIterable[Reading],
+        batch_size: int = 1,
+        max_delay_sec: float = 0.0,
+        coalesce_sec: float = 0.0,
+        buffer_size: int = 100,
+        overflow: str = "drop_oldest",
+        retry_sec: float = 1.0,
+    ) -> None:
+        if overflow not in ("drop_oldest", "block"):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self._send = send
+        self._source = source
+        self.batch_size = max(1, batch_size)
+        self.max_delay_sec = max_delay_sec
+        self.coalesce_sec = coalesce_sec
+        self.buffer_size = max(1, buffer_size)
+        self.overflow = overflow
+        self.retry_sec = retry_sec
+        self.stats = StreamStats()
+        # latest reading pulled from the source, e.g. for meterStop
+        self.last: Reading | None = None
+        # (arrival time, reading)
+        self._buffer: deque[tuple[float, Reading]] = deque()
+        self._last_kept = float("-inf")
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._source_done = False
+        self._pump_task: asyncio.Task | None = None
+        self._drain_task: asyncio.Task | None = None
+
+    def start(self) -> "MeterStream":
+        self._pump_task = asyncio.create_task(self._pump())
+        self._drain_task = asyncio.create_task(self._drain())
+        return self
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def _pump(self) -> None:
+        try:
+            async for reading in self._source:
+                self.stats.received += 1
+                self.last = reading
+                now = time.monotonic()
+                if self._buffer and now - self._last_kept < self.coalesce_sec:
+                    # keep the arrival time so max_delay_sec still holds
+                    self._buffer[-1] = (self._buffer[-1][0], reading)
+                    self.stats.coalesced += 1
+                    continue
+                while len(self._buffer) >= self.buffer_size:
+                    if self.overflow == "block":
+                        self._space.clear()
+                        await self._space.wait()
+                    else:
+                        self._buffer.popleft()
+                        self.stats.dropped += 1
+                self._buffer.append((now, reading))
+                self._last_kept = now
+                self._wake.set()
+        except Exception:
+            logging.exception("meter source failed, forwarding what is buffered")
+        finally:
+            self._source_done = True
+            self._wake.set()
+
+    async def _wait(self, timeout: float | None = None) -> None:
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _drain(self) -> None:
+        while True:
+            if not self._buffer:
+                if self._source_done:
+                    return
+                await self._wait()
+                continue
+            if len(self._buffer) < self.batch_size and not self._source_done:
+                wait = self.max_delay_sec - (time.monotonic() - self._buffer[0][0])
+                if wait > 0:
+                    await self._wait(wait)
+                    continue
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            self._space.set()
+            try:
+                await self._send([reading.to_meter_value() for _, reading in batch])
+            except Exception as e:
+                self.stats.errors += 1
+                logging.warning(f"MeterValues failed, {len(batch)} readings requeued: {e!r}")
+                self._buffer.extendleft(reversed(batch))
+                while len(self._buffer) > self.buffer_size:
+                    self._buffer.popleft()
+                    self.stats.dropped += 1
+                await asyncio.sleep(self.retry_sec)
+                continue
+            self.stats.calls += 1
+            self.stats.sent += len(batch)
+
+    async def close(self, flush_timeout: float = 5.0) -> None:
+        """Stop reading the source and send what is buffered, for up to ``flush_timeout``."""
+        if self._pump_task is None:
+            return
+        self._pump_task.cancel()
+        await asyncio.gather(self._pump_task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self._drain_task, flush_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"MeterValues flush timed out, {len(self._buffer)} readings dropped")
+            self.stats.dropped += len(self._buffer)
+            self._buffer.clear()
@@ -0,0 +1,163 @@
+"""Local stand-in for a charger cabinet's Modbus-TCP energy meters.
+
+Answers *Read Holding Registers* (function 0x03) with the register layout
+of :data:`meter_poller.DEFAULT_MAP`, so the poller can be exercised
+without hardware.  Each meter sits at a base register and integrates its
+power into the energy register as wall-clock time passes::
+
+    python modbus_standin.py --port 5020 --connectors 2 --power-w 120000
+
+Other function codes get exception 1 (illegal function), reads past the
+last meter exception 2 (illegal data address).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import struct
+import time
+from dataclasses import dataclass, field
+
+from meter_poller import DEFAULT_MAP, Field
+
+
+@dataclass
+class _Meter:
+    energy_wh: float = 0.0
+    power_w: float = 0.0
+    voltage_v: float = 400.0
+    soc: float = 0.0
+    battery_wh: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+
+    def advance(self) -> None:
+        now = time.monotonic()
+        wh = self.power_w * (now - self.updated) / 3600
+        self.energy_wh += wh
+        if self.battery_wh:
+            self.soc = min(100.0, self.soc + wh / self.battery_wh * 100)
+        self.updated = now
+
+    def value(self, name: str) -> float:
+        if name == "current_a":
+            return self.power_w / self.voltage_v if self.voltage_v else 0.0
+        return getattr(self, name)
+
+
+class ModbusStandIn:
+    """asyncio Modbus-TCP server holding one :class:`_Meter` per base register."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        register_map: tuple[Field, ...] = DEFAULT_MAP,
+        latency_sec: float = 0.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.register_map = register_map
+        self.latency_sec = latency_sec
+        self.meters: dict[int, _Meter] = {}
+        self.connections = 0
+        self.requests = 0
+        self.server: asyncio.AbstractServer | None = None
+        self._clients: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._span = max(f.offset + f.words for f in register_map)
+
+    def add_meter(self, base: int, **state) -> _Meter:
+        meter = self.meters[base] = _Meter(**state)
+        return meter
+
+    def set_power(self, base: int, power_w: float) -> None:
+        meter = self.meters[base]
+        meter.advance()
+        meter.power_w = power_w
+
+    def _register(self, address: int) -> int | None:
+        for base, meter in self.meters.items():
+            offset = address - base
+            if 0 <= offset < self._span:
+                for f in self.register_map:
+                    if f.offset <= offset < f.offset + f.words:
+                        raw = f.encode(meter.value(f.name))
+                        # high word first
+                        return (raw >> (16 * (f.offset + f.words - 1 - offset))) & 0xFFFF
+                return 0
+        # unused registers between meters read as 0, like on most devices
+        return 0 if self.meters and address < max(self.meters) + self._span else None
+
+    def read(self, address: int, count: int) -> list[int] | None:
+        for meter in self.meters.values():
+            meter.advance()
+        values = [self._register(a) for a in range(address, address + count)]
+        return None if None in values else values
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # let open connections end on EOF rather than being cancelled later
+        for writer in self._clients.values():
+            writer.close()
+        if self._clients:
+            await asyncio.wait(list(self._clients), timeout=1)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                tid, proto, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                self.requests += 1
+                if self.latency_sec:
+                    await asyncio.sleep(self.latency_sec)
+                function = pdu[0]
+                if function != 0x03 or len(pdu) != 5:
+                    reply = bytes([function | 0x80, 0x01])
+                else:
+                    address, count = struct.unpack(">HH", pdu[1:5])
+                    values = self.read(address, count) if 1 <= count <= 125 else None
+                    if values is None:
+                        reply = bytes([0x83, 0x02])
+                    else:
+                        reply = bytes([0x03, 2 * count]) + struct.pack(f">{count}H", *values)
+                writer.write(struct.pack(">HHHB", tid, proto, len(reply) + 1, unit) + reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._clients.pop(task, None)
+
+
+async def _serve(args) -> None:
+    device = ModbusStandIn(args.host, args.port, latency_sec=args.latency)
+    for n in range(1, args.connectors + 1):
+        device.add_meter(n * args.stride, power_w=args.power_w)
+    await device.start()
+    print(f"Modbus stand-in on {args.host}:{device.port}, meters at {sorted(device.meters)}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Modbus-TCP energy meter stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--connectors", type=int, default=2)
+    parser.add_argument("--stride", type=int, default=10, help="registers between meter bases")
+    parser.add_argument("--power-w", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="reply delay in seconds")
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
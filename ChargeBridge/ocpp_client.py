@@ -1,18 +1,40 @@
 import asyncio
+import inspect
 import json
+import logging
 import uuid
 from datetime import datetime
+from typing import Any, Awaitable, Callable
 
 import websockets
 
 
+# server CALL handler: receives the payload, returns the result payload
+Handler = Callable[[dict], "dict | Awaitable[dict]"]
+
+
+class OCPPCallError(Exception):
+    """The peer answered a CALL with a CALLERROR frame."""
+
+    def __init__(self, code: str, description: str = "", details: dict | None = None):
+        super().__init__(f"{code}: {description}" if description else code)
+        self.code = code
+        self.description = description
+        self.details = details or {}
+
+
 class OCPPClient:
     """Minimal OCPP client for interacting with charging stations.
 
     The client targets OCPP 1.6j by default but the WebSocket subprotocol
     can be adjusted to support newer revisions.  It was written with
-    Gresgying 120–180 kW DC stations in mind yet keeps messaging
+    Gresgying 120–180 kW DC stations in mind yet keeps messaging
     generic so other vendors and models can be supported as well.
+
+    One background reader owns the socket: replies are matched to their
+    CALL by message id, so any number of calls can be in flight at once
+    (each with its own timeout), and CALLs sent by the CSMS are dispatched
+    to handlers registered with :meth:`on`.
     """
 
     def __init__(
@@ -21,35 +43,122 @@ class OCPPClient:
         charge_point_id: str,
         ocpp_protocol: str = "ocpp1.6",
         charger_model: str = "Gresgying 120-180 kW DC",
+        call_timeout: float = 30.0,
     ) -> None:
         self.uri = uri
         self.charge_point_id = charge_point_id
         self.ocpp_protocol = ocpp_protocol
         self.charger_model = charger_model
+        self.call_timeout = call_timeout
         self._ws: websockets.WebSocketClientProtocol | None = None
+        self._reader: asyncio.Task | None = None
+        # CALLs waiting for their CALLRESULT/CALLERROR, keyed by message id
+        self._pending: dict[str, asyncio.Future] = {}
+        self._handlers: dict[str, Handler] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    def on(self, action: str, handler: Handler | None = None):
+        """Register a handler for CALLs from the CSMS; usable as a decorator."""
+        if handler is None:
+            def decorator(func: Handler) -> Handler:
+                self._handlers[action] = func
+                return func
+            return decorator
+        self._handlers[action] = handler
+        return handler
 
     async def connect(self) -> None:
-        """Establish a WebSocket connection using the configured subprotocol."""
+        """Establish a WebSocket connection using the configured subprotocol.
+
+        A previous socket and its reader are closed first rather than leaked.
+        """
+        if self._ws is not None or self._reader is not None:
+            await self.close()
         self._ws = await websockets.connect(self.uri, subprotocols=[self.ocpp_protocol])
+        self._reader = asyncio.create_task(self._read_loop(self._ws))
 
     async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
         if self._ws is not None:
             await self._ws.close()
             self._ws = None
+        self._fail_pending(ConnectionError("connection closed"))
+
+    async def wait_closed(self) -> None:
+        """Return once the reader has stopped, i.e. the link is gone."""
+        if self._reader is not None:
+            await asyncio.wait([self._reader])
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+        self._pending.clear()
+
+    async def _read_loop(self, ws) -> None:
+        try:
+            async for raw in ws:
+                try:
+                    message = json.loads(raw)
+                    message_type, message_id = message[0], message[1]
+                except (ValueError, IndexError, TypeError):
+                    logging.warning(f"[{self.charge_point_id}] dropping malformed frame: {raw!r}")
+                    continue
+                if message_type == 2:
+                    asyncio.create_task(self._handle_call(ws, message_id, message[2], message[3]))
+                    continue
+                fut = self._pending.pop(message_id, None)
+                if fut is None or fut.done():
+                    # late reply to a call that already timed out
+                    continue
+                if message_type == 3:
+                    fut.set_result(message[2])
+                elif message_type == 4:
+                    fut.set_exception(OCPPCallError(*message[2:5]))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._fail_pending(ConnectionError("connection lost"))
 
-    async def _call(self, action: str, payload: dict) -> dict:
+    async def _handle_call(self, ws, message_id: str, action: str, payload: dict) -> None:
+        handler = self._handlers.get(action)
+        if handler is None:
+            reply: list[Any] = [4, message_id, "NotImplemented", f"No handler for {action}", {}]
+        else:
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    result = await result
+                reply = [3, message_id, result or {}]
+            except Exception as e:
+                logging.exception(f"[{self.charge_point_id}] handler for {action} failed")
+                reply = [4, message_id, "InternalError", str(e), {}]
+        try:
+            await ws.send(json.dumps(reply))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _call(self, action: str, payload: dict, timeout: float | None = None) -> dict:
         """Send an OCPP CALL message and return the payload of the result."""
-        if self._ws is None:
+        if not self.connected:
             raise RuntimeError("Client is not connected")
 
         message_id = str(uuid.uuid4())
-        request = [2, message_id, action, payload]
-        await self._ws.send(json.dumps(request))
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = fut
+        try:
+            await self._ws.send(json.dumps([2, message_id, action, payload]))
+            return await asyncio.wait_for(fut, timeout or self.call_timeout)
+        finally:
+            self._pending.pop(message_id, None)
 
-        raw_response = await self._ws.recv()
-        response = json.loads(raw_response)
-        # OCPP result frames are of the form [3, message_id, payload]
-        return response[2]
+    async def heartbeat(self, timeout: float | None = None) -> dict:
+        return await self._call("Heartbeat", {}, timeout=timeout)
 
     async def start_transaction(
         self, connector_id: int, id_tag: str, meter_start: int
@@ -71,4 +180,13 @@ class OCPPClient:
             "meterStop": meter_stop,
             "timestamp": datetime.utcnow().isoformat(),
         }
-        return await self._call("StopTransaction", payload)
\ No newline at end of file
+        return await self._call("StopTransaction", payload)
+
+    async def meter_values(
+        self, connector_id: int, transaction_id: int | None, meter_value: list[dict]
+    ) -> dict:
+        """Send OCPP 1.6 ``meterValue`` entries for a connector."""
+        payload: dict[str, Any] = {"connectorId": connector_id, "meterValue": meter_value}
+        if transaction_id is not None:
+            payload["transactionId"] = transaction_id
+        return await self._call("MeterValues", payload)
\ No newline at end of file
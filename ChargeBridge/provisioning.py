@@ -0,0 +1,148 @@
+"""Post-boot provisioning of chargers, off the BootNotification path.
+
+The central answers BootNotification at once and hands the follow-up work
+to a :class:`ProvisioningQueue`.  That work is configuration discovery,
+``AuthorizeRemoteTxRequests`` and the QR code.  The queue runs at most
+``concurrency`` jobs at a time across all chargers, so a reconnect storm
+turns into a backlog rather than thousands of concurrent CALLs.
+
+Jobs of one charger never overlap.  A charger that boots again while its
+job is waiting has that job replaced.  If it boots while its job runs, the
+new job starts after the running one ends.  A job that raises or exceeds
+``timeout`` is retried after ``retry_delay * 2**attempt`` seconds, up to
+``retries`` times, without holding a slot while it waits.  :meth:`discard`
+(on disconnect) drops a charger's job and any retry still pending.
+
+:meth:`ProvisioningQueue.stats` reports the queue depth, running jobs,
+outcome counts and time-to-provisioned (submit to success, retries
+included) over the last ``window`` jobs.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+# a job gets its attempt number (0 first) and may raise to be retried
+Job = Callable[[int], Awaitable[None]]
+
+
+@dataclass(eq=False)
+class _Job:
+    cpid: str
+    run: Job
+    submitted: float = field(default_factory=time.monotonic)
+    attempt: int = 0
+
+
+class ProvisioningQueue:
+    """Bounded-concurrency job queue with one job at a time per charger."""
+
+    def __init__(
+        self,
+        concurrency: int = 50,
+        retries: int = 3,
+        retry_delay: float = 5.0,
+        timeout: float = 60.0,
+        window: int = 1000,
+    ) -> None:
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        # the current job of each charger: waiting, running or between retries
+        self._jobs: dict[str, _Job] = {}
+        self._running: set[str] = set()
+        self._ready: asyncio.Queue[_Job] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._durations: deque[float] = deque(maxlen=window)
+        self.provisioned = 0
+        self.failed = 0
+        self.retried = 0
+
+    def submit(self, cpid: str, run: Job) -> None:
+        """Queue ``run`` for ``cpid``, replacing a job of it that has not started."""
+        job = self._jobs[cpid] = _Job(cpid, run)
+        if cpid not in self._running:
+            self._ready.put_nowait(job)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    def discard(self, cpid: str) -> None:
+        """Forget ``cpid``'s job; a running attempt finishes but is not retried."""
+        self._jobs.pop(cpid, None)
+
+    def _current(self, job: _Job) -> bool:
+        return self._jobs.get(job.cpid) is job
+
+    def _requeue(self, job: _Job) -> None:
+        if self._current(job) and job.cpid not in self._running:
+            self._ready.put_nowait(job)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._ready.get()
+            if not self._current(job) or job.cpid in self._running:
+                continue  # replaced, discarded, or picked up already
+            self._running.add(job.cpid)
+            try:
+                await asyncio.wait_for(job.run(job.attempt), self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed(job, e)
+            else:
+                if self._current(job):
+                    del self._jobs[job.cpid]
+                self.provisioned += 1
+                self._durations.append(time.monotonic() - job.submitted)
+            finally:
+                self._running.discard(job.cpid)
+            newer = self._jobs.get(job.cpid)
+            if newer is not None and newer is not job:
+                # submitted while this one ran
+                self._ready.put_nowait(newer)
+
+    def _failed(self, job: _Job, error: Exception) -> None:
+        if not self._current(job):
+            return
+        if job.attempt >= self.retries:
+            logging.error(f"Provisioning {job.cpid} failed after {job.attempt + 1} attempts: {error!r}")
+            del self._jobs[job.cpid]
+            self.failed += 1
+            return
+        delay = self.retry_delay * 2 ** job.attempt
+        logging.warning(f"Provisioning {job.cpid} failed ({error!r}), retrying in {delay:.0f}s")
+        job.attempt += 1
+        self.retried += 1
+        asyncio.get_running_loop().call_later(delay, self._requeue, job)
+
+    def stats(self) -> dict:
+        durations = sorted(self._durations)
+
+        def pct(p: float) -> float | None:
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))], 3) if durations else None
+
+        return {
+            "queued": sum(1 for cpid in self._jobs if cpid not in self._running),
+            "running": len(self._running),
+            "provisioned": self.provisioned,
+            "failed": self.failed,
+            "retried": self.retried,
+            "timeToProvisioned": {
+                "count": len(durations),
+                "avg": round(sum(durations) / len(durations), 3) if durations else None,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": round(durations[-1], 3) if durations else None,
+            },
+        }
+
+    async def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,251 @@
+"""Pieces for running the central as several worker processes.
+
+Every worker accepts WebSocket connections on port 9000 and serves the
+HTTP API on port 8080.  Both listening sockets are opened with
+``SO_REUSEPORT``, so the kernel spreads new connections across the workers.
+A charger's socket therefore lives in exactly one worker.  An HTTP command
+for that charger can arrive at any of them.
+
+* :class:`Registry` maps each cpid to the worker that holds its socket.  It
+  is an SQLite table that all workers share.
+* :class:`WorkerLink` is request/response RPC between workers over Unix
+  sockets in the run directory.  One connection per peer carries any number
+  of concurrent requests.  Each frame is one JSON line tagged with a request id.
+* :func:`supervise` starts the workers and restarts any that exit unexpectedly.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS owners (cpid TEXT PRIMARY KEY, worker INTEGER NOT NULL, since REAL NOT NULL)"
+
+# an RPC handler takes the request body and returns ``(status, body)``, HTTP style
+Handler = Callable[[dict], Awaitable[tuple[int, dict]]]
+
+
+def reuse_port_socket(host: str, port: int) -> socket.socket:
+    """A listening TCP socket that other processes may bind to the same port."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+class Registry:
+    """Which worker owns which cpid, shared through ``path``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+
+    def claim(self, cpid: str, worker: int) -> None:
+        """Record that ``worker`` holds the socket; the newest connection wins."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO owners (cpid, worker, since) VALUES (?, ?, ?) "
+                "ON CONFLICT (cpid) DO UPDATE SET worker = excluded.worker, since = excluded.since",
+                (cpid, worker, time.time()),
+            )
+
+    def release(self, cpid: str, worker: int) -> bool:
+        """Forget ``cpid`` unless it has since reconnected to another worker."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM owners WHERE cpid = ? AND worker = ?", (cpid, worker))
+        return cur.rowcount > 0
+
+    def owner(self, cpid: str) -> int | None:
+        with self._lock:
+            row = self._db.execute("SELECT worker FROM owners WHERE cpid = ?", (cpid,)).fetchone()
+        return row[0] if row else None
+
+    def owners(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT cpid, worker FROM owners"))
+
+    def clear(self, worker: int | None = None) -> None:
+        """Drop the entries of one worker (after it restarts), or all of them."""
+        with self._lock:
+            if worker is None:
+                self._db.execute("DELETE FROM owners")
+            else:
+                self._db.execute("DELETE FROM owners WHERE worker = ?", (worker,))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class RemoteError(Exception):
+    """A forwarded request answered with an error status."""
+
+    def __init__(self, status: int, detail: Any) -> None:
+        super().__init__(f"{status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class _Peer:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.pending: dict[int, asyncio.Future] = {}
+        self.task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                future = self.pending.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("worker connection closed"))
+            self.pending.clear()
+
+
+class WorkerLink:
+    """RPC endpoint of worker ``worker``, listening on ``<run_dir>/worker-<n>.sock``."""
+
+    def __init__(self, run_dir: str, worker: int, handlers: dict[str, Handler], timeout: float = 30) -> None:
+        self.run_dir = run_dir
+        self.worker = worker
+        self.handlers = handlers
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._peers: dict[int, _Peer] = {}
+        self._connecting: dict[int, asyncio.Lock] = {}
+        # incoming connections, closed by close() so their handlers end cleanly
+        self._incoming: dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    def socket_path(self, worker: int) -> str:
+        return os.path.join(self.run_dir, f"worker-{worker}.sock")
+
+    async def start(self) -> None:
+        path = self.socket_path(self.worker)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._serve, path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tasks = set()
+        self._incoming[writer] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._answer(json.loads(line), writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            self._incoming.pop(writer, None)
+            writer.close()
+
+    async def _answer(self, request: dict, writer: asyncio.StreamWriter) -> None:
+        handler = self.handlers.get(request.get("op"))
+        if handler is None:
+            status, body = 404, {"detail": f"unknown op {request.get('op')!r}"}
+        else:
+            try:
+                status, body = await handler(request.get("body") or {})
+            except Exception as e:
+                logging.exception(f"worker op {request.get('op')} failed")
+                status, body = 500, {"detail": str(e)}
+        if writer.is_closing():
+            return
+        writer.write(json.dumps({"id": request["id"], "status": status, "body": body}).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _peer(self, worker: int) -> _Peer:
+        peer = self._peers.get(worker)
+        if peer is not None and not peer.task.done():
+            return peer
+        async with self._connecting.setdefault(worker, asyncio.Lock()):
+            peer = self._peers.get(worker)
+            if peer is None or peer.task.done():
+                reader, writer = await asyncio.open_unix_connection(self.socket_path(worker))
+                peer = self._peers[worker] = _Peer(reader, writer)
+        return peer
+
+    async def call(self, worker: int, op: str, body: dict | None = None) -> dict:
+        """Run ``op`` on ``worker`` and return its body; error statuses raise :class:`RemoteError`."""
+        try:
+            peer = await self._peer(worker)
+        except OSError as e:
+            raise RemoteError(503, f"worker {worker} unreachable: {e}") from None
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        peer.pending[request_id] = future
+        peer.writer.write(json.dumps({"id": request_id, "op": op, "body": body or {}}).encode() + b"\n")
+        try:
+            await peer.writer.drain()
+            reply = await asyncio.wait_for(future, self.timeout)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            peer.pending.pop(request_id, None)
+            raise RemoteError(504 if isinstance(e, asyncio.TimeoutError) else 503, f"worker {worker}: {e!r}") from None
+        if reply["status"] >= 400:
+            raise RemoteError(reply["status"], reply["body"].get("detail"))
+        return reply["body"]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        incoming = list(self._incoming.values())
+        for writer in list(self._incoming):
+            writer.close()
+        await asyncio.gather(*incoming, return_exceptions=True)
+        for peer in self._peers.values():
+            peer.writer.close()
+            peer.task.cancel()
+        self._peers.clear()
+
+
+def supervise(workers: int, target: Callable[[int, int], None], restart_delay: float = 1.0) -> None:
+    """Run ``target(worker, workers)`` in ``workers`` processes and restart any that die.
+
+    The processes are spawned rather than forked, so none of them inherits
+    the parent's open SQLite connections or event loop.
+    """
+    ctx = multiprocessing.get_context("spawn")
+
+    def launch(worker: int) -> multiprocessing.Process:
+        proc = ctx.Process(target=target, args=(worker, workers), name=f"central-{worker}")
+        proc.start()
+        return proc
+
+    procs = {worker: launch(worker) for worker in range(workers)}
+    try:
+        while True:
+            time.sleep(restart_delay)
+            for worker, proc in procs.items():
+                if not proc.is_alive():
+                    logging.warning(f"worker {worker} exited with {proc.exitcode}, restarting")
+                    procs[worker] = launch(worker)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            proc.join()
@@ -0,0 +1,79 @@
+"""Charge point construction and reconnect rate, with and without route caching.
+
+``construct`` builds N ``EVSEChargePoint`` instances (what a fleet does when
+every charger reconnects at once); ``reconnect`` also routes one inbound
+CALL per instance, the first thing a fresh connection typically handles.
+The uncached variant is the same class with ``sim.routing`` switched off.
+
+    python -m benchmarks.bench_construct [--counts 1000 10000 50000]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+# importing the 2.0.1 handlers too registers the same @on names as in the
+# simulator process, which is what the uncached lookup has to probe
+import sim.ocpp201_handlers  # noqa: F401
+from sim.ocpp_handlers import EVSEChargePoint
+from sim.routing import install
+from sim.state_machine import EVSEModel
+
+install()
+
+
+class UncachedChargePoint(EVSEChargePoint):
+    _cache_routes = False
+
+
+class NullConnection:
+    async def send(self, message):
+        pass
+
+    async def recv(self):
+        await asyncio.Future()
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+DATA_TRANSFER = json.dumps([2, "1", "DataTransfer", {"vendorId": "bench"}])
+
+
+async def _measure(cls, count: int, route: bool) -> float:
+    model = EVSEModel(2)
+    conn = NullConnection()
+    fleet = []
+    t0 = time.perf_counter()
+    for i in range(count):
+        cp = cls(f"CP{i:05d}", conn, model, _noop, _noop, _noop)
+        if route:
+            await cp.route_message(DATA_TRANSFER)
+        fleet.append(cp)
+    return time.perf_counter() - t0
+
+
+def run(counts=(1000, 10000, 50000)) -> dict:
+    results = {}
+    for count in counts:
+        for mode, route in (("construct", False), ("reconnect", True)):
+            for name, cls in (("uncached", UncachedChargePoint), ("cached", EVSEChargePoint)):
+                elapsed = asyncio.run(_measure(cls, count, route))
+                results[f"{mode}_{name}_{count}"] = {
+                    "sec": round(elapsed, 4),
+                    "per_sec": round(count / elapsed),
+                }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    for name, result in run(args.counts).items():
+        print(f"{name:28s} " + " ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Event-loop stall under a log flood: direct StreamHandler vs. sim.logs.
+
+A ticker task sleeps 1 ms in a loop and records how late it wakes up while
+a flood task emits MeterValues-style records.  The sink is a stream whose
+``write`` blocks briefly, standing in for a slow terminal or a full pipe.
+
+    python -m benchmarks.bench_logging [--lines 5000] [--write-delay-us 200]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import time
+
+from sim import logs
+
+
+class SlowStream(io.TextIOBase):
+    def __init__(self, delay_sec: float):
+        self.delay_sec = delay_sec
+        self.lines = 0
+
+    def write(self, s):
+        time.sleep(self.delay_sec)
+        self.lines += 1
+        return len(s)
+
+
+async def _measure(lines: int, every: int = 50) -> dict:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t0 - 0.001)
+
+    async def flood():
+        for i in range(lines):
+            logs.event(
+                "MeterValues", "MeterValues",
+                cid=i % 4, energy_wh=i, current_a=30.4, voltage_v=230.1, power_w=7000.0,
+            )
+            if i % every == 0:
+                await asyncio.sleep(0)
+        done.set()
+
+    t0 = time.perf_counter()
+    tick = asyncio.create_task(ticker())
+    await flood()
+    elapsed = time.perf_counter() - t0
+    await tick
+    lags.sort()
+    return {
+        "flood_sec": round(elapsed, 4),
+        "lag_max_ms": round(lags[-1] * 1000, 3) if lags else 0.0,
+        "lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 3) if lags else 0.0,
+        "lag_median_ms": round(statistics.median(lags) * 1000, 3) if lags else 0.0,
+    }
+
+
+def _run_direct(lines: int, delay: float) -> dict:
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    root.handlers = [logging.StreamHandler(SlowStream(delay))]
+    root.setLevel(logging.INFO)
+    try:
+        return asyncio.run(_measure(lines))
+    finally:
+        root.handlers, level = saved
+        root.setLevel(level)
+
+
+def _run_queued(lines: int, delay: float, sample: str = "") -> dict:
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    logs.configure_sampling(sample)
+    logs.setup_logging("INFO", stream=SlowStream(delay))
+    try:
+        return asyncio.run(_measure(lines))
+    finally:
+        logs.shutdown_logging()
+        logs.configure_sampling()
+        root.handlers, level = saved
+        root.setLevel(level)
+
+
+def run(lines: int = 5000, write_delay_us: float = 200) -> dict:
+    delay = write_delay_us / 1e6
+    return {
+        "direct": _run_direct(lines, delay),
+        "queued": _run_queued(lines, delay),
+        "queued_sampled_1_in_10": _run_queued(lines, delay, "MeterValues=10"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--write-delay-us", type=float, default=200)
+    args = parser.parse_args()
+    for name, result in run(args.lines, args.write_delay_us).items():
+        print(f"{name:24s} " + " ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
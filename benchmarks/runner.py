@@ -0,0 +1,287 @@
+"""Microbenchmarks of simulator hot paths, with a JSON baseline to compare against.
+
+Each case times one operation the simulator repeats per connector, frame or
+CALL: MeterValues payload construction (1.6J and 2.0.1), ``EVSEModel``
+lookups and transaction bookkeeping, ``GetConfiguration`` with and without
+a key filter, ``ConnectorSim.to_status()`` and OCPP frame encode/decode as
+``ocpp.ChargePoint`` does them.  A case is run in loops of auto-sized
+length, and the best of ``--repeat`` rounds is reported in ns per
+operation.
+
+    python -m benchmarks.runner                        # print results
+    python -m benchmarks.runner --save baseline.json   # record a baseline
+    python -m benchmarks.runner --compare baseline.json --threshold 0.15
+
+``--compare`` exits with status 1 when any case is slower than the
+baseline by more than ``--threshold`` (a fraction).  Baselines are only
+comparable on the same machine and Python.  ``tests/test_bench_runner.py``
+runs every case once under pytest so they keep working.
+"""
+import argparse
+import asyncio
+import importlib.metadata
+import itertools
+import json
+import platform
+import sys
+import time
+import uuid
+from dataclasses import asdict
+from typing import Callable
+
+from ocpp.charge_point import camel_to_snake_case, remove_nones, snake_to_camel_case
+from ocpp.messages import Call, unpack, validate_payload
+from ocpp.v16 import call
+
+from sim.meter import take_sample, to_v16_meter_value, to_v201_meter_value
+from sim.ocpp_handlers import EVSEChargePoint
+from sim.state_machine import EVSEModel, EVSEState
+
+# a case builds its state and returns the operation to time
+Case = Callable[[], Callable[[], object]]
+CASES: dict[str, Case] = {}
+
+
+def case(name: str):
+    def register(factory: Case) -> Case:
+        CASES[name] = factory
+        return factory
+    return register
+
+
+def _sync(coro):
+    """Result of a coroutine that never suspends, without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _samples(count: int = 4):
+    model = EVSEModel(1, max_power_w=7000)
+    model.start_session(1)
+    c = model.get(1)
+    return [take_sample(c, c.power_w, 10, "2024-01-01T00:00:00+00:00") for _ in range(count)]
+
+
+@case("meter_v16_payload")
+def _meter_v16():
+    samples = _samples()
+
+    def op():
+        return call.MeterValuesPayload(
+            connector_id=1, transaction_id=1, meter_value=[to_v16_meter_value(s) for s in samples]
+        )
+    return op
+
+
+@case("meter_v201_payload")
+def _meter_v201():
+    samples = _samples()
+    return lambda: [to_v201_meter_value(s) for s in samples]
+
+
+@case("take_sample")
+def _take_sample():
+    model = EVSEModel(1, max_power_w=7000)
+    model.start_session(1)
+    c = model.get(1)
+    return lambda: take_sample(c, c.power_w, 10, "t")
+
+
+def _busy_model(connectors: int = 200) -> EVSEModel:
+    model = EVSEModel(connectors, max_power_w=7000)
+    for cid in range(1, connectors + 1, 2):
+        model.assign_tx(cid, 1000 + cid)
+    return model
+
+
+@case("model_get")
+def _model_get():
+    model = _busy_model()
+    return lambda: model.get(101)
+
+
+@case("model_get_by_tx")
+def _model_get_by_tx():
+    model = _busy_model()
+    return lambda: model.get_by_tx(1101)
+
+
+@case("model_assign_clear_tx")
+def _model_assign_clear():
+    model = _busy_model()
+    tx_ids = itertools.count(10 ** 6)
+
+    def op():
+        tx = next(tx_ids)
+        model.assign_tx(2, tx)
+        model.clear_tx(tx)
+    return op
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+class _NullConnection:
+    async def send(self, message):
+        pass
+
+    async def recv(self):
+        await asyncio.Future()
+
+
+def _charge_point() -> EVSEChargePoint:
+    return EVSEChargePoint("BENCH", _NullConnection(), EVSEModel(2), _noop, _noop, _noop)
+
+
+@case("get_configuration_all")
+def _get_configuration_all():
+    cp = _charge_point()
+    return lambda: _sync(cp.on_get_configuration())
+
+
+@case("get_configuration_keys")
+def _get_configuration_keys():
+    cp = _charge_point()
+    keys = ["HeartbeatInterval", "MeterValueSampleInterval", "NumberOfConnectors", "NoSuchKey"]
+    return lambda: _sync(cp.on_get_configuration(key=keys))
+
+
+@case("connector_to_status")
+def _to_status():
+    model = EVSEModel(1)
+    c = model.get(1)
+    c.state = EVSEState.SUSPENDED_EVSE
+    return c.to_status
+
+
+@case("frame_encode")
+def _frame_encode():
+    payload = call.MeterValuesPayload(
+        connector_id=1, transaction_id=1, meter_value=[to_v16_meter_value(s) for s in _samples()]
+    )
+
+    def op():
+        # ocpp.ChargePoint.call without the send
+        msg = Call(
+            unique_id=str(uuid.uuid4()),
+            action="MeterValues",
+            payload=remove_nones(snake_to_camel_case(asdict(payload))),
+        )
+        validate_payload(msg, "1.6")
+        return msg.to_json()
+    return op
+
+
+@case("frame_decode")
+def _frame_decode():
+    payload = call.MeterValuesPayload(
+        connector_id=1, transaction_id=1, meter_value=[to_v16_meter_value(s) for s in _samples()]
+    )
+    raw = Call("1", "MeterValues", remove_nones(snake_to_camel_case(asdict(payload)))).to_json()
+
+    def op():
+        # ocpp.ChargePoint.route_message up to the handler call
+        msg = unpack(raw)
+        validate_payload(msg, "1.6")
+        return camel_to_snake_case(msg.payload)
+    return op
+
+
+def measure(op: Callable[[], object], repeat: int = 5, min_time: float = 0.1) -> dict:
+    """Best of ``repeat`` rounds, each looping ``op`` for at least ``min_time`` s."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            op()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            op()
+        best = min(best, time.perf_counter() - t0)
+    ns = best / loops * 1e9
+    return {"ns_per_op": round(ns, 1), "ops_per_sec": round(1e9 / ns), "loops": loops}
+
+
+def run(names=None, repeat: int = 5, min_time: float = 0.1) -> dict:
+    results = {}
+    for name, factory in CASES.items():
+        if names and not any(n in name for n in names):
+            continue
+        results[name] = measure(factory(), repeat, min_time)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "ocpp": importlib.metadata.version("ocpp"),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """Per-case change against ``baseline``; ``regression`` marks slowdowns above ``threshold``."""
+    rows = []
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            rows.append({"name": name, "ns_per_op": now["ns_per_op"], "change": None, "regression": False})
+            continue
+        change = now["ns_per_op"] / before["ns_per_op"] - 1
+        rows.append({
+            "name": name,
+            "baseline_ns": before["ns_per_op"],
+            "ns_per_op": now["ns_per_op"],
+            "change": round(change, 3),
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("filter", nargs="*", help="only cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, e.g. 0.15 = 15%%")
+    args = parser.parse_args()
+
+    current = run(args.filter, args.repeat, args.min_time)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, indent=2)
+    if not args.compare:
+        for name, result in current["results"].items():
+            print(f"{name:24s} {result['ns_per_op']:12.1f} ns/op {result['ops_per_sec']:>12,d} ops/s")
+        return
+
+    with open(args.compare, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        if row["change"] is None:
+            print(f"{row['name']:24s} {row['ns_per_op']:12.1f} ns/op   (new)")
+            continue
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:24s} {row['baseline_ns']:12.1f} -> {row['ns_per_op']:12.1f} ns/op "
+            f"{row['change']:+8.1%}{flag}"
+        )
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
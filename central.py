@@ -32,6 +32,31 @@ connected_cps: Dict[str, "CentralSystem"] = {}
 # === ตัวนับ transactionId ที่ CSMS จะ “ออกเลข” ให้ StartTransaction.conf ===
 _tx_counter = itertools.count(1)
 
+# === ดัชนี transactionId -> {"cpid", "connector_id", "session"} ของทุก CP ===
+# "session" คือ dict เดียวกับใน cp.active_tx ทำให้หาได้แบบ O(1) แม้ไม่รู้ cpid
+# ต้องอัปเดตผ่าน index_tx / unindex_tx ทุกครั้งที่ start, stop หรือ CP หลุด
+tx_index: Dict[int, Dict[str, Any]] = {}
+
+
+def index_tx(cpid: str, connector_id: int, session: Dict[str, Any]) -> None:
+    tx_index[session["transaction_id"]] = {
+        "cpid": cpid,
+        "connector_id": connector_id,
+        "session": session,
+    }
+
+
+def unindex_tx(transaction_id: int) -> Dict[str, Any] | None:
+    return tx_index.pop(transaction_id, None)
+
+
+def find_tx(transaction_id: int, cpid: str | None = None) -> Dict[str, Any] | None:
+    """Index entry of an active transaction, optionally only if it belongs to ``cpid``."""
+    entry = tx_index.get(transaction_id)
+    if entry is None or (cpid is not None and entry["cpid"] != cpid):
+        return None
+    return entry
+
 
 def make_display_message_call(message_type: str, uri: str):
     """
@@ -100,6 +125,13 @@ class CentralSystem(ChargePoint):
         return status
 
     # เมธอดสั่งหยุดชาร์จ
+    def drop_transactions(self):
+        """Remove this CP's transactions from ``tx_index``, e.g. when it disconnects."""
+        for info in self.active_tx.values():
+            entry = tx_index.get(info["transaction_id"])
+            if entry is not None and entry["session"] is info:
+                unindex_tx(info["transaction_id"])
+
     async def remote_stop(self, transaction_id: int):
         """
         ส่ง RemoteStopTransaction ด้วย transaction_id
@@ -289,7 +321,12 @@ class CentralSystem(ChargePoint):
         if pending and "vid" in pending:
             info["vid"] = pending["vid"]
         # เก็บทั้ง transactionId และข้อมูลอื่นเพื่อให้ API ภายนอกเรียกดูได้
+        stale = self.active_tx.get(int(connector_id))
+        if stale is not None:
+            # StopTransaction ของรอบก่อนหายไป: อย่าให้ tx เก่าค้างในดัชนี
+            unindex_tx(stale["transaction_id"])
         self.active_tx[int(connector_id)] = info
+        index_tx(self.id, int(connector_id), info)
         # ยกเลิก watchdog ถ้ามี
         task = self.no_session_tasks.pop(int(connector_id), None)
         if task:
@@ -307,10 +344,10 @@ class CentralSystem(ChargePoint):
 # ดักรับ StopTransaction เพื่อเคลียร์สถานะ
     @on(Action.StopTransaction)
     async def on_stop_transaction(self, transaction_id, meter_stop, timestamp, **kwargs):
-        for c_id, info in list(self.active_tx.items()):
-            if info.get("transaction_id") == int(transaction_id):
-                self.active_tx.pop(c_id, None)
-                break
+        entry = find_tx(int(transaction_id), self.id)
+        if entry is not None:
+            unindex_tx(int(transaction_id))
+            self.active_tx.pop(entry["connector_id"], None)
         logging.info(f"← StopTransaction from {self.id}: tx={transaction_id}, meterStop={meter_stop}")
         resp_cls = getattr(call_result, "StopTransaction", None)
         if resp_cls is None:
@@ -357,7 +394,7 @@ class StartReq(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 class StopReq(BaseModel):
-    cpid: str
+    cpid: str | None = None
     transactionId: int | None = None
     connectorId: int | None = None
     idTag: str | None = None
@@ -406,16 +443,23 @@ async def api_start(req: StartReq):
 
 @app.post("/api/v1/stop")
 async def api_stop(req: StopReq):
-    cp = connected_cps.get(req.cpid)
+    """Stop by ``transactionId`` (``cpid`` optional) or by ``cpid`` + ``connectorId``."""
+    if req.cpid is None:
+        if req.transactionId is None:
+            raise HTTPException(status_code=422, detail="cpid or transactionId required")
+        entry = find_tx(req.transactionId)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="No matching active transaction")
+        cpid = entry["cpid"]
+    else:
+        cpid = req.cpid
+    cp = connected_cps.get(cpid)
     if not cp:
-        raise HTTPException(status_code=404, detail=f"ChargePoint '{req.cpid}' not connected")
+        raise HTTPException(status_code=404, detail=f"ChargePoint '{cpid}' not connected")
     try:
         tx_id = req.transactionId
         if tx_id is not None:
-            if not any(
-                session.get("transaction_id") == tx_id
-                for session in cp.active_tx.values()
-            ):
+            if find_tx(tx_id, cpid) is None:
                 raise HTTPException(status_code=404, detail="No matching active transaction")
         elif req.connectorId is not None:
             session = cp.active_tx.get(req.connectorId)
@@ -426,7 +470,7 @@ async def api_stop(req: StopReq):
         status = await cp.remote_stop(tx_id)
         if status != RemoteStartStopStatus.accepted:
             raise HTTPException(status_code=409, detail=f"RemoteStop rejected: {status}")
-        return {"ok": True, "transactionId": tx_id, "message": "RemoteStopTransaction sent"}
+        return {"ok": True, "cpid": cpid, "transactionId": tx_id, "message": "RemoteStopTransaction sent"}
     except HTTPException:
         raise
     except Exception as e:
@@ -523,7 +567,9 @@ async def main():
         try:
             await central.start()
         finally:
-            connected_cps.pop(cp_id, None)
+            central.drop_transactions()
+            if connected_cps.get(cp_id) is central:
+                connected_cps.pop(cp_id, None)
             logging.info(f"[Central] Disconnected: {cp_id}")
 
     # คอนโซลคำสั่งแบบง่าย ๆ ใน thread แยก (ใช้ควบคู่กับ REST ก็ได้)
@@ -532,6 +578,7 @@ async def main():
         คำสั่ง:
           start <cpid> <connector> <idTag>
           stop  <cpid> <connector|txId>
+          stop  <txId>
           config <cpid> <key> <value>
           ls
           map <cpid>
@@ -581,17 +628,20 @@ async def main():
                     txid = session.get("transaction_id", num)
                     asyncio.run_coroutine_threadsafe(cp.remote_stop(txid), loop)
                     continue
-                tx_match = None
-                for info in cp.active_tx.values():
-                    if info.get("transaction_id") == num:
-                        tx_match = num
-                        break
-                if tx_match is not None:
-                    asyncio.run_coroutine_threadsafe(cp.remote_stop(tx_match), loop)
+                if find_tx(num, cpid) is not None:
+                    asyncio.run_coroutine_threadsafe(cp.remote_stop(num), loop)
                 else:
                     asyncio.run_coroutine_threadsafe(cp.unlock_connector(num), loop)
                 continue
-            print("Unknown command. Examples: start CP_123 1 TESTTAG | stop CP_123 42 | ls | map CP_123")
+            if parts[0] == "stop" and len(parts) == 2:
+                entry = find_tx(int(parts[1]))
+                cp = connected_cps.get(entry["cpid"]) if entry else None
+                if not cp:
+                    print("No such transaction")
+                    continue
+                asyncio.run_coroutine_threadsafe(cp.remote_stop(int(parts[1])), loop)
+                continue
+            print("Unknown command. Examples: start CP_123 1 TESTTAG | stop CP_123 42 | stop 42 | ls | map CP_123")
 
     loop = asyncio.get_running_loop()
     threading.Thread(target=console_thread, args=(loop,), daemon=True).start()
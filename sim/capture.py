@@ -0,0 +1,117 @@
+import gzip
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+IN = "in"
+OUT = "out"
+OPEN = "open"
+
+
+class FrameRing:
+    """Fixed-budget ring of raw OCPP frames for one charge point connection.
+
+    Recording only appends ``(monotonic, direction, frame)`` – the frame is the
+    exact object received from / handed to the WebSocket, so there is no
+    per-frame formatting or copying.  The oldest frames are evicted once either
+    ``max_frames`` or ``max_bytes`` (sum of frame lengths) is exceeded.
+    """
+
+    def __init__(self, max_frames: int, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.frames: deque = deque(maxlen=max_frames)
+        self.bytes = 0
+        self.dropped = 0
+        # anchor to translate monotonic stamps into wall-clock time on dump
+        self._wall0 = time.time()
+        self._mono0 = time.monotonic()
+
+    def record(self, direction: str, frame) -> None:
+        frames = self.frames
+        if len(frames) == frames.maxlen:
+            self.bytes -= len(frames[0][2])
+            self.dropped += 1
+        frames.append((time.monotonic(), direction, frame))
+        self.bytes += len(frame)
+        while self.bytes > self.max_bytes and len(frames) > 1:
+            self.bytes -= len(frames.popleft()[2])
+            self.dropped += 1
+
+    def snapshot(self) -> list:
+        return list(self.frames)
+
+    def wall_time(self, mono: float) -> float:
+        return self._wall0 + (mono - self._mono0)
+
+
+class CapturingConnection:
+    """Wrap a WebSocket so every frame through ``send``/``recv`` is recorded."""
+
+    def __init__(self, connection, ring: FrameRing):
+        self._connection = connection
+        self._ring = ring
+        ring.record(OPEN, "")
+
+    async def send(self, message):
+        self._ring.record(OUT, message)
+        await self._connection.send(message)
+
+    async def recv(self):
+        message = await self._connection.recv()
+        self._ring.record(IN, message)
+        return message
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+# one ring per charge point id; kept across reconnects so a post-mortem also
+# covers the frames that led up to a disconnect
+rings: dict[str, FrameRing] = {}
+
+
+def ring_for(cpid: str, max_frames: int, max_bytes: int) -> FrameRing:
+    ring = rings.get(cpid)
+    if ring is None:
+        ring = rings[cpid] = FrameRing(max_frames, max_bytes)
+    return ring
+
+
+def dump(directory: str, snapshots: dict[str, tuple[FrameRing, list]] | None = None) -> tuple[str, int]:
+    """Write captured frames of all charge points to a gzip JSONL file.
+
+    ``snapshots`` should be taken on the event loop (see :func:`snapshot_all`)
+    so this function can run in a worker thread without racing the recorders.
+    Returns the file path and the number of frames written.
+    """
+    if snapshots is None:
+        snapshots = snapshot_all()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = os.path.join(directory, f"frames-{stamp}.jsonl.gz")
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        for cpid, (ring, frames) in snapshots.items():
+            for mono, direction, frame in frames:
+                if isinstance(frame, bytes):
+                    frame = frame.decode("utf-8", errors="replace")
+                fh.write(
+                    json.dumps(
+                        {
+                            "cpid": cpid,
+                            "mono": mono,
+                            "time": ring.wall_time(mono),
+                            "dir": direction,
+                            "frame": frame,
+                        }
+                    )
+                )
+                fh.write("\n")
+                count += 1
+    return path, count
+
+
+def snapshot_all() -> dict[str, tuple[FrameRing, list]]:
+    return {cpid: (ring, ring.snapshot()) for cpid, ring in rings.items()}
@@ -1,6 +1,8 @@
 import os
 
 CSMS_URL = os.getenv("CSMS_URL", "ws://127.0.0.1:9000/ocpp")
+# protocol spoken to the CSMS: "1.6" (OCPP 1.6J) or "2.0.1"
+OCPP_VERSION = os.getenv("OCPP_VERSION", "1.6")
 # TLS certificate configuration (optional)
 TLS_CA_CERT = os.getenv("TLS_CA_CERT")
 TLS_CLIENT_CERT = os.getenv("TLS_CLIENT_CERT")
@@ -19,6 +21,50 @@ ICCID = os.getenv("ICCID", "0")
 
 METER_START_WH = int(os.getenv("METER_START_WH", "0"))
 METER_RATE_W = int(os.getenv("METER_RATE_W", "7000"))          # 7 kW
-METER_PERIOD_SEC = int(os.getenv("METER_PERIOD_SEC", "10"))     # ส่งทุก 10s
+# shared power cabinet (0 = none, every gun draws METER_RATE_W): whole
+# modules of CABINET_POWER_W / CABINET_MODULES are split across active
+# sessions by CABINET_POLICY (equal | fifo | soc), capped at METER_RATE_W per gun
+CABINET_POWER_W = float(os.getenv("CABINET_POWER_W", "0"))
+CABINET_MODULES = int(os.getenv("CABINET_MODULES", "6"))
+CABINET_POLICY = os.getenv("CABINET_POLICY", "equal")
+# EV battery size used to advance SoC with delivered energy (0 = SoC stays
+# at the value given on /plug/{cid}?soc=...)
+EV_BATTERY_WH = float(os.getenv("EV_BATTERY_WH", "0"))
+METER_PERIOD_SEC = float(os.getenv("METER_PERIOD_SEC", "10"))   # ส่งทุก 10s
 SEND_HEARTBEAT_SEC = int(os.getenv("SEND_HEARTBEAT_SEC", "60")) # heartbeat
+RECONNECT_DELAY_SEC = float(os.getenv("RECONNECT_DELAY_SEC", "5"))
+# pause after connecting before BootNotification, and how long a connector
+# stays Finishing after a stop before going back to Available
+BOOT_DELAY_SEC = float(os.getenv("BOOT_DELAY_SEC", "1"))
+FINISHING_DELAY_SEC = float(os.getenv("FINISHING_DELAY_SEC", "1"))
 HTTP_PORT = int(os.getenv("HTTP_PORT", "7071"))
+# meter samples are taken every METER_PERIOD_SEC but sent together: one
+# MeterValues (1.6J) / TransactionEvent(Updated) (2.0.1) per
+# METER_BATCH_SAMPLES samples or METER_BATCH_MAX_SEC (0 = off), whichever
+# comes first; at most METER_BATCH_BUFFER samples are held per connector
+METER_BATCH_SAMPLES = int(os.getenv("METER_BATCH_SAMPLES", "1"))
+METER_BATCH_MAX_SEC = float(os.getenv("METER_BATCH_MAX_SEC", "0"))
+METER_BATCH_BUFFER = int(os.getenv("METER_BATCH_BUFFER", "100"))
+# in-memory capture of raw OCPP frames per connection (0 disables);
+# dumped to CAPTURE_DIR via POST /capture/dump or SIGUSR1
+CAPTURE_FRAMES = int(os.getenv("CAPTURE_FRAMES", "2000"))
+CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", str(2 * 1024 * 1024)))
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "captures")
+# logging: records are written by a background thread; LOG_SAMPLE keeps
+# 1 in N events per category, LOG_RATE caps events/sec per category,
+# e.g. LOG_SAMPLE="MeterValues=10" LOG_RATE="StatusNotification=20"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+LOG_RATE = os.getenv("LOG_RATE", "")
+OCPP_LOG_LEVEL = os.getenv("OCPP_LOG_LEVEL", "WARNING")
+# route the CSMS link through the in-process impairment proxy (sim/impair.py);
+# IMPAIR_CONFIG is a JSON file with profiles and per-CPID routes
+IMPAIR_CONFIG = os.getenv("IMPAIR_CONFIG")
+IMPAIR_PORT = int(os.getenv("IMPAIR_PORT", "0"))
+# generated EV traffic (sim/traffic.py): "default" for the built-in
+# time-of-day profile or a JSON profile file; unset = manual sessions only.
+# TRAFFIC_SPEED compresses simulated time (60 = one simulated minute per second)
+TRAFFIC_PROFILE = os.getenv("TRAFFIC_PROFILE")
+TRAFFIC_SEED = int(os.environ["TRAFFIC_SEED"]) if os.getenv("TRAFFIC_SEED") else None
+TRAFFIC_SPEED = float(os.getenv("TRAFFIC_SPEED", "1"))
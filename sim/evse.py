@@ -1,23 +1,31 @@
 import asyncio
 import json
 import logging
+import signal
+from collections import Counter
 from datetime import datetime, timezone
-import random
 import ssl
+import time
+import uuid
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
 import websockets
 
 from ocpp.v16 import call
+from ocpp.v201 import call as call201
 from ocpp.v16.enums import Action, Measurand
 # from ocpp.transport import WebSocketTransport
 
 from .config import *
-from .state_machine import EVSEModel, EVSEState
+from .state_machine import Cabinet, EVSEModel, EVSEState
+from . import capture, impair, logs, routing, traffic
+from .meter import SampleBuffer, take_sample, to_v16_meter_value, to_v201_meter_value
 from .ocpp_handlers import EVSEChargePoint
+from .ocpp201_handlers import EVSEChargePoint201
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+logs.configure_sampling(LOG_SAMPLE, LOG_RATE)
+routing.install()
 
 app = FastAPI(title="ChargeForge-Sim Control")
 
@@ -26,7 +34,64 @@ app = FastAPI(title="ChargeForge-Sim Control")
 async def health():
     return {"ok": True}
 
-model = EVSEModel(connectors=CONNECTORS, meter_start_wh=METER_START_WH)
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "ocpp_version": OCPP_VERSION,
+        "calls": dict(stats),
+        "meter": {
+            "frames": meter_stats["frames"],
+            "samples": meter_stats["samples"],
+            "dropped": sum(b.dropped for b in _meter_buffers.values()),
+        },
+        "power_w": {cid: c.power_w for cid, c in model.connectors.items()},
+        "log_suppressed": dict(logs.suppressed),
+    }
+
+
+@app.get("/impair/metrics")
+async def impair_metrics():
+    proxy = getattr(app.state, "impair_proxy", None)
+    if proxy is None:
+        raise HTTPException(status_code=404, detail="impairment proxy not enabled")
+    return proxy.summary()
+
+
+@app.get("/traffic")
+async def traffic_stats():
+    gen = getattr(app.state, "traffic", None)
+    if gen is None:
+        raise HTTPException(status_code=404, detail="traffic generator not enabled")
+    return gen.stats()
+
+
+async def dump_capture():
+    # snapshot on the loop, compress and write in a worker thread
+    snapshots = capture.snapshot_all()
+    path, frames = await asyncio.to_thread(capture.dump, CAPTURE_DIR, snapshots)
+    logs.event("Capture", "Frame capture dumped", path=path, frames=frames)
+    return path, frames
+
+
+@app.post("/capture/dump")
+async def capture_dump():
+    if CAPTURE_FRAMES <= 0:
+        raise HTTPException(status_code=409, detail="frame capture disabled")
+    path, frames = await dump_capture()
+    return {"ok": True, "path": path, "frames": frames}
+
+def make_model() -> EVSEModel:
+    return EVSEModel(
+        connectors=CONNECTORS,
+        meter_start_wh=METER_START_WH,
+        max_power_w=METER_RATE_W,
+        battery_wh=EV_BATTERY_WH,
+        cabinet=Cabinet(CABINET_POWER_W, CABINET_MODULES, CABINET_POLICY) if CABINET_POWER_W > 0 else None,
+    )
+
+
+model = make_model()
 
 
 def _get_connector(connector_id: int):
@@ -36,79 +101,297 @@ def _get_connector(connector_id: int):
         raise HTTPException(status_code=404, detail="unknown connector")
 cp = None  # type: ignore
 
+# outgoing CALLs per action, so 1.6J and 2.0.1 runs of the same workload
+# can be compared by message rate
+stats: Counter = Counter()
+
+# OCPP 2.0.1 per-transaction TransactionEvent seqNo
+_tx_seq: dict[str, int] = {}
+
+# meter samples per connector waiting to go out as one multi-sample frame,
+# and totals to compare batched against single-sample runs
+_meter_buffers: dict[int, SampleBuffer] = {}
+meter_stats: Counter = Counter()
+
+
+def _is_v201() -> bool:
+    return OCPP_VERSION == "2.0.1"
+
+
+async def _call(req):
+    stats[type(req).__name__[:-len("Payload")]] += 1
+    return await cp.call(req)  # type: ignore
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
 # -------- helper: send StatusNotification --------
 async def send_status(connector_id: int):
-    global cp
     c = model.get(connector_id)
-    st = c.to_status()
-    req = call.StatusNotificationPayload(
-        connector_id=connector_id,
-        error_code=c.error_code,
-        status=st,
-        timestamp=datetime.now(timezone.utc).isoformat()
+    if _is_v201():
+        st = c.to_connector_status()
+        req = call201.StatusNotificationPayload(
+            timestamp=_now(),
+            connector_status=st,
+            evse_id=connector_id,
+            connector_id=1,
+        )
+    else:
+        st = c.to_status()
+        req = call.StatusNotificationPayload(
+            connector_id=connector_id,
+            error_code=c.error_code,
+            status=st,
+            timestamp=_now()
+        )
+    await _call(req)
+    logs.event(
+        "StatusNotification", "StatusNotification sent",
+        connector=connector_id, status=st, error=c.error_code,
     )
-    await cp.call(req)  # type: ignore
-    logging.info(
-        f"StatusNotification sent: connector={connector_id}, status={st}, error={c.error_code}"
+
+# -------- OCPP 2.0.1 TransactionEvent --------
+async def send_transaction_event(
+    event_type: str,
+    c,
+    tx_id: str,
+    trigger_reason: str,
+    meter_value: list | None = None,
+    **tx_info,
+):
+    seq_no = _tx_seq.get(tx_id, 0)
+    _tx_seq[tx_id] = seq_no + 1
+    req = call201.TransactionEventPayload(
+        event_type=event_type,
+        timestamp=_now(),
+        trigger_reason=trigger_reason,
+        seq_no=seq_no,
+        transaction_info={"transactionId": tx_id, **tx_info},
+        evse={"id": c.id, "connectorId": 1},
+        id_token={"idToken": c.id_tag, "type": "Central"} if event_type == "Started" else None,
+        meter_value=meter_value or None,
     )
+    return await _call(req)
+
+# -------- batched metering --------
+def _stop_metering(connector_id: int) -> None:
+    """Stop sampling a connector and drop whatever is still buffered."""
+    model.end_session(connector_id)
+    _meter_buffers.pop(connector_id, None)
+
+def _meter_buffer(connector_id: int) -> SampleBuffer:
+    buf = _meter_buffers.get(connector_id)
+    if buf is None:
+        buf = _meter_buffers[connector_id] = SampleBuffer(
+            METER_BATCH_SAMPLES, METER_BATCH_MAX_SEC, METER_BATCH_BUFFER
+        )
+    return buf
+
+async def flush_meter_samples(c):
+    """Send the connector's buffered samples in one frame.
+
+    1.6J: one MeterValues with several ``meterValue`` entries; 2.0.1: one
+    TransactionEvent(Updated).  If the send fails the batch goes back into the
+    bounded buffer and is retried on the next flush (e.g. after reconnect).
+    """
+    buf = _meter_buffers.get(c.id)
+    if not buf:
+        return
+    first_at = buf.first_at
+    batch = buf.drain()
+    try:
+        if _is_v201():
+            await send_transaction_event(
+                "Updated", c, c.tx_id, "MeterValuePeriodic",
+                meter_value=[to_v201_meter_value(s) for s in batch],
+                chargingState="Charging",
+            )
+        else:
+            req = call.MeterValuesPayload(
+                connector_id=c.id, meter_value=[to_v16_meter_value(s) for s in batch]
+            )
+            await _call(req)
+    except BaseException:
+        buf.restore(batch, first_at)
+        raise
+    meter_stats["frames"] += 1
+    meter_stats["samples"] += len(batch)
 
 # -------- local state transitions --------
-async def start_local(connector_id: int, id_tag: str):
+async def start_local(connector_id: int, id_tag: str, remote_start_id: int | None = None):
     c = model.get(connector_id)
     c.id_tag = id_tag
-    c.session_active = True
+    model.start_session(connector_id)
     c.state = EVSEState.CHARGING
     await send_status(connector_id)
+    if _is_v201():
+        # 2.0.1: the charging station owns the transaction id
+        tx_id = uuid.uuid4().hex
+        model.assign_tx(connector_id, tx_id)
+        extra = {"remoteStartId": remote_start_id} if remote_start_id is not None else {}
+        await send_transaction_event(
+            "Started", c, tx_id,
+            "RemoteStart" if remote_start_id is not None else "Authorized",
+            meter_value=[{
+                "timestamp": _now(),
+                "sampledValue": [{
+                    "value": round(c.meter_wh / 1000, 3),
+                    "context": "Transaction.Begin",
+                    "measurand": "Energy.Active.Import.Register",
+                    "unitOfMeasure": {"unit": "kWh"},
+                }],
+            }],
+            chargingState="Charging",
+            **extra,
+        )
+        logs.event("TransactionEvent", "TransactionEvent(Started)", connector=connector_id, tx_id=tx_id)
+        return
     # inform CSMS and store transaction id
     req = call.StartTransactionPayload(
         connector_id=connector_id,
         id_tag=id_tag,
         meter_start=c.meter_wh,
-        timestamp=datetime.now(timezone.utc).isoformat(),
+        timestamp=_now(),
     )
-    conf = await cp.call(req)  # type: ignore
+    conf = await _call(req)
     model.assign_tx(connector_id, conf.transaction_id)
-    logging.info(
-        f"StartTransaction confirmed: connector={connector_id}, tx_id={conf.transaction_id}"
+    logs.event(
+        "StartTransaction", "StartTransaction confirmed",
+        connector=connector_id, tx_id=conf.transaction_id,
     )
 
-async def stop_local_by_tx(tx_id: int, meter_stop: int | None = None):
+async def stop_local_by_tx(tx_id, meter_stop: int | None = None, reason: str = "Local"):
     c = model.get_by_tx(tx_id)
     if c is None:
         return
     if meter_stop is None:
         meter_stop = c.meter_wh
-    req = call.StopTransactionPayload(
-        transaction_id=tx_id,
-        meter_stop=meter_stop,
-        timestamp=datetime.now(timezone.utc).isoformat(),
-    )
-    await cp.call(req)  # type: ignore
+    # samples still buffered belong to this transaction; nothing sampled
+    # after this point may end up in the next session's first batch
+    await flush_meter_samples(c)
+    _stop_metering(c.id)
+    if _is_v201():
+        await send_transaction_event(
+            "Ended", c, tx_id,
+            "RemoteStop" if reason == "Remote" else "StopAuthorized",
+            meter_value=[{
+                "timestamp": _now(),
+                "sampledValue": [{
+                    "value": round(meter_stop / 1000, 3),
+                    "context": "Transaction.End",
+                    "measurand": "Energy.Active.Import.Register",
+                    "unitOfMeasure": {"unit": "kWh"},
+                }],
+            }],
+            chargingState="Idle",
+            stoppedReason=reason,
+        )
+        # no TransactionEvent may follow Ended, so stop metering right away
+        model.clear_tx(tx_id)
+        _tx_seq.pop(tx_id, None)
+        logs.event("TransactionEvent", "TransactionEvent(Ended)", connector=c.id, tx_id=tx_id, reason=reason)
+    else:
+        req = call.StopTransactionPayload(
+            transaction_id=tx_id,
+            meter_stop=meter_stop,
+            timestamp=_now(),
+        )
+        await _call(req)
+        model.clear_tx(tx_id)
+        logs.event("StopTransaction", "StopTransaction sent", connector=c.id, tx_id=tx_id, meter_stop=meter_stop)
     c.state = EVSEState.FINISHING
     await send_status(c.id)
-    await asyncio.sleep(1)
+    await asyncio.sleep(FINISHING_DELAY_SEC)
+    if c.session_active:
+        # a new session started on this connector while Finishing
+        return
     c.state = EVSEState.AVAILABLE
     c.id_tag = None
     await send_status(c.id)
-    model.clear_tx(tx_id)
     return
 
 # -------- OCPP client main --------
-async def ocpp_client():
+def make_ssl_context(url: str):
+    if not url.startswith("wss://"):
+        return None
+    ssl_context = ssl.create_default_context(cafile=TLS_CA_CERT) if TLS_CA_CERT else ssl.create_default_context()
+    if TLS_CLIENT_CERT and TLS_CLIENT_KEY:
+        ssl_context.load_cert_chain(TLS_CLIENT_CERT, TLS_CLIENT_KEY)
+    return ssl_context
+
+async def run_connected():
+    """Boot, report connector statuses, then heartbeat and meter until cancelled."""
+    await asyncio.sleep(BOOT_DELAY_SEC)
+    # boot_req = call.BootNotificationPayload(
+    #     charge_point_model="CF-Sim",
+    #     charge_point_vendor="ChargeForge",
+    # )
+    # await cp.call(boot_req)
+    # for cid in model.connectors.keys():
+    #     await send_status(cid)
+    if _is_v201():
+        boot_req = call201.BootNotificationPayload(
+            charging_station={
+                "model": CP_MODEL,
+                "vendorName": CP_VENDOR,
+                "serialNumber": CP_SERIAL_NUMBER,
+                "firmwareVersion": FIRMWARE_VERSION,
+                "modem": {"iccid": ICCID},
+            },
+            reason="PowerUp",
+        )
+        await _call(boot_req)
+        for cid in model.connectors.keys():
+            await send_status(cid)
+    else:
+        boot_req = call.BootNotificationPayload(
+            charge_point_model=CP_MODEL,
+            charge_point_vendor=CP_VENDOR,
+            charge_point_serial_number=CP_SERIAL_NUMBER,
+            firmware_version=FIRMWARE_VERSION,
+            iccid=ICCID,
+        )
+        await _call(boot_req)
+        for cid in model.connectors.keys():
+            await send_status(cid)
+        # send connector 0 status to mimic real chargers
+        root_status = call.StatusNotificationPayload(
+            connector_id=0,
+            error_code="NoError",
+            status=EVSEState.AVAILABLE,
+            timestamp=_now(),
+        )
+        await _call(root_status)
+
+    # tasks: heartbeat, metering
+    await asyncio.gather(send_heartbeat_loop(), send_meter_loop())
+
+async def ocpp_client(csms_url: str | None = None, connect=None):
+    """Connect to the CSMS and keep reconnecting.
+
+    ``connect`` replaces ``websockets.connect``, e.g. with
+    ``sim.transport.MemoryServer.connect`` for an in-process CSMS.
+    """
     global cp
+    connect = connect or websockets.connect
     cpid = CPID
-    url = f"{CSMS_URL}/{cpid}"
-    ssl_context = None
-    if CSMS_URL.startswith("wss://"):
-        ssl_context = ssl.create_default_context(cafile=TLS_CA_CERT) if TLS_CA_CERT else ssl.create_default_context()
-        if TLS_CLIENT_CERT and TLS_CLIENT_KEY:
-            ssl_context.load_cert_chain(TLS_CLIENT_CERT, TLS_CLIENT_KEY)
+    csms_url = csms_url or CSMS_URL
+    url = f"{csms_url}/{cpid}"
+    ssl_context = make_ssl_context(csms_url)
+    subprotocol, cp_cls = (
+        ("ocpp2.0.1", EVSEChargePoint201) if _is_v201() else ("ocpp1.6", EVSEChargePoint)
+    )
     while True:
         try:
-            logging.info(f"Connecting to CSMS: {url}")
-            async with websockets.connect(url, subprotocols=['ocpp1.6'], ssl=ssl_context) as ws:
-                cp = EVSEChargePoint(
-                    cpid, ws, model,
+            logs.event("Connection", "Connecting to CSMS", url=url)
+            async with connect(url, subprotocols=[subprotocol], ssl=ssl_context) as ws:
+                conn = ws
+                if CAPTURE_FRAMES > 0:
+                    ring = capture.ring_for(cpid, CAPTURE_FRAMES, CAPTURE_MAX_BYTES)
+                    conn = capture.CapturingConnection(ws, ring)
+                cp = cp_cls(
+                    cpid, conn, model,
                     send_status_cb=send_status,
                     start_cb=start_local,
                     stop_cb=stop_local_by_tx
@@ -122,145 +405,66 @@ async def ocpp_client():
             #         stop_cb=stop_local_by_tx
             #     )
                 # Boot → Available
-                asyncio.create_task(cp.start())
-                await asyncio.sleep(1)
-                # boot_req = call.BootNotificationPayload(
-                #     charge_point_model="CF-Sim",
-                #     charge_point_vendor="ChargeForge",
-                # )
-                # await cp.call(boot_req)
-                # for cid in model.connectors.keys():
-                #     await send_status(cid)
-                boot_req = call.BootNotificationPayload(
-                    charge_point_model=CP_MODEL,
-                    charge_point_vendor=CP_VENDOR,
-                    charge_point_serial_number=CP_SERIAL_NUMBER,
-                    firmware_version=FIRMWARE_VERSION,
-                    iccid=ICCID,
-                )
-                await cp.call(boot_req)
-                for cid in model.connectors.keys():
-                    await send_status(cid)
-                # send connector 0 status to mimic real chargers
-                root_status = call.StatusNotificationPayload(
-                    connector_id=0,
-                    error_code="NoError",
-                    status=EVSEState.AVAILABLE,
-                    timestamp=datetime.now(timezone.utc).isoformat(),
-                )
-                await cp.call(root_status)
-
-                # tasks: heartbeat, metering
-                hb_task = asyncio.create_task(send_heartbeat_loop())
-                mv_task = asyncio.create_task(send_meter_loop())
-                await asyncio.gather(hb_task, mv_task)
+                # cp.start() only returns by raising ConnectionClosed, so racing
+                # it against the session notices a dropped link immediately –
+                # also while a CALL (e.g. the boot) is still waiting for a reply
+                tasks = [
+                    asyncio.create_task(cp.start()),
+                    asyncio.create_task(run_connected()),
+                ]
+                try:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for t in done:
+                        t.result()
+                finally:
+                    for t in tasks:
+                        t.cancel()
         except Exception as e:
-            logging.error(f"OCPP client error: {e}")
-            await asyncio.sleep(5)
+            logs.event("Connection", "OCPP client error", level=logging.ERROR, error=repr(e))
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
 
 async def send_heartbeat_loop():
     while True:
         try:
-            req = call.HeartbeatPayload()
-            await cp.call(req)  # type: ignore
+            req = call201.HeartbeatPayload() if _is_v201() else call.HeartbeatPayload()
+            await _call(req)
         except Exception as e:
-            logging.error(f"Heartbeat failed: {e}")
+            logs.event("Heartbeat", "Heartbeat failed", level=logging.ERROR, error=repr(e))
             return
         await asyncio.sleep(SEND_HEARTBEAT_SEC)
 
 async def send_meter_loop():
     while True:
-        t = datetime.now(timezone.utc).isoformat()
+        t = _now()
         for c in model.connectors.values():
             if not c.session_active:
                 continue
-            # เพิ่มพลังงาน (Wh) ตาม rate * period
-            added_wh = int((METER_RATE_W * METER_PERIOD_SEC) / 3600)
-            c.meter_wh += added_wh
-
-            # base values for measurands
-            base_voltage = 230.0
-            base_power = float(METER_RATE_W)
-            base_current = base_power / base_voltage
-
-            # apply small random deltas
-            current_a = base_current + random.uniform(-1.0, 1.0)
-            voltage_v = base_voltage + random.uniform(-1.0, 1.0)
-            power_w = base_power + random.uniform(-100.0, 100.0)
-            temp_c = 28.0 + random.uniform(-0.5, 0.5)
-            soc = 0.0
-
-            energy_kwh = c.meter_wh / 1000
-
-            sampled = [
-                {
-                    "value": f"{energy_kwh:.3f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "Energy.Active.Import.Register",
-                    "location": "Body",
-                    "unit": "kWh",
-                },
-                {
-                    "value": f"{current_a:.2f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "Current.Import",
-                    "location": "Body",
-                    "unit": "A",
-                },
-                {
-                    "value": f"{voltage_v:.1f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "Voltage",
-                    "location": "Body",
-                    "unit": "V",
-                },
-                {
-                    "value": f"{power_w/1000:.1f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "Power.Active.Import",
-                    "location": "Body",
-                    "unit": "kW",
-                },
-                {
-                    "value": f"{soc:.0f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "SoC",
-                    "location": "EV",
-                    "unit": "Percent",
-                },
-                {
-                    "value": f"{temp_c:.1f}",
-                    "context": "Sample.Clock",
-                    "format": "Raw",
-                    "measurand": "Temperature",
-                    "location": "Outlet",
-                    "unit": "Celsius",
-                },
-            ]
-            mv = [{"timestamp": t, "sampledValue": sampled}]
-
-            req = call.MeterValuesPayload(connector_id=c.id, meter_value=mv)
-            await cp.call(req)  # type: ignore
-            logging.info(
-                "MeterValues: cid=%s, energy(kWh)=%.3f, current(A)=%.2f, voltage(V)=%.1f, power(kW)=%.1f",
-                c.id,
-                energy_kwh,
-                current_a,
-                voltage_v,
-                power_w / 1000,
+            # power granted by the cabinet, updated only when sessions start/stop
+            sample = take_sample(c, c.power_w, METER_PERIOD_SEC, t)
+            # sampled every period, sent once METER_BATCH_SAMPLES are buffered
+            # or the oldest is METER_BATCH_MAX_SEC old
+            buf = _meter_buffer(c.id)
+            now = time.monotonic()
+            buf.add(sample, now)
+            if buf.due(now):
+                await flush_meter_samples(c)
+            logs.event(
+                "MeterValues", "MeterValues",
+                cid=c.id,
+                energy_wh=sample.energy_wh,
+                current_a=sample.current_a,
+                voltage_v=sample.voltage_v,
+                power_w=sample.power_w,
             )
         await asyncio.sleep(METER_PERIOD_SEC)
 
 # -------- HTTP control for simulating plug/unplug & local start/stop --------
 @app.post("/plug/{connector_id}")
-async def plug(connector_id: int, id_tag: str | None = None, auto_start: bool = False):
+async def plug(connector_id: int, id_tag: str | None = None, auto_start: bool = False, soc: float | None = None):
     c = _get_connector(connector_id)
     c.plugged = True
+    if soc is not None:
+        c.soc = soc
     c.state = EVSEState.PREPARING
     await send_status(connector_id)
     if auto_start:
@@ -273,6 +477,7 @@ async def unplug(connector_id: int):
     c.plugged = False
     if c.tx_id is not None:
         model.clear_tx(c.tx_id)
+    _stop_metering(connector_id)
     c.state = EVSEState.AVAILABLE
     c.id_tag = None
     await send_status(connector_id)
@@ -331,11 +536,63 @@ async def resume(connector_id: int):
     await send_status(connector_id)
     return {"ok": True, "connector": connector_id, "state": EVSEState.AVAILABLE}
 
+# -------- generated traffic (sim/traffic.py) --------
+async def _traffic_arrive(connector_id: int, info: dict):
+    await plug(connector_id, id_tag=f"EV-{connector_id}", auto_start=True)
+
+async def _traffic_stop(connector_id: int, info: dict):
+    # runs after the arrival completed, so a missing tx means the start failed
+    c = model.get(connector_id)
+    if c.tx_id is None:
+        if c.session_active:
+            raise RuntimeError("session has no transaction id (start failed)")
+        return
+    await stop_local_by_tx(c.tx_id)
+
+async def _traffic_depart(connector_id: int, info: dict):
+    await unplug(connector_id)
+
+def _traffic_available(connector_id: int) -> bool:
+    # leave connectors alone that are faulted or in use via the HTTP API
+    c = model.get(connector_id)
+    return not c.plugged and c.state == EVSEState.AVAILABLE
+
+def make_traffic(profile: traffic.TrafficProfile, seed: int | None = None, speed: float = 1.0):
+    schedule = traffic.TrafficSchedule(
+        profile, model.connectors, METER_RATE_W, seed=seed, available=_traffic_available
+    )
+    return traffic.TrafficGenerator(
+        schedule, _traffic_arrive, _traffic_stop, _traffic_depart, speed=speed
+    )
+
 async def main():
+    logs.setup_logging(LOG_LEVEL, LOG_FORMAT, OCPP_LOG_LEVEL)
+    if CAPTURE_FRAMES > 0 and hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1, lambda: asyncio.create_task(dump_capture())
+        )
+    csms_url = CSMS_URL
+    if IMPAIR_CONFIG:
+        proxy = impair.ImpairmentProxy.from_config(
+            CSMS_URL, impair.load_config(IMPAIR_CONFIG),
+            port=IMPAIR_PORT, ssl=make_ssl_context(CSMS_URL),
+        )
+        await proxy.start()
+        app.state.impair_proxy = proxy
+        csms_url = proxy.url
+        logs.event("Impair", "Routing CSMS link through impairment proxy", url=proxy.url)
+    if TRAFFIC_PROFILE:
+        gen = make_traffic(traffic.load_profile(TRAFFIC_PROFILE), TRAFFIC_SEED, TRAFFIC_SPEED)
+        app.state.traffic = gen
+        asyncio.create_task(gen.run())
     # run OCPP client and HTTP API together
-    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=HTTP_PORT, loop="asyncio", log_level="info"))
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="0.0.0.0", port=HTTP_PORT, loop="asyncio", log_level="info",
+        # keep uvicorn on the root queue handler instead of its own stderr handlers
+        log_config=None,
+    ))
     api_task = asyncio.create_task(server.serve())
-    await ocpp_client()
+    await ocpp_client(csms_url)
     api_task.cancel()
 
 if __name__ == "__main__":
@@ -0,0 +1,366 @@
+"""In-process WebSocket impairment proxy for CSMS resilience testing.
+
+Sits between charge points and the CSMS (``ws://proxy/<prefix>/<cpid>`` is
+forwarded to ``<upstream>/<cpid>``) and degrades the link per CPID according
+to scripted profiles – no tc/netem needed, so it runs in CI.
+
+Profiles are a list of phases, each lasting ``duration_sec``; the timeline is
+shared by every connection of the proxy (t=0 is proxy start) and optionally
+loops.  A phase may set:
+
+- ``latency_ms`` / ``jitter_ms``: one-way delay added to every frame
+- ``bandwidth_kbps``: serialisation delay per direction (0 = unlimited)
+- ``drop_prob``: chance per frame that the connection is cut (TCP abort)
+- ``half_open``: stop reading both sockets; nothing is forwarded or closed and
+  pings go unanswered, like a dead cellular bearer
+
+Example config (``IMPAIR_CONFIG``)::
+
+    {
+      "profiles": {
+        "cellular": {"loop": true, "phases": [
+          {"duration_sec": 60, "latency_ms": 150, "jitter_ms": 100, "bandwidth_kbps": 64},
+          {"duration_sec": 15, "half_open": true},
+          {"duration_sec": 30, "latency_ms": 400, "drop_prob": 0.01}
+        ]}
+      },
+      "routes": {"Gresgying*": "cellular", "*": null}
+    }
+
+Routes are fnmatch patterns checked in order; ``null`` means no impairment.
+
+Standalone::
+
+    python -m sim.impair --listen 127.0.0.1:9100 --upstream ws://127.0.0.1:9000/ocpp --config profiles.json
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import websockets
+
+
+@dataclass
+class Phase:
+    duration_sec: float = 0.0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    bandwidth_kbps: float = 0.0
+    drop_prob: float = 0.0
+    half_open: bool = False
+
+
+CLEAN = Phase()
+
+
+class Profile:
+    def __init__(self, phases: list[Phase], loop: bool = False):
+        self.phases = phases
+        self.loop = loop
+        self.length = sum(p.duration_sec for p in phases)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Profile":
+        return cls([Phase(**p) for p in data.get("phases", [])], bool(data.get("loop", False)))
+
+    def phase_at(self, t: float) -> Phase:
+        """Phase active ``t`` seconds after proxy start (last phase holds)."""
+        if not self.phases:
+            return CLEAN
+        if self.loop and self.length > 0:
+            t %= self.length
+        for p in self.phases:
+            if t < p.duration_sec:
+                return p
+            t -= p.duration_sec
+        return self.phases[-1]
+
+
+class RouteMetrics:
+    """Counters for one CPID, plus CALL→response latency seen by the charger."""
+
+    def __init__(self):
+        self.connections = 0
+        self.closed = 0
+        self.injected_drops = 0
+        self.half_open_periods = 0
+        self.frames = {"up": 0, "down": 0}
+        self.bytes = {"up": 0, "down": 0}
+        self.rtt_ms: deque = deque(maxlen=1000)
+        self.reconnect_gaps_sec: deque = deque(maxlen=100)
+        self.last_closed: float | None = None
+        # charger CALLs waiting for their reply, keyed by unique id
+        self.pending: dict[str, float] = {}
+
+    def summary(self) -> dict:
+        rtt = sorted(self.rtt_ms)
+        gaps = list(self.reconnect_gaps_sec)
+        return {
+            "connections": self.connections,
+            "closed": self.closed,
+            "injected_drops": self.injected_drops,
+            "half_open_periods": self.half_open_periods,
+            "frames": dict(self.frames),
+            "bytes": dict(self.bytes),
+            "rtt_ms": {
+                "count": len(rtt),
+                "p50": rtt[len(rtt) // 2] if rtt else None,
+                "p95": rtt[int(len(rtt) * 0.95) - 1] if rtt else None,
+                "max": rtt[-1] if rtt else None,
+            },
+            "reconnect_gap_sec": {
+                "count": len(gaps),
+                "mean": sum(gaps) / len(gaps) if gaps else None,
+                "max": max(gaps) if gaps else None,
+            },
+        }
+
+
+class ImpairmentProxy:
+    def __init__(
+        self,
+        upstream: str,
+        profiles: dict[str, Profile] | None = None,
+        routes: list[tuple[str, str | None]] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ssl=None,
+        seed: int | None = None,
+    ):
+        self.upstream = upstream.rstrip("/")
+        self.profiles = profiles or {}
+        self.routes = routes or []
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.metrics: dict[str, RouteMetrics] = {}
+        self._rng = random.Random(seed)
+        self._links: dict[str, set] = {}
+        self._t0 = time.monotonic()
+        self.server = None
+
+    @classmethod
+    def from_config(cls, upstream: str, config: dict, **kwargs) -> "ImpairmentProxy":
+        profiles = {name: Profile.from_dict(p) for name, p in config.get("profiles", {}).items()}
+        routes = list(config.get("routes", {}).items())
+        return cls(upstream, profiles, routes, **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ocpp"
+
+    def profile_for(self, cpid: str) -> Profile | None:
+        for pattern, name in self.routes:
+            if fnmatch.fnmatchcase(cpid, pattern):
+                return self.profiles.get(name) if name else None
+        return None
+
+    def set_route(self, pattern: str, profile: str | None) -> None:
+        """Route ``pattern`` to ``profile`` ahead of existing routes."""
+        self.routes.insert(0, (pattern, profile))
+
+    def phase(self, cpid: str) -> Phase:
+        profile = self.profile_for(cpid)
+        if profile is None:
+            return CLEAN
+        return profile.phase_at(time.monotonic() - self._t0)
+
+    def drop(self, cpid: str) -> int:
+        """Abort every live connection of ``cpid``; returns how many were cut."""
+        links = list(self._links.get(cpid, ()))
+        for link in links:
+            link.abort()
+        if links:
+            self.metrics[cpid].injected_drops += len(links)
+        return len(links)
+
+    def summary(self) -> dict:
+        return {cpid: m.summary() for cpid, m in self.metrics.items()}
+
+    async def start(self):
+        self.server = await websockets.serve(
+            self._handle, self.host, self.port,
+            subprotocols=["ocpp1.6", "ocpp2.0.1"],
+        )
+        if self.port == 0 and self.server.sockets:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, client, path=None):
+        if path is None:
+            path = getattr(client, "path", "")
+        cpid = path.rsplit("/", 1)[-1] or "UNKNOWN"
+        m = self.metrics.setdefault(cpid, RouteMetrics())
+        now = time.monotonic()
+        if m.last_closed is not None:
+            m.reconnect_gaps_sec.append(now - m.last_closed)
+        m.connections += 1
+        protocols = [client.subprotocol] if client.subprotocol else None
+        try:
+            upstream = await websockets.connect(
+                f"{self.upstream}/{cpid}", subprotocols=protocols, ssl=self.ssl
+            )
+        except Exception as e:
+            logging.warning(f"impair: upstream connect failed for {cpid}: {e}")
+            m.closed += 1
+            m.last_closed = time.monotonic()
+            return
+        link = _Link(self, cpid, client, upstream, m)
+        self._links.setdefault(cpid, set()).add(link)
+        try:
+            await link.run()
+        finally:
+            self._links[cpid].discard(link)
+            m.closed += 1
+            m.last_closed = time.monotonic()
+
+
+class _Link:
+    """One proxied connection: a delayed, ordered pipe per direction."""
+
+    def __init__(self, proxy: ImpairmentProxy, cpid: str, client, upstream, metrics: RouteMetrics):
+        self.proxy = proxy
+        self.cpid = cpid
+        self.client = client
+        self.upstream = upstream
+        self.m = metrics
+        self.paused = False
+
+    def abort(self):
+        for ws in (self.client, self.upstream):
+            ws.transport.abort()
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self._pump(self.client, self.upstream, "up")),
+            asyncio.create_task(self._pump(self.upstream, self.client, "down")),
+            asyncio.create_task(self._watch_half_open()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.m.pending.clear()
+            await self.client.close()
+            await self.upstream.close()
+
+    async def _watch_half_open(self):
+        while True:
+            half_open = self.proxy.phase(self.cpid).half_open
+            if half_open != self.paused:
+                self.paused = half_open
+                for ws in (self.client, self.upstream):
+                    if half_open:
+                        ws.transport.pause_reading()
+                    else:
+                        ws.transport.resume_reading()
+                if half_open:
+                    self.m.half_open_periods += 1
+            await asyncio.sleep(0.05)
+
+    async def _pump(self, src, dst, direction: str):
+        queue: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.create_task(self._deliver(queue, dst, direction))
+        link_free = 0.0
+        last_release = 0.0
+        rng = self.proxy._rng
+        try:
+            async for frame in src:
+                now = time.monotonic()
+                phase = self.proxy.phase(self.cpid)
+                if phase.drop_prob and rng.random() < phase.drop_prob:
+                    self.m.injected_drops += 1
+                    self.abort()
+                    return
+                if phase.bandwidth_kbps:
+                    link_free = max(link_free, now) + len(frame) * 8 / (phase.bandwidth_kbps * 1000)
+                else:
+                    link_free = now
+                delay = phase.latency_ms / 1000
+                if phase.jitter_ms:
+                    delay += rng.uniform(0, phase.jitter_ms / 1000)
+                # TCP keeps order, so jitter never lets a frame overtake another
+                last_release = max(link_free + delay, last_release)
+                self._track(frame, direction, now)
+                queue.put_nowait((last_release, frame))
+        finally:
+            sender.cancel()
+
+    async def _deliver(self, queue: asyncio.Queue, dst, direction: str):
+        while True:
+            release, frame = await queue.get()
+            wait = release - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await dst.send(frame)
+            self.m.frames[direction] += 1
+            self.m.bytes[direction] += len(frame)
+            if direction == "down":
+                self._settle(frame)
+
+    def _track(self, frame, direction: str, now: float):
+        # remember when the charger's CALLs arrive so the reply's delivery
+        # back to the charger gives the latency it actually experiences
+        if direction != "up":
+            return
+        try:
+            msg = json.loads(frame)
+        except ValueError:
+            return
+        if isinstance(msg, list) and len(msg) > 2 and msg[0] == 2:
+            self.m.pending[msg[1]] = now
+
+    def _settle(self, frame):
+        try:
+            msg = json.loads(frame)
+        except ValueError:
+            return
+        if isinstance(msg, list) and len(msg) > 2 and msg[0] in (3, 4):
+            sent = self.m.pending.pop(msg[1], None)
+            if sent is not None:
+                self.m.rtt_ms.append((time.monotonic() - sent) * 1000)
+
+
+def load_config(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+async def _serve(args):
+    host, port = args.listen.rsplit(":", 1)
+    proxy = ImpairmentProxy.from_config(
+        args.upstream, load_config(args.config), host=host, port=int(port), seed=args.seed
+    )
+    await proxy.start()
+    logging.info(f"Impairment proxy on {proxy.url} -> {proxy.upstream}")
+    while True:
+        await asyncio.sleep(args.report_sec)
+        print(json.dumps(proxy.summary()), flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WebSocket impairment proxy for OCPP links")
+    parser.add_argument("--listen", default="127.0.0.1:9100")
+    parser.add_argument("--upstream", required=True, help="CSMS base URL, e.g. ws://127.0.0.1:9000/ocpp")
+    parser.add_argument("--config", required=True, help="JSON file with profiles and routes")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--report-sec", type=float, default=10.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from collections import Counter
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
+
+_CONTAINERS = (list, dict, set, bytearray)
+
+
+def _snapshot(value):
+    return copy.copy(value) if isinstance(value, _CONTAINERS) else value
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves ``msg % args`` to the writer thread.
+
+    The stock ``prepare()`` formats every record on the calling thread, which
+    is the event loop for the simulator.  Only exception text is rendered
+    eagerly because the traceback does not survive the hand-off.
+
+    Since formatting happens later, ``args`` and event ``fields`` that are
+    builtin containers (list/dict/set/bytearray) are shallow-copied here.
+    Any other mutable object passed to a log call must not be modified
+    afterwards, or the line shows the later value.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if isinstance(record.args, tuple):
+            if any(isinstance(a, _CONTAINERS) for a in record.args):
+                record.args = tuple(_snapshot(a) for a in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {k: _snapshot(v) for k, v in record.args.items()}
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {k: _snapshot(v) for k, v in fields.items()}
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    """``TEXT_FORMAT`` followed by ``key=value`` pairs of structured fields."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(
+                f"{k}={v:.6g}" if isinstance(v, float) else f"{k}={v}"
+                for k, v in fields.items()
+            )
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class CategoryLimiter:
+    """Keep 1 in ``every`` events, then at most ``rate`` per second (0 = no cap)."""
+
+    def __init__(self, every: int = 1, rate: float = 0.0):
+        self.every = max(1, every)
+        self.rate = rate
+        self._n = 0
+        self._tokens = rate
+        self._last = time.monotonic()
+
+    def allow(self) -> bool:
+        self._n += 1
+        if self.every > 1 and self._n % self.every:
+            return False
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+_limiters: dict[str, CategoryLimiter] = {}
+# events dropped by sampling/rate limits, per category
+suppressed: Counter = Counter()
+_listener: logging.handlers.QueueListener | None = None
+
+
+def parse_category_map(spec: str) -> dict[str, float]:
+    """Parse ``"MeterValues=10,StatusNotification=2"`` into a dict."""
+    result: dict[str, float] = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        result[name.strip()] = float(value)
+    return result
+
+
+def configure_sampling(sample: str = "", rate: str = "") -> None:
+    """Install per-category limits from ``LOG_SAMPLE``/``LOG_RATE`` style specs."""
+    _limiters.clear()
+    every = parse_category_map(sample)
+    per_sec = parse_category_map(rate)
+    for name in set(every) | set(per_sec):
+        _limiters[name] = CategoryLimiter(int(every.get(name, 1)), per_sec.get(name, 0.0))
+
+
+def event(category: str, msg: str, level: int = logging.INFO, **fields) -> None:
+    """Log a structured event, subject to the category's sampling/rate limit.
+
+    The check happens before a ``LogRecord`` is created, so suppressed events
+    cost one counter increment.  ``fields`` are rendered by the formatter on
+    the writer thread.
+    """
+    limiter = _limiters.get(category)
+    if limiter is not None and not limiter.allow():
+        suppressed[category] += 1
+        return
+    logger = logging.getLogger(f"sim.{category}")
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"fields": fields})
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", ocpp_level: str = "WARNING", stream=None) -> None:
+    """Route all logging through a queue drained by a background writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(DeferredQueueHandler(q))
+    root.setLevel(level)
+    # the ocpp package logs every raw frame at INFO; frame capture covers that
+    logging.getLogger("ocpp").setLevel(ocpp_level)
+    _listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
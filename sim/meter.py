@@ -0,0 +1,197 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+
+from .state_machine import ConnectorSim
+
+
+@dataclass
+class MeterSample:
+    """One reading of the simulated meter, independent of the OCPP version."""
+
+    timestamp: str
+    energy_wh: int
+    current_a: float
+    voltage_v: float
+    power_w: float
+    soc: float
+    temp_c: float
+
+
+def take_sample(c: ConnectorSim, rate_w: float, period_sec: float, timestamp: str) -> MeterSample:
+    """Advance the connector's energy register by one period and sample it."""
+    # เพิ่มพลังงาน (Wh) ตาม rate * period; carry the fraction so short
+    # periods still add up instead of truncating to 0 Wh per tick
+    wh = (rate_w * period_sec) / 3600 + c.wh_residual
+    c.meter_wh += int(wh)
+    c.wh_residual = wh - int(wh)
+    if c.battery_wh > 0:
+        c.soc = min(100.0, c.soc + int(wh) / c.battery_wh * 100)
+
+    # base values for measurands
+    base_voltage = 230.0
+    base_power = float(rate_w)
+    base_current = base_power / base_voltage
+
+    # apply small random deltas (none while the cabinet grants no power)
+    drawing = 1.0 if rate_w > 0 else 0.0
+    return MeterSample(
+        timestamp=timestamp,
+        energy_wh=c.meter_wh,
+        current_a=base_current + drawing * random.uniform(-1.0, 1.0),
+        voltage_v=base_voltage + random.uniform(-1.0, 1.0),
+        power_w=base_power + drawing * random.uniform(-100.0, 100.0),
+        soc=c.soc,
+        temp_c=28.0 + random.uniform(-0.5, 0.5),
+    )
+
+
+class SampleBuffer:
+    """Samples of one connector waiting to go out together in one frame.
+
+    A batch is due once it holds ``max_samples`` samples or its oldest sample
+    is ``max_age_sec`` old (0 disables the age limit).  The buffer never holds
+    more than ``capacity`` samples; when sends fail for a while the oldest
+    samples are discarded and counted in ``dropped``.
+    """
+
+    def __init__(self, max_samples: int = 1, max_age_sec: float = 0.0, capacity: int = 100):
+        self.max_samples = max(1, max_samples)
+        self.max_age_sec = max_age_sec
+        self.samples: deque = deque(maxlen=max(capacity, self.max_samples))
+        self.first_at: float | None = None
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, sample: MeterSample, now: float) -> None:
+        if len(self.samples) == self.samples.maxlen:
+            self.dropped += 1
+        if not self.samples:
+            self.first_at = now
+        self.samples.append(sample)
+
+    def due(self, now: float) -> bool:
+        if not self.samples:
+            return False
+        if len(self.samples) >= self.max_samples:
+            return True
+        return bool(self.max_age_sec) and now - self.first_at >= self.max_age_sec
+
+    def drain(self) -> list[MeterSample]:
+        batch = list(self.samples)
+        self.samples.clear()
+        self.first_at = None
+        return batch
+
+    def restore(self, batch: list[MeterSample], first_at: float) -> None:
+        """Put an unsent batch back in front of samples added meanwhile."""
+        newer = list(self.samples)
+        self.samples.clear()
+        for sample in batch + newer:
+            self.add(sample, first_at)
+
+
+def to_v16_meter_value(s: MeterSample) -> dict:
+    """Render a sample as an OCPP 1.6 ``MeterValue`` entry."""
+    return {
+        "timestamp": s.timestamp,
+        "sampledValue": [
+            {
+                "value": f"{s.energy_wh / 1000:.3f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "Energy.Active.Import.Register",
+                "location": "Body",
+                "unit": "kWh",
+            },
+            {
+                "value": f"{s.current_a:.2f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "Current.Import",
+                "location": "Body",
+                "unit": "A",
+            },
+            {
+                "value": f"{s.voltage_v:.1f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "Voltage",
+                "location": "Body",
+                "unit": "V",
+            },
+            {
+                "value": f"{s.power_w/1000:.1f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "Power.Active.Import",
+                "location": "Body",
+                "unit": "kW",
+            },
+            {
+                "value": f"{s.soc:.0f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "SoC",
+                "location": "EV",
+                "unit": "Percent",
+            },
+            {
+                "value": f"{s.temp_c:.1f}",
+                "context": "Sample.Clock",
+                "format": "Raw",
+                "measurand": "Temperature",
+                "location": "Outlet",
+                "unit": "Celsius",
+            },
+        ],
+    }
+
+
+def to_v201_meter_value(s: MeterSample, context: str = "Sample.Periodic") -> dict:
+    """Render a sample as an OCPP 2.0.1 ``MeterValueType`` (numeric values).
+
+    2.0.1 has no Temperature measurand, so that reading is 1.6-only.
+    """
+    return {
+        "timestamp": s.timestamp,
+        "sampledValue": [
+            {
+                "value": round(s.energy_wh / 1000, 3),
+                "context": context,
+                "measurand": "Energy.Active.Import.Register",
+                "location": "Outlet",
+                "unitOfMeasure": {"unit": "kWh"},
+            },
+            {
+                "value": round(s.current_a, 2),
+                "context": context,
+                "measurand": "Current.Import",
+                "location": "Outlet",
+                "unitOfMeasure": {"unit": "A"},
+            },
+            {
+                "value": round(s.voltage_v, 1),
+                "context": context,
+                "measurand": "Voltage",
+                "location": "Outlet",
+                "unitOfMeasure": {"unit": "V"},
+            },
+            {
+                "value": round(s.power_w / 1000, 1),
+                "context": context,
+                "measurand": "Power.Active.Import",
+                "location": "Outlet",
+                "unitOfMeasure": {"unit": "kW"},
+            },
+            {
+                "value": round(s.soc),
+                "context": context,
+                "measurand": "SoC",
+                "location": "EV",
+                "unitOfMeasure": {"unit": "Percent"},
+            },
+        ],
+    }
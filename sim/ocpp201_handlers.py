@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from ocpp.routing import on
+from ocpp.v201 import call_result, ChargePoint as CP
+from ocpp.v201.enums import (
+    Action,
+    RequestStartStopStatusType,
+    DataTransferStatusType,
+    UnlockStatusType,
+)
+from .routing import CachedRoutes
+from .state_machine import EVSEState
+
+class EVSEChargePoint201(CachedRoutes, CP):
+    """OCPP 2.0.1 flavour of :class:`EVSEChargePoint`.
+
+    Each simulated connector is exposed as its own EVSE (``evseId`` ==
+    connector id, ``connectorId`` == 1), which is how single-gun-per-EVSE
+    DC units such as the Gresgying cabinets report themselves.
+    """
+
+    def __init__(self, id, connection, model, send_status_cb, start_cb, stop_cb):
+        super().__init__(id, connection)
+        self.model = model
+        self.send_status = send_status_cb
+        self.on_start_local = start_cb
+        self.on_stop_local = stop_cb
+
+    # ====== CSMS -> EVSE ======
+
+    @on(Action.RequestStartTransaction)
+    async def on_request_start(self, id_token, remote_start_id, evse_id=None, **kwargs):
+        cid = int(evse_id or 1)
+        try:
+            c = self.model.get(cid)
+        except KeyError:
+            logging.warning(
+                f"RequestStartTransaction rejected: evse {cid} does not exist"
+            )
+            return call_result.RequestStartTransactionPayload(
+                status=RequestStartStopStatusType.rejected
+            )
+        # reject when not plugged or already charging
+        if not c.plugged or c.session_active:
+            return call_result.RequestStartTransactionPayload(
+                status=RequestStartStopStatusType.rejected
+            )
+        asyncio.create_task(
+            self.on_start_local(cid, id_token["id_token"], remote_start_id=remote_start_id)
+        )
+        return call_result.RequestStartTransactionPayload(
+            status=RequestStartStopStatusType.accepted
+        )
+
+    @on(Action.RequestStopTransaction)
+    async def on_request_stop(self, transaction_id, **kwargs):
+        # only stop if the transaction id belongs to an active session
+        if self.model.get_by_tx(transaction_id) is None:
+            return call_result.RequestStopTransactionPayload(
+                status=RequestStartStopStatusType.rejected
+            )
+        asyncio.create_task(self.on_stop_local(transaction_id, None, reason="Remote"))
+        return call_result.RequestStopTransactionPayload(
+            status=RequestStartStopStatusType.accepted
+        )
+
+    @on(Action.UnlockConnector)
+    async def on_unlock_connector(self, evse_id, connector_id, **kwargs):
+        cid = int(evse_id)
+        try:
+            c = self.model.get(cid)
+        except KeyError:
+            logging.info(f"UnlockConnector rejected: evse {cid} does not exist")
+            return call_result.UnlockConnectorPayload(status=UnlockStatusType.unknown_connector)
+        if c.session_active:
+            logging.info(f"UnlockConnector rejected: evse {cid} is in session")
+            return call_result.UnlockConnectorPayload(
+                status=UnlockStatusType.ongoing_authorized_transaction
+            )
+        c.plugged = False
+        c.state = EVSEState.AVAILABLE
+        asyncio.create_task(self.send_status(cid))
+        logging.info(f"EVSE {cid} unlocked")
+        return call_result.UnlockConnectorPayload(status=UnlockStatusType.unlocked)
+
+    @on(Action.DataTransfer)
+    async def on_data_transfer(self, vendor_id, **kwargs):
+        return call_result.DataTransferPayload(status=DataTransferStatusType.unknown_vendor_id)
@@ -11,10 +11,11 @@ from ocpp.v16.enums import (
     DataTransferStatus,
     UnlockStatus,
 )
+from .routing import CachedRoutes
 from .state_machine import EVSEState
 from .config import CONNECTORS
 
-class EVSEChargePoint(CP):
+class EVSEChargePoint(CachedRoutes, CP):
     def __init__(self, id, connection, model, send_status_cb, start_cb, stop_cb):
         super().__init__(id, connection)
         self.model = model
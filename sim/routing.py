@@ -0,0 +1,97 @@
+"""Class-level caching of ``@on``/``@after`` route maps.
+
+``ocpp.ChargePoint.__init__`` builds ``self.route_map`` with
+``create_route_map(self)``, which probes every name ever decorated with
+``@on``/``@after`` in the process (``ocpp.routing.routables``) with
+``getattr`` on the new instance.  That reflection is the same for every
+instance of a class, yet it is repeated on each reconnect and for each
+charger in fleet mode.
+
+:class:`CachedRoutes` classes build the table once per class from the
+unbound handlers and give each new instance a view that binds handlers on
+lookup.  :func:`install` hooks ``create_route_map`` as seen by
+``ocpp.charge_point``; it is called explicitly by the simulator and only
+takes effect on the ``ocpp`` release it was written against (see
+``sim/requirements.txt``).  Classes without the mixin, or any other
+``ocpp`` version, keep going through the library's own implementation.
+"""
+import importlib.metadata
+import logging
+import types
+from collections.abc import Mapping
+
+import ocpp.charge_point
+from ocpp.routing import create_route_map as _create_route_map
+
+_HANDLER_KEYS = ("_on_action", "_after_action")
+# ocpp release whose ChargePoint.__init__ the hook was checked against
+SUPPORTED_OCPP = "0.26."
+
+
+class CachedRoutes:
+    """Mixin for ``ocpp`` ChargePoint subclasses; list it before the base."""
+
+    _cache_routes = True
+
+    @classmethod
+    def route_table(cls) -> dict:
+        """Unbound route map of ``cls``, built on first use."""
+        table = cls.__dict__.get("_route_table")
+        if table is None:
+            # the library's lookup works on the class too; it just finds
+            # plain functions instead of bound methods
+            table = _create_route_map(cls)
+            cls._route_table = table
+        return table
+
+
+class BoundRoutes(Mapping):
+    """Per-instance view of a class route table.
+
+    Handlers are bound when an action is looked up, i.e. once per inbound
+    CALL, so constructing a charge point costs one small object.
+    """
+
+    __slots__ = ("_table", "_obj")
+
+    def __init__(self, table: dict, obj):
+        self._table = table
+        self._obj = obj
+
+    def __getitem__(self, action) -> dict:
+        return {
+            key: types.MethodType(value, self._obj) if key in _HANDLER_KEYS else value
+            for key, value in self._table[action].items()
+        }
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+def create_route_map(obj) -> Mapping:
+    if getattr(type(obj), "_cache_routes", False):
+        return BoundRoutes(type(obj).route_table(), obj)
+    return _create_route_map(obj)
+
+
+def install() -> bool:
+    """Hook the cached lookup into ``ocpp.charge_point``; return whether it is active.
+
+    Refuses (and logs why) unless the installed ``ocpp`` is the pinned
+    release and ``ChargePoint.__init__`` still builds ``route_map`` through
+    the module-level ``create_route_map`` name.
+    """
+    if ocpp.charge_point.create_route_map is create_route_map:
+        return True
+    version = importlib.metadata.version("ocpp")
+    if not version.startswith(SUPPORTED_OCPP):
+        logging.warning(f"route cache disabled: written for ocpp {SUPPORTED_OCPP}x, found {version}")
+        return False
+    if "create_route_map" not in ocpp.charge_point.ChargePoint.__init__.__code__.co_names:
+        logging.warning("route cache disabled: ocpp ChargePoint no longer calls create_route_map")
+        return False
+    ocpp.charge_point.create_route_map = create_route_map
+    return True
@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+import math
+from typing import Dict, List, Optional
 
 class EVSEState:
     AVAILABLE = "Available"
@@ -11,14 +12,32 @@ class EVSEState:
     OCCUPIED = "Occupied"
 
 class ConnectorSim:
-    def __init__(self, connector_id: int, meter_start_wh: int = 0):
+    def __init__(
+        self,
+        connector_id: int,
+        meter_start_wh: int = 0,
+        max_power_w: float = 0.0,
+        battery_wh: float = 0.0,
+    ):
         self.id = connector_id
         self.state = EVSEState.AVAILABLE
         self.plugged = False
         self.session_active = False
         self.id_tag = None
         self.meter_wh = meter_start_wh
+        # sub-Wh energy not yet reflected in meter_wh
+        self.wh_residual = 0.0
         self.tx_id = None
+        # gun rating and the share of it currently granted by the cabinet
+        self.max_power_w = max_power_w
+        self.power_w = 0.0
+        # EV state of charge, set at plug-in; rises with delivered energy
+        # when the EV battery size is known (battery_wh > 0), else it stays
+        # at the plug-in value.  The SoC policy reads it on reallocation.
+        self.soc = 0.0
+        self.battery_wh = battery_wh
+        # order in which sessions started, for first-come allocation
+        self.session_seq = 0
         # keep track of the current OCPP error code so faults can be
         # injected and cleared via the HTTP API.
         self.error_code = "NoError"
@@ -43,13 +62,85 @@ class ConnectorSim:
             return "Occupied"
         return "Available"
 
+    def to_connector_status(self) -> str:
+        # OCPP 2.0.1 only reports physical availability; session phases
+        # (Preparing/Charging/Suspended*/Finishing) all collapse to Occupied
+        if self.state == EVSEState.AVAILABLE:
+            return "Available"
+        if self.state == EVSEState.FAULTED:
+            return "Faulted"
+        return "Occupied"
+
+class Cabinet:
+    """Power cabinet shared by the connectors of one unit.
+
+    The cabinet holds ``modules`` rectifier modules of equal size and hands
+    whole modules to active connectors according to ``policy``:
+
+    - ``equal``: same number of modules each; spare ones to the earliest sessions
+    - ``fifo``: earliest session takes all it can use, later ones get the rest
+    - ``soc``: modules go one at a time to the EV with the most SoC headroom
+      per module it already has, so emptier batteries get more power
+    """
+
+    POLICIES = ("equal", "fifo", "soc")
+
+    def __init__(self, total_power_w: float, modules: int = 1, policy: str = "equal"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown cabinet policy {policy!r}")
+        self.total_power_w = total_power_w
+        self.modules = max(1, modules)
+        self.module_power_w = total_power_w / self.modules
+        self.policy = policy
+
+    def _module_cap(self, c: ConnectorSim) -> int:
+        if not c.max_power_w:
+            return self.modules
+        return math.ceil(c.max_power_w / self.module_power_w)
+
+    def allocate(self, active: List[ConnectorSim]) -> Dict[int, int]:
+        """Set ``power_w`` of ``active`` (in session start order); return modules per connector."""
+        granted = {c.id: 0 for c in active}
+        spare = self.modules
+        if self.policy == "fifo":
+            for c in active:
+                granted[c.id] = min(self._module_cap(c), spare)
+                spare -= granted[c.id]
+        else:
+            while spare:
+                wanting = [c for c in active if granted[c.id] < self._module_cap(c)]
+                if not wanting:
+                    break
+                if self.policy == "soc":
+                    c = max(wanting, key=lambda c: (100.0 - c.soc) / (granted[c.id] + 1))
+                else:
+                    c = min(wanting, key=lambda c: granted[c.id])
+                granted[c.id] += 1
+                spare -= 1
+        for c in active:
+            power = granted[c.id] * self.module_power_w
+            c.power_w = min(power, c.max_power_w) if c.max_power_w else power
+        return granted
+
+
 class EVSEModel:
-    def __init__(self, connectors=1, meter_start_wh=0):
+    def __init__(
+        self,
+        connectors=1,
+        meter_start_wh=0,
+        max_power_w=0.0,
+        cabinet: Optional[Cabinet] = None,
+        battery_wh: float = 0.0,
+    ):
         self.connectors: Dict[int, ConnectorSim] = {
-            i: ConnectorSim(i, meter_start_wh) for i in range(1, connectors + 1)
+            i: ConnectorSim(i, meter_start_wh, max_power_w, battery_wh)
+            for i in range(1, connectors + 1)
         }
         # map transaction_id -> connector_id for quick lookup
         self.tx_map: Dict[int, int] = {}
+        # without a cabinet every active connector draws its full rating
+        self.cabinet = cabinet
+        self._session_seq = 0
 
     def get(self, cid: int) -> ConnectorSim:
         return self.connectors[cid]
@@ -62,9 +153,23 @@ class EVSEModel:
 
     def assign_tx(self, cid: int, tx_id: int) -> None:
         """Register a transaction for a connector."""
-        self.connectors[cid].tx_id = tx_id
-        self.connectors[cid].session_active = True
+        c = self.connectors[cid]
+        c.tx_id = tx_id
         self.tx_map[tx_id] = cid
+        if not c.session_active:
+            self.start_session(cid)
+
+    def start_session(self, cid: int) -> None:
+        """Start energy delivery on a connector and re-split cabinet power.
+
+        Called when the session is activated, which in 1.6J is before the
+        CSMS has confirmed StartTransaction and assigned a tx id.
+        """
+        c = self.connectors[cid]
+        c.session_active = True
+        self._session_seq += 1
+        c.session_seq = self._session_seq
+        self.reallocate()
 
     def clear_tx(self, tx_id: int) -> Optional[ConnectorSim]:
         """Remove a transaction mapping and return the connector."""
@@ -73,9 +178,28 @@ class EVSEModel:
             return None
         c = self.connectors[cid]
         c.tx_id = None
-        c.session_active = False
+        self.end_session(cid)
         return c
 
+    def end_session(self, cid: int) -> None:
+        """Stop energy delivery on a connector; its tx stays mapped until cleared."""
+        c = self.connectors[cid]
+        c.session_active = False
+        c.power_w = 0.0
+        self.reallocate()
+
+    def reallocate(self) -> None:
+        """Share power among active sessions; runs on session start/stop only."""
+        active = sorted(
+            (c for c in self.connectors.values() if c.session_active),
+            key=lambda c: c.session_seq,
+        )
+        if self.cabinet is None:
+            for c in active:
+                c.power_w = c.max_power_w
+            return
+        self.cabinet.allocate(active)
+
     # ----- state / fault helpers -----
     def set_state(self, cid: int, state: str) -> ConnectorSim:
         c = self.get(cid)
@@ -0,0 +1,113 @@
+"""In-memory OCPP transport.
+
+:func:`memory_pair` returns two connected endpoints with the part of the
+``websockets`` connection interface the ``ocpp`` library and the simulator
+use (``send``, ``recv``, ``close``, ``subprotocol``, async iteration).
+Frames go through an ``asyncio.Queue`` per direction, so there is no
+socket, handshake or framing cost, and closing either end makes pending
+and later ``recv`` calls on both ends raise ``ConnectionClosedOK``, as a
+closed WebSocket would.
+
+:class:`MemoryServer` plays ``websockets.serve``: its :meth:`connect` is a
+drop-in for ``websockets.connect`` (pass it as ``connect=`` to
+``sim.evse.ocpp_client``) and hands the server end to ``handler``.  It lets
+tests, or a benchmark, run thousands of simulated charge points against a
+CSMS in one process without opening a port.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from websockets.exceptions import ConnectionClosedOK
+
+_CLOSED = object()
+
+
+class MemoryConnection:
+    def __init__(self, inbox: asyncio.Queue, outbox: asyncio.Queue, path: str, subprotocol: str | None):
+        self._inbox = inbox
+        self._outbox = outbox
+        self.path = path
+        self.subprotocol = subprotocol
+        self.peer: "MemoryConnection | None" = None
+        self.closed = False
+
+    async def send(self, message) -> None:
+        if self.closed:
+            raise ConnectionClosedOK(None, None)
+        self._outbox.put_nowait(message)
+
+    async def recv(self):
+        if self.closed and self._inbox.empty():
+            raise ConnectionClosedOK(None, None)
+        message = await self._inbox.get()
+        if message is _CLOSED:
+            # leave the marker for any other waiting reader
+            self._inbox.put_nowait(_CLOSED)
+            self.closed = True
+            raise ConnectionClosedOK(None, None)
+        return message
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        for end in (self, self.peer):
+            if end is not None and not end.closed:
+                end.closed = True
+                end._inbox.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except ConnectionClosedOK:
+            raise StopAsyncIteration
+
+
+def memory_pair(path: str = "/", subprotocol: str | None = None) -> tuple[MemoryConnection, MemoryConnection]:
+    """Client and server ends of one in-memory connection."""
+    a_to_b: asyncio.Queue = asyncio.Queue()
+    b_to_a: asyncio.Queue = asyncio.Queue()
+    client = MemoryConnection(b_to_a, a_to_b, path, subprotocol)
+    server = MemoryConnection(a_to_b, b_to_a, path, subprotocol)
+    client.peer, server.peer = server, client
+    return client, server
+
+
+Handler = Callable[[MemoryConnection, str], Awaitable[None]]
+
+
+class MemoryServer:
+    """Accept in-memory connections and run ``handler(connection, path)`` for each."""
+
+    def __init__(self, handler: Handler, url: str = "memory://csms/ocpp"):
+        self.handler = handler
+        self.url = url
+        self.connections = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def connect(self, uri: str, subprotocols=None, **kwargs):
+        path = "/" + uri.split("://", 1)[-1].split("/", 1)[-1]
+        client, server = memory_pair(path, subprotocols[0] if subprotocols else None)
+        self.connections += 1
+        task = asyncio.create_task(self._serve(server, path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        try:
+            yield client
+        finally:
+            await client.close()
+
+    async def _serve(self, connection: MemoryConnection, path: str) -> None:
+        try:
+            await self.handler(connection, path)
+        except ConnectionClosedOK:
+            pass
+        finally:
+            await connection.close()
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
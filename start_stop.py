@@ -1,24 +1,51 @@
 import argparse
+import csv
 import json
-from typing import Optional
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # API_BASE = "http://45.136.236.186:8080"
 API_BASE="http://host.docker.internal:8080"
 DEFAULT_IDTAG = "DEMO_IDTAG"
 
 
-def _do_json(method: str, url: str, body: str) -> requests.Response:
-    headers = {
-        "Content-Type": "application/json",
-        "Connection": "close",
-    }
-    resp = requests.request(method, url, data=body, headers=headers, timeout=15)
-    print(f"{method} {url} -> {resp.status_code} {resp.reason}")
-    print(resp.text)
+def _do_json(
+    method: str,
+    url: str,
+    body: str,
+    session: Optional[requests.Session] = None,
+    quiet: bool = False,
+) -> requests.Response:
+    if session is None:
+        headers = {
+            "Content-Type": "application/json",
+            "Connection": "close",
+        }
+        resp = requests.request(method, url, data=body, headers=headers, timeout=15)
+    else:
+        # pooled keep-alive connection
+        resp = session.request(method, url, data=body, headers={"Content-Type": "application/json"}, timeout=15)
+    if not quiet:
+        print(f"{method} {url} -> {resp.status_code} {resp.reason}")
+        print(resp.text)
     return resp
-def start_charge(cpid: str, connector_id: int, id_tag: Optional[str]) -> None:
+
+
+def start_charge(
+    cpid: str,
+    connector_id: int,
+    id_tag: Optional[str],
+    session: Optional[requests.Session] = None,
+    quiet: bool = False,
+) -> requests.Response:
     url = f"{API_BASE}/api/v1/start"
     payload = {
         "cpid": cpid,
@@ -26,20 +53,167 @@ def start_charge(cpid: str, connector_id: int, id_tag: Optional[str]) -> None:
     }
     if id_tag is not None:
         payload["idTag"] = id_tag
-    _do_json("POST", url, json.dumps(payload))
+    return _do_json("POST", url, json.dumps(payload), session, quiet)
 
 
-def stop_charge(cpid: str, connector_id: int) -> None:
+def stop_charge(
+    cpid: str,
+    connector_id: int,
+    session: Optional[requests.Session] = None,
+    quiet: bool = False,
+) -> requests.Response:
     url = f"{API_BASE}/api/v1/stop"
     payload = {
         "cpid": cpid,
         "connectorId": connector_id,
     }
-    resp = _do_json("POST", url, json.dumps(payload))
+    resp = _do_json("POST", url, json.dumps(payload), session, quiet)
     if resp.status_code == 404:
-        rel_url = f"{API_BASE}/api/v1/release"
-        rel_body = json.dumps({"cpid": cpid, "connectorId": connector_id})
-        _do_json("POST", rel_url, rel_body)
+        return release_connector(cpid, connector_id, session, quiet)
+    return resp
+
+
+def release_connector(
+    cpid: str,
+    connector_id: int,
+    session: Optional[requests.Session] = None,
+    quiet: bool = False,
+) -> requests.Response:
+    rel_url = f"{API_BASE}/api/v1/release"
+    rel_body = json.dumps({"cpid": cpid, "connectorId": connector_id})
+    return _do_json("POST", rel_url, rel_body, session, quiet)
+
+
+@dataclass
+class BulkOp:
+    op: str
+    cpid: str
+    connector_id: int
+    id_tag: Optional[str] = None
+
+
+@dataclass
+class BulkResult:
+    op: BulkOp
+    status: Optional[int]
+    latency_ms: float
+    # the stop fell back to /api/v1/release
+    released: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 400
+
+
+def _bulk_op(row: dict) -> BulkOp:
+    op = (row.get("op") or row.get("cmd") or "").strip().lower()
+    if op not in ("start", "stop", "release"):
+        raise ValueError(f"unknown op {op!r} in {row}")
+    connector = row.get("connectorId", row.get("connector_id"))
+    id_tag = row.get("idTag") or row.get("id_tag") or None
+    if op == "start" and id_tag is None:
+        id_tag = DEFAULT_IDTAG
+    return BulkOp(op, str(row["cpid"]).strip(), int(connector), id_tag)
+
+
+def read_ops(path: str) -> list[BulkOp]:
+    """Operations from a CSV file with a header row, or JSONL (``.jsonl``/``.json``)."""
+    fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    with fh:
+        text = fh.read()
+    if path.endswith((".jsonl", ".json")) or text.lstrip().startswith("{"):
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        rows = list(csv.DictReader(text.splitlines()))
+    return [_bulk_op(row) for row in rows]
+
+
+def make_session(workers: int, retries: int) -> requests.Session:
+    """Keep-alive session with a pool sized for ``workers`` threads.
+
+    Only connection failures are retried, with exponential backoff: the
+    request never reached the CSMS.  Any response, including a 502/503/504
+    from a proxy in front of it, is returned as is.  A 504 can mean that the
+    CSMS already acted on the request, and a start is not idempotent.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        allowed_methods=frozenset({"POST"}),
+        backoff_factor=0.2,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _run_op(session: requests.Session, op: BulkOp) -> BulkResult:
+    t0 = time.perf_counter()
+    try:
+        if op.op == "start":
+            resp = start_charge(op.cpid, op.connector_id, op.id_tag, session, quiet=True)
+        elif op.op == "stop":
+            resp = stop_charge(op.cpid, op.connector_id, session, quiet=True)
+        else:
+            resp = release_connector(op.cpid, op.connector_id, session, quiet=True)
+    except requests.RequestException as e:
+        return BulkResult(op, None, (time.perf_counter() - t0) * 1000, error=repr(e))
+    released = op.op == "stop" and resp.url.endswith("/api/v1/release")
+    error = None if resp.status_code < 400 else f"{resp.status_code} {resp.text[:200]}"
+    return BulkResult(op, resp.status_code, (time.perf_counter() - t0) * 1000, released, error)
+
+
+def run_bulk(ops: Iterable[BulkOp], workers: int = 8, retries: int = 2, verbose: bool = False) -> list[BulkResult]:
+    """Run ``ops`` on ``workers`` threads sharing one pooled session."""
+    session = make_session(workers, retries)
+    lock = threading.Lock()
+
+    def run(op: BulkOp) -> BulkResult:
+        result = _run_op(session, op)
+        if verbose or not result.ok:
+            with lock:
+                outcome = "released" if result.released else ("ok" if result.ok else "FAILED")
+                print(
+                    f"{op.op:7s} {op.cpid} #{op.connector_id} -> {outcome} "
+                    f"{result.status} {result.latency_ms:.1f} ms" + (f" {result.error}" if result.error else "")
+                )
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, ops))
+    finally:
+        session.close()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(results: list[BulkResult], elapsed: float) -> dict:
+    summary: dict = {"total": len(results), "elapsed_sec": round(elapsed, 3), "ops": {}}
+    for name in ("start", "stop", "release"):
+        rows = [r for r in results if r.op.op == name]
+        if not rows:
+            continue
+        latency = [r.latency_ms for r in rows]
+        summary["ops"][name] = {
+            "count": len(rows),
+            "ok": sum(r.ok for r in rows),
+            "failed": sum(not r.ok for r in rows),
+            "released": sum(r.released for r in rows),
+            "p50_ms": round(_percentile(latency, 50), 1),
+            "p95_ms": round(_percentile(latency, 95), 1),
+            "max_ms": round(max(latency), 1),
+        }
+    return summary
 
 
 def parse_args() -> argparse.Namespace:
@@ -55,12 +229,29 @@ def parse_args() -> argparse.Namespace:
     p_stop.add_argument("cpid")
     p_stop.add_argument("connectorId", type=int)
 
+    p_bulk = sub.add_parser("bulk", help="run start/stop/release operations from a CSV or JSONL file")
+    p_bulk.add_argument("file", help="CSV with header op,cpid,connectorId[,idTag] or JSONL; - for stdin")
+    p_bulk.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    p_bulk.add_argument("--retries", type=int, default=2, help="retries on connection errors")
+    p_bulk.add_argument("--api-base", default=None, help=f"API base URL (default {API_BASE})")
+    p_bulk.add_argument("-v", "--verbose", action="store_true", help="print every operation, not just failures")
+
     return parser.parse_args()
 
 
 def main() -> None:
+    global API_BASE
     args = parse_args()
-    if args.cmd == "start":
+    if args.cmd == "bulk":
+        if args.api_base:
+            API_BASE = args.api_base.rstrip("/")
+        ops = read_ops(args.file)
+        t0 = time.perf_counter()
+        results = run_bulk(ops, args.workers, args.retries, args.verbose)
+        print(json.dumps(summarize(results, time.perf_counter() - t0), indent=2))
+        if not all(r.ok for r in results):
+            sys.exit(1)
+    elif args.cmd == "start":
         start_charge(args.cpid, args.connectorId, args.idTag)
     elif args.cmd == "stop":
         stop_charge(args.cpid, args.connectorId)
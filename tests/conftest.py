@@ -1,7 +1,8 @@
 import asyncio
-import os
+import json
 import sys
 import itertools
+from collections import Counter
 from pathlib import Path
 import importlib
 
@@ -16,9 +17,21 @@ from ocpp.v16.enums import (
     AuthorizationStatus,
     RegistrationStatus,
 )
+from ocpp.v201 import call as call201, call_result as call_result201, ChargePoint as CP201
+from ocpp.v201.enums import Action as Action201
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from sim import config as sim_config  # noqa: E402
+from sim.impair import ImpairmentProxy  # noqa: E402
+from sim.transport import MemoryServer  # noqa: E402
+
+# simulator settings as the environment gave them, before any fixture
+# changed it; in-memory fixtures start every test from these
+CONFIG_DEFAULTS = {k: v for k, v in vars(sim_config).items() if k.isupper()}
+# no pause before the boot and no Finishing dwell unless a test asks for it
+FAST_CONFIG = {"BOOT_DELAY_SEC": 0.0, "FINISHING_DELAY_SEC": 0.0}
+
 
 class MockCSMS(CP):
     """Minimal CSMS that records start/stop requests and can send remote commands."""
@@ -29,6 +42,7 @@ class MockCSMS(CP):
         self.stop_requests: asyncio.Queue = asyncio.Queue()
         self.boot_notifications: asyncio.Queue = asyncio.Queue()
         self.status_notifications: asyncio.Queue = asyncio.Queue()
+        self.meter_values: asyncio.Queue = asyncio.Queue()
         self._tx_counter = itertools.count(1)
 
     # ---- handlers for messages from EVSE ----
@@ -60,7 +74,8 @@ class MockCSMS(CP):
         return call_result.StatusNotificationPayload()
 
     @on(Action.MeterValues)
-    async def on_meter_values(self, **kwargs):
+    async def on_meter_values(self, connector_id, meter_value, **kwargs):
+        await self.meter_values.put({"connector_id": connector_id, "meter_value": meter_value})
         return call_result.MeterValuesPayload()
 
     @on(Action.StartTransaction)
@@ -93,24 +108,84 @@ class MockCSMS(CP):
         return await self.call(req)
 
 
+class MockCSMS201(CP201):
+    """OCPP 2.0.1 counterpart of :class:`MockCSMS` recording TransactionEvents."""
+
+    def __init__(self, id, websocket):
+        super().__init__(id, websocket)
+        self.boot_notifications: asyncio.Queue = asyncio.Queue()
+        self.status_notifications: asyncio.Queue = asyncio.Queue()
+        self.transaction_events: asyncio.Queue = asyncio.Queue()
+
+    @on(Action201.BootNotification)
+    async def on_boot(self, charging_station, reason, **kwargs):
+        await self.boot_notifications.put(charging_station)
+        return call_result201.BootNotificationPayload(
+            current_time="0", interval=10, status="Accepted"
+        )
+
+    @on(Action201.Heartbeat)
+    async def on_heartbeat(self, **kwargs):
+        return call_result201.HeartbeatPayload(current_time="0")
+
+    @on(Action201.StatusNotification)
+    async def on_status(self, evse_id, connector_id, connector_status, **kwargs):
+        await self.status_notifications.put(
+            {"evse_id": evse_id, "connector_status": connector_status}
+        )
+        return call_result201.StatusNotificationPayload()
+
+    @on(Action201.TransactionEvent)
+    async def on_transaction_event(self, event_type, transaction_info, seq_no, **kwargs):
+        await self.transaction_events.put(
+            {
+                "event_type": event_type,
+                "transaction_info": transaction_info,
+                "seq_no": seq_no,
+                "meter_value": kwargs.get("meter_value") or [],
+            }
+        )
+        return call_result201.TransactionEventPayload()
+
+    async def request_start(self, *, id_token: str, evse_id: int = 1, remote_start_id: int = 1):
+        req = call201.RequestStartTransactionPayload(
+            id_token={"idToken": id_token, "type": "Central"},
+            remote_start_id=remote_start_id,
+            evse_id=evse_id,
+        )
+        return await self.call(req)
+
+    async def request_stop(self, *, transaction_id: str):
+        req = call201.RequestStopTransactionPayload(transaction_id=transaction_id)
+        return await self.call(req)
+
+
 class CSMS:
     """WebSocket server that accepts EVSE connections and exposes MockCSMS."""
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        cp_cls=MockCSMS,
+        subprotocol: str = "ocpp1.6",
+    ):
         self.host = host
         self.port = port
+        self.cp_cls = cp_cls
+        self.subprotocol = subprotocol
         self.connected: asyncio.Event = asyncio.Event()
         self.cp: MockCSMS | None = None
         self.server = None
 
     async def start(self):
         async def on_connect(ws):
-            self.cp = MockCSMS("CSMS", ws)
+            self.cp = self.cp_cls("CSMS", ws)
             self.connected.set()
             await self.cp.start()
 
         self.server = await websockets.serve(
-            on_connect, self.host, self.port, subprotocols=["ocpp1.6"]
+            on_connect, self.host, self.port, subprotocols=[self.subprotocol]
         )
         # store the actual port in case an ephemeral port was requested
         if self.port == 0 and self.server.sockets:
@@ -126,23 +201,194 @@ class CSMS:
         return f"ws://{self.host}:{self.port}/ocpp"
 
 
+class MemoryCSMS(CSMS):
+    """:class:`CSMS` on an in-memory transport: no port, no handshake.
+
+    Pass ``connect`` to ``sim.evse.ocpp_client``.  ``cps`` holds the mock
+    CSMS charge point of every connection, for fleet tests.
+    """
+
+    def __init__(self, cp_cls=MockCSMS, subprotocol: str = "ocpp1.6"):
+        super().__init__(cp_cls=cp_cls, subprotocol=subprotocol)
+        self.cps: dict[str, MockCSMS] = {}
+
+    async def start(self):
+        async def on_connect(ws, path):
+            self.cp = self.cp_cls("CSMS", ws)
+            self.cps[path.rsplit("/", 1)[-1]] = self.cp
+            self.connected.set()
+            await self.cp.start()
+
+        self.server = MemoryServer(on_connect)
+
+    async def stop(self):
+        if self.server is not None:
+            await self.server.close()
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    @property
+    def connect(self):
+        return self.server.connect
+
+
+class BridgeCSMS:
+    """Raw-frame OCPP 1.6 CSMS for ChargeBridge tests.
+
+    Answers the CALLs ChargeBridge sends, records every CALL in ``calls``,
+    counts connections per charge point and can drop them on demand.
+    ``delays`` holds an artificial reply delay per action.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.connections: dict[str, int] = {}
+        self.sockets: dict[str, set] = {}
+        self.calls: asyncio.Queue = asyncio.Queue()
+        self.delays: dict[str, float] = {}
+        self._tx_counter = itertools.count(1)
+
+    async def start(self):
+        self.server = await websockets.serve(self._handle, self.host, self.port, subprotocols=["ocpp1.6"])
+        if self.port == 0 and self.server.sockets:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ocpp"
+
+    async def drop(self, cpid: str):
+        for ws in list(self.sockets.get(cpid, ())):
+            ws.transport.abort()
+
+    def _reply(self, action: str, payload: dict) -> dict:
+        if action == "StartTransaction":
+            return {"transactionId": next(self._tx_counter), "idTagInfo": {"status": "Accepted"}}
+        if action == "StopTransaction":
+            return {"idTagInfo": {"status": "Accepted"}}
+        if action in ("Heartbeat", "BootNotification"):
+            return {"currentTime": "0", "interval": 10, "status": "Accepted"}
+        return {}
+
+    async def _handle(self, ws, path=None):
+        cpid = (path or ws.path).rsplit("/", 1)[-1]
+        self.connections[cpid] = self.connections.get(cpid, 0) + 1
+        self.sockets.setdefault(cpid, set()).add(ws)
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg[0] != 2:
+                    continue
+                _, message_id, action, payload = msg
+                await self.calls.put({"cpid": cpid, "action": action, "payload": payload})
+                asyncio.create_task(self._answer(ws, message_id, action, payload))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.sockets[cpid].discard(ws)
+
+    async def _answer(self, ws, message_id, action, payload):
+        if self.delays.get(action):
+            await asyncio.sleep(self.delays[action])
+        try:
+            await ws.send(json.dumps([3, message_id, self._reply(action, payload)]))
+        except websockets.ConnectionClosed:
+            pass
+
+
+@pytest_asyncio.fixture
+async def bridge_csms():
+    csms = BridgeCSMS()
+    await csms.start()
+    try:
+        yield csms
+    finally:
+        await csms.stop()
+
+
+@pytest.fixture
+def sim_env():
+    """Extra simulator environment; override in a test module to tune config."""
+    return {}
+
+
 @pytest_asyncio.fixture
-async def simulator():
-    """Spin up the EVSE simulator along with a mock CSMS."""
+async def simulator(sim_env, monkeypatch):
+    """Spin up the EVSE simulator along with a mock CSMS, in memory."""
+    async for sim in _run_simulator(MemoryCSMS(), monkeypatch, env=sim_env):
+        yield sim
+
+
+@pytest_asyncio.fixture
+async def simulator_201(monkeypatch):
+    """Same as ``simulator`` but speaking OCPP 2.0.1 with fast, batched metering."""
+    env = {"OCPP_VERSION": "2.0.1", "METER_PERIOD_SEC": "0.1", "METER_BATCH_SAMPLES": "3"}
+    csms = MemoryCSMS(cp_cls=MockCSMS201, subprotocol="ocpp2.0.1")
+    async for sim in _run_simulator(csms, monkeypatch, env=env):
+        yield sim
+
+
+@pytest_asyncio.fixture
+async def impaired_simulator(monkeypatch):
+    """``simulator`` with the CSMS link routed through an ImpairmentProxy.
+
+    The link is a real socket, as the proxy needs one.  The proxy starts
+    with no impairment; tests add profiles/routes on ``sim["proxy"]``
+    while the simulator is running.
+    """
     csms = CSMS()
     await csms.start()
+    proxy = ImpairmentProxy(csms.url)
+    await proxy.start()
+    try:
+        env = {"RECONNECT_DELAY_SEC": "0.1"}
+        async for sim in _run_simulator(csms, monkeypatch, env=env, csms_url=proxy.url):
+            sim["proxy"] = proxy
+            yield sim
+    finally:
+        await proxy.stop()
+
+
+def _coerce(value, default):
+    """Env-style string ``value`` as the type of the config default."""
+    if not isinstance(value, str) or default is None or isinstance(default, str):
+        return value
+    return type(default)(value)
 
-    os.environ["CSMS_URL"] = csms.url
 
-    # import after setting env vars so config picks them up
-    if "sim.evse" in sys.modules:
-        importlib.reload(sys.modules["sim.config"])
-        evse = importlib.reload(sys.modules["sim.evse"])
-    else:
-        evse = importlib.import_module("sim.evse")
+async def _run_simulator(csms: CSMS, monkeypatch, env: dict | None = None, csms_url: str | None = None):
+    """Run ``sim.evse`` against ``csms`` without module reloads.
 
-    ocpp_task = asyncio.create_task(evse.ocpp_client())
+    The config names ``sim.evse`` star-imports are patched for the test
+    (defaults, then :data:`FAST_CONFIG`, then ``env``), and the simulator's
+    per-process state (connector model, buffers, counters) starts fresh.
+    A :class:`MemoryCSMS` is reached in memory; any other ``csms`` over a
+    socket at ``csms_url`` (default: its own URL).
+    """
+    if csms.server is None:
+        await csms.start()
+    evse = sys.modules.get("sim.evse") or importlib.import_module("sim.evse")
+    settings = {**CONFIG_DEFAULTS, **FAST_CONFIG}
+    for key, value in (env or {}).items():
+        settings[key] = _coerce(value, CONFIG_DEFAULTS.get(key))
+    for key, value in settings.items():
+        monkeypatch.setattr(evse, key, value, raising=False)
+    monkeypatch.setattr(evse, "model", evse.make_model())
+    for name, fresh in (("stats", Counter()), ("meter_stats", Counter()), ("_meter_buffers", {}), ("_tx_seq", {})):
+        monkeypatch.setattr(evse, name, fresh)
+    monkeypatch.setattr(evse, "cp", None)
 
+    connect = csms.connect if isinstance(csms, MemoryCSMS) else None
+    ocpp_task = asyncio.create_task(evse.ocpp_client(csms_url or csms.url, connect=connect))
     await csms.connected.wait()
 
     transport = httpx.ASGITransport(app=evse.app)
@@ -156,4 +402,4 @@ async def simulator():
             await asyncio.wait_for(ocpp_task, timeout=1)
         except (asyncio.TimeoutError, asyncio.CancelledError):
             pass
-        await csms.stop()
\ No newline at end of file
+        await csms.stop()
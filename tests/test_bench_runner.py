@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks import runner
+
+
+def test_every_case_runs():
+    result = runner.run(repeat=1, min_time=0)
+    assert set(result["results"]) == set(runner.CASES)
+    assert all(r["ns_per_op"] > 0 for r in result["results"].values())
+    assert result["meta"]["ocpp"]
+
+
+def test_get_configuration_case_filters_keys():
+    cp = runner._charge_point()
+    conf = runner._sync(cp.on_get_configuration(key=["HeartbeatInterval", "NoSuchKey"]))
+    assert [k["key"] for k in conf.configuration_key] == ["HeartbeatInterval"]
+    assert conf.unknown_key == ["NoSuchKey"]
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"a": {"ns_per_op": 100.0}, "b": {"ns_per_op": 100.0}}}
+    current = {"results": {
+        "a": {"ns_per_op": 110.0}, "b": {"ns_per_op": 130.0}, "c": {"ns_per_op": 5.0},
+    }}
+    rows = {row["name"]: row for row in runner.compare(baseline, current, 0.2)}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"] and rows["b"]["change"] == 0.3
+    assert rows["c"]["change"] is None and not rows["c"]["regression"]
+
+
+def test_cli_exits_nonzero_on_regression(tmp_path: Path):
+    baseline = tmp_path / "baseline.json"
+    # a baseline nothing can beat
+    baseline.write_text(json.dumps({"results": {"model_get": {"ns_per_op": 0.001}}}))
+    cmd = [sys.executable, "-m", "benchmarks.runner", "model_get", "--repeat", "1", "--min-time", "0.001"]
+    proc = subprocess.run(cmd + ["--compare", str(baseline)], capture_output=True, text=True,
+                          cwd=Path(__file__).resolve().parents[1])
+    assert proc.returncode == 1
+    assert "REGRESSION" in proc.stdout
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from sim.meter import take_sample
+from sim.state_machine import Cabinet, EVSEModel
+
+
+@pytest.fixture
+def sim_env():
+    return {"CABINET_POWER_W": "180000", "CABINET_MODULES": "6", "METER_RATE_W": "120000"}
+
+
+def _model(policy: str, connectors: int = 2) -> EVSEModel:
+    # 180 kW in six 30 kW modules, 120 kW guns
+    return EVSEModel(connectors, max_power_w=120000, cabinet=Cabinet(180000, 6, policy))
+
+
+def test_equal_split_and_release():
+    model = _model("equal")
+    model.assign_tx(1, 101)
+    assert model.get(1).power_w == 120000  # capped by the gun
+    model.assign_tx(2, 102)
+    assert [model.get(i).power_w for i in (1, 2)] == [90000, 90000]
+    model.clear_tx(101)
+    assert model.get(1).power_w == 0
+    assert model.get(2).power_w == 120000
+
+
+def test_fifo_serves_first_session():
+    model = _model("fifo", connectors=3)
+    for cid in (2, 1, 3):
+        model.assign_tx(cid, 100 + cid)
+    assert [model.get(i).power_w for i in (2, 1, 3)] == [120000, 60000, 0]
+
+
+def test_soc_policy_favours_emptier_battery():
+    model = _model("soc")
+    model.get(1).soc = 80
+    model.get(2).soc = 20
+    model.assign_tx(1, 101)
+    model.assign_tx(2, 102)
+    assert model.get(2).power_w == 120000
+    assert model.get(1).power_w == 60000
+
+
+def test_no_cabinet_gives_full_rating():
+    model = EVSEModel(2, max_power_w=7000)
+    model.assign_tx(1, 1)
+    model.assign_tx(2, 2)
+    assert model.get(1).power_w == model.get(2).power_w == 7000
+
+
+def test_power_granted_when_session_activates():
+    # 1.6J: the tx id only arrives with StartTransaction.conf
+    model = EVSEModel(1, max_power_w=7000)
+    model.start_session(1)
+    assert model.get(1).power_w == 7000
+    model.assign_tx(1, 5)
+    model.end_session(1)
+    assert model.get(1).power_w == 0
+
+
+def test_soc_advances_with_energy():
+    model = EVSEModel(1, max_power_w=60000, battery_wh=60000)
+    c = model.get(1)
+    c.soc = 50
+    model.start_session(1)
+    sample = take_sample(c, c.power_w, 360, "t")  # 6 kWh
+    assert sample.soc == pytest.approx(60)
+
+
+@pytest.mark.asyncio
+async def test_meter_values_follow_allocation(simulator):
+    client = simulator["client"]
+    csms = simulator["csms"].cp
+
+    for cid in (1, 2):
+        await client.post(f"/plug/{cid}")
+        await client.post(f"/local_start/{cid}")
+        await asyncio.wait_for(csms.start_requests.get(), timeout=5)
+
+    stats = (await client.get("/stats")).json()
+    assert stats["power_w"] == {"1": 90000.0, "2": 90000.0}
@@ -0,0 +1,48 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from sim.capture import FrameRing, IN, OUT
+
+
+def test_ring_respects_frame_and_byte_budget():
+    ring = FrameRing(max_frames=3, max_bytes=10)
+    for frame in ("aaaa", "bbbb", "cc"):
+        ring.record(OUT, frame)
+    # 4 + 4 + 2 = 10 bytes fits exactly
+    assert [f[2] for f in ring.frames] == ["aaaa", "bbbb", "cc"]
+
+    ring.record(IN, "dd")
+    # over the byte budget -> oldest frame evicted
+    assert [f[2] for f in ring.frames] == ["bbbb", "cc", "dd"]
+    assert ring.bytes == 8
+
+    ring.record(IN, "e")
+    # frame budget (maxlen=3) evicts as well
+    assert [f[2] for f in ring.frames] == ["cc", "dd", "e"]
+    assert ring.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_capture_dump_endpoint(simulator, tmp_path, monkeypatch):
+    client = simulator["client"]
+    csms_cp = simulator["csms"].cp
+    evse = simulator["evse"]
+    monkeypatch.setattr(evse, "CAPTURE_DIR", str(tmp_path))
+
+    await asyncio.wait_for(csms_cp.boot_notifications.get(), timeout=5)
+    # first StatusNotification follows the BootNotification.conf round-trip
+    await asyncio.wait_for(csms_cp.status_notifications.get(), timeout=5)
+    resp = await client.post("/capture/dump")
+    body = resp.json()
+    assert body["ok"] is True
+    assert body["frames"] > 0
+
+    with gzip.open(body["path"], "rt") as fh:
+        records = [json.loads(line) for line in fh]
+    out_frames = [r for r in records if r["dir"] == "out"]
+    assert any('"BootNotification"' in r["frame"] for r in out_frames)
+    assert any(r["dir"] == "in" for r in records)
+    assert all(r["cpid"] == "TestCP01" for r in records)
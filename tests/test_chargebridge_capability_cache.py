@@ -0,0 +1,61 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from capability_cache import CapabilityCache  # noqa: E402
+
+
+def test_entries_persist_expire_and_yield_to_overrides(tmp_path):
+    path = str(tmp_path / "caps.db")
+    cache = CapabilityCache(path, ttl=60)
+    assert cache.get("CP1", "Gresgying", "GS-7", "1.2") is None
+    cache.put("Gresgying", "GS-7", "1.2", ["AuthorizeRemoteTxRequests"])
+    cache.set_override("CP9", ["QRcodeConnectorID1"])
+    cache.close()
+
+    cache = CapabilityCache(path, ttl=60)
+    assert cache.get("CP2", "Gresgying", "GS-7", "1.2") == {"AuthorizeRemoteTxRequests"}
+    assert cache.get("CP2", "Gresgying", "GS-7", "1.3") is None  # other firmware
+    assert cache.get("CP9", "Gresgying", "GS-7", "1.2") == {"QRcodeConnectorID1"}
+    assert cache.clear_override("CP9") is True
+    assert cache.get("CP9", "Gresgying", "GS-7", "1.2") == {"AuthorizeRemoteTxRequests"}
+    cache.ttl = 0
+    assert cache.get("CP2", "Gresgying", "GS-7", "1.2") is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_boots_of_one_model_discover_once(tmp_path):
+    cache = CapabilityCache(str(tmp_path / "caps.db"))
+    calls = []
+
+    async def discover():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["AuthorizeRemoteTxRequests", "QRcodeConnectorID1"]
+
+    results = await asyncio.gather(
+        *(cache.resolve(f"CP{i}", "V", "M", "1", discover) for i in range(50))
+    )
+    assert len(calls) == 1
+    assert all(r == {"AuthorizeRemoteTxRequests", "QRcodeConnectorID1"} for r in results)
+    assert await cache.resolve("CP99", "V", "M", "1", discover) == results[0]
+    assert len(calls) == 1  # later boots hit the cache
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_discovery_is_not_cached(tmp_path):
+    cache = CapabilityCache(str(tmp_path / "caps.db"))
+    answers = iter([None, ["HeartbeatInterval"]])
+
+    async def discover():
+        return next(answers)
+
+    assert await cache.resolve("CP1", "V", "M", None, discover) is None
+    assert await cache.resolve("CP1", "V", "M", None, discover) == {"HeartbeatInterval"}
+    cache.close()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import websockets
+
+# ChargeBridge modules import each other by bare name
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from ocpp_client import OCPPCallError, OCPPClient  # noqa: E402
+
+
+async def _serve(handler):
+    server = await websockets.serve(handler, "127.0.0.1", 0, subprotocols=["ocpp1.6"])
+    port = server.sockets[0].getsockname()[1]
+    return server, f"ws://127.0.0.1:{port}/ocpp/CP_1"
+
+
+@pytest.mark.asyncio
+async def test_pipelined_calls_matched_by_message_id():
+    async def csms(ws, path=None):
+        # read both CALLs before answering, then reply in reverse order
+        first = json.loads(await ws.recv())
+        second = json.loads(await ws.recv())
+        for msg in (second, first):
+            await ws.send(json.dumps([3, msg[1], {"transactionId": msg[3]["connectorId"]}]))
+        await ws.wait_closed()
+
+    server, url = await _serve(csms)
+    client = OCPPClient(url, "CP_1")
+    await client.connect()
+    try:
+        a, b = await asyncio.gather(
+            client.start_transaction(1, "A", 0),
+            client.start_transaction(2, "B", 0),
+        )
+        assert (a["transactionId"], b["transactionId"]) == (1, 2)
+    finally:
+        await client.close()
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test_server_calls_errors_and_timeouts():
+    replies = asyncio.Queue()
+
+    async def csms(ws, path=None):
+        await ws.send(json.dumps([2, "srv-1", "RemoteStopTransaction", {"transactionId": 7}]))
+        await ws.send(json.dumps([2, "srv-2", "Reset", {"type": "Soft"}]))
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg[0] == 2 and msg[2] == "StartTransaction":
+                await ws.send(json.dumps([4, msg[1], "SecurityError", "nope", {}]))
+            elif msg[0] != 2:
+                await replies.put(msg)
+            # Heartbeat is never answered
+
+    server, url = await _serve(csms)
+    client = OCPPClient(url, "CP_1")
+    stopped = []
+
+    @client.on("RemoteStopTransaction")
+    async def remote_stop(payload):
+        stopped.append(payload["transactionId"])
+        return {"status": "Accepted"}
+
+    await client.connect()
+    try:
+        got = {m[1]: m for m in [await replies.get(), await replies.get()]}
+        assert got["srv-1"] == [3, "srv-1", {"status": "Accepted"}]
+        assert got["srv-2"][2] == "NotImplemented"
+        assert stopped == [7]
+
+        with pytest.raises(OCPPCallError) as err:
+            await client.start_transaction(1, "A", 0)
+        assert err.value.code == "SecurityError"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await client._call("Heartbeat", {}, timeout=0.2)
+        assert client._pending == {}
+    finally:
+        await client.close()
+        server.close()
@@ -0,0 +1,74 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from charging_session import ChargingSession  # noqa: E402
+from connection_manager import ConnectionManager  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_one_socket_per_charger(bridge_csms):
+    manager = ConnectionManager(bridge_csms.url)
+    sessions = [
+        ChargingSession(connector_id=cid, id_tag=f"T{cid}", manager=manager, charge_point_id=cpid)
+        for cpid in ("CP_1", "CP_2")
+        for cid in (1, 2, 3)
+    ]
+    await asyncio.gather(*(s.start(meter_start=0) for s in sessions))
+    assert bridge_csms.connections == {"CP_1": 1, "CP_2": 1}
+    assert manager.stats()["CP_1"]["refs"] == 3
+    assert len({s.transaction_id for s in sessions}) == 6
+
+    await asyncio.gather(*(s.stop(meter_stop=100) for s in sessions[:5]))
+    assert manager.stats()["CP_1"] == {"refs": 0, "connected": False, "reconnects": 0}
+    assert manager.stats()["CP_2"]["connected"] is True
+    await sessions[5].stop(meter_stop=100)
+    assert not manager.client("CP_2").connected
+
+
+@pytest.mark.asyncio
+async def test_reconnects_after_drop(bridge_csms):
+    manager = ConnectionManager(bridge_csms.url, keepalive_sec=0.2, reconnect_min_sec=0.05)
+    session = ChargingSession(manager=manager, charge_point_id="CP_1")
+    await session.start(meter_start=0)
+    await bridge_csms.drop("CP_1")
+    for _ in range(50):
+        await asyncio.sleep(0.05)
+        if manager.stats()["CP_1"]["reconnects"]:
+            break
+    assert bridge_csms.connections["CP_1"] == 2
+    assert manager.client("CP_1").connected
+    # keepalive heartbeats flow on the new socket and the session can finish
+    await session.stop(meter_stop=10)
+    await manager.close_all()
+
+
+@pytest.mark.asyncio
+async def test_acquire_during_reconnect_leaves_one_socket(bridge_csms):
+    manager = ConnectionManager(bridge_csms.url, keepalive_sec=0.2, reconnect_min_sec=0.01)
+    client = manager.client("CP_1")
+    connect = client.connect
+
+    async def slow_connect():
+        await asyncio.sleep(0.05)
+        await connect()
+
+    client.connect = slow_connect
+    await manager.acquire("CP_1")
+    supervisor = manager._entries["CP_1"].supervisor
+    for _ in range(5):
+        await bridge_csms.drop("CP_1")
+        await asyncio.sleep(0.01)
+        # races the supervisor's reconnect
+        await asyncio.gather(manager.acquire("CP_1"), manager.acquire("CP_1"))
+    await asyncio.sleep(0.3)
+    assert manager.client("CP_1").connected
+    assert len(bridge_csms.sockets["CP_1"]) == 1
+    await manager.close_all()
+    assert supervisor.done()
+    await asyncio.sleep(0.05)
+    assert not bridge_csms.sockets["CP_1"]
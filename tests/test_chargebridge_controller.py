@@ -0,0 +1,63 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from charging_controller import SessionSpec, run_sessions, summarize  # noqa: E402
+from connection_manager import ConnectionManager  # noqa: E402
+
+
+async def _specs(count):
+    for i in range(count):
+        yield SessionSpec(
+            charger=f"CP_{i % 2 + 1}", connector=i // 2 + 1, id_tag=f"T{i}",
+            power_kw=[3600, 7200, 3600], interval_sec=0.02,
+        )
+
+
+@pytest.mark.asyncio
+async def test_runs_stream_with_bounded_concurrency(bridge_csms):
+    bridge_csms.delays["StartTransaction"] = 0.05
+    manager = ConnectionManager(bridge_csms.url)
+    in_flight = peak = 0
+    metered = set()
+
+    async def watch():
+        nonlocal in_flight, peak
+        while True:
+            call = await bridge_csms.calls.get()
+            if call["action"] == "StartTransaction":
+                in_flight += 1
+                peak = max(peak, in_flight)
+            elif call["action"] == "MeterValues":
+                metered.add(call["payload"]["transactionId"])
+            elif call["action"] == "StopTransaction":
+                in_flight -= 1
+
+    watcher = asyncio.create_task(watch())
+    try:
+        results = await run_sessions(_specs(8), manager, concurrency=3)
+    finally:
+        watcher.cancel()
+        await manager.close_all()
+
+    assert peak == 3
+    assert metered == {r.transaction_id for r in results}
+    assert [r.error for r in results] == [None] * 8
+    # 3.6 + 7.2 + 3.6 MW for 20 ms each
+    assert {r.energy_wh for r in results} == {80}
+    assert all(len(r.latency_ms["MeterValues"]) == 3 for r in results)
+
+    summary = summarize(results)
+    assert summary["sessions"] == 8 and summary["failed"] == 0
+    assert summary["latency_ms"]["StartTransaction"]["p50"] >= 50
+    assert summary["latency_ms"]["MeterValues"]["count"] == 24
+
+
+def test_spec_profile():
+    assert SessionSpec("CP_1", power_kw=50, duration_sec=3, interval_sec=1).profile() == [50, 50, 50]
+    spec = SessionSpec.from_dict({"charger": "CP_1", "idTag": "X", "power_kw": [1, 2]})
+    assert spec.id_tag == "X" and spec.profile() == [1, 2]
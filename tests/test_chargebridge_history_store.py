@@ -0,0 +1,77 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from history_store import HistoryStore  # noqa: E402
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _record(tx, minutes, id_tag="TAG", vid=None):
+    return {
+        "connectorId": 1,
+        "transactionId": tx,
+        "idTag": id_tag,
+        "vid": vid,
+        "meterStart": 0,
+        "meterStop": 1000,
+        "energy": 1000,
+        "startTime": (T0 + timedelta(minutes=minutes - 30)).isoformat(),
+        "stopTime": (T0 + timedelta(minutes=minutes)).isoformat(),
+        "durationSecs": 1800.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_batched_writes_survive_reopen(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path, batch_size=10, flush_interval=60)
+    for tx in range(25):
+        store.add("CP1", _record(tx, tx))
+    await store.close()
+    assert store.written == 25
+
+    store = HistoryStore(path)
+    sessions, cursor = await store.query(limit=5)
+    assert [s["transactionId"] for s in sessions] == [24, 23, 22, 21, 20]
+    assert sessions[0]["cpid"] == "CP1"
+    assert sessions[0]["stopTime"] == (T0 + timedelta(minutes=24)).isoformat()
+    assert cursor is not None
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_filters_and_time_ranges(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for tx in range(30):
+        # two sessions share each stop time to exercise the id tie-break
+        store.add("CP1" if tx % 2 else "CP2", _record(tx, tx // 2, id_tag=f"T{tx % 3}", vid="V1" if tx == 7 else None))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await store.query(cursor=cursor, limit=4)
+        seen += [s["transactionId"] for s in page]
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(30)) and len(seen) == 30
+
+    page, _ = await store.query(cpid="CP2", id_tag="T0", limit=100)
+    assert [s["transactionId"] for s in page] == [24, 18, 12, 6, 0]
+    page, _ = await store.query(cpid="CP2", connector_id=2)
+    assert page == []
+    page, _ = await store.query(vid="V1")
+    assert [s["transactionId"] for s in page] == [7]
+    page, _ = await store.query(
+        since=T0 + timedelta(minutes=5), until=(T0 + timedelta(minutes=7)).isoformat(), limit=100
+    )
+    assert sorted(s["transactionId"] for s in page) == [10, 11, 12, 13]
+    page, _ = await store.query(started_before=T0 - timedelta(minutes=28), limit=100)
+    assert sorted(s["transactionId"] for s in page) == [0, 1, 2, 3]
+
+    with pytest.raises(ValueError):
+        await store.query(cursor="bogus")
+    await store.close()
@@ -0,0 +1,46 @@
+import asyncio
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from id_allocator import HiLoAllocator  # noqa: E402
+
+
+def _take(path, count):
+    alloc = HiLoAllocator(path, block_size=50)
+    ids = [alloc.next_id() for _ in range(count)]
+    alloc.close()
+    return ids
+
+
+def test_ids_survive_restart(tmp_path):
+    path = str(tmp_path / "ids.db")
+    first = _take(path, 120)
+    assert first == list(range(1, 121))
+    # the unused rest of the last block is skipped, never reissued
+    assert _take(path, 3) == [151, 152, 153]
+
+
+def test_processes_get_disjoint_ids(tmp_path):
+    path = str(tmp_path / "ids.db")
+    HiLoAllocator(path).close()
+    with ProcessPoolExecutor(4) as pool:
+        results = list(pool.map(_take, [path] * 8, [500] * 8))
+    ids = [i for chunk in results for i in chunk]
+    assert len(set(ids)) == len(ids) == 4000
+
+
+@pytest.mark.asyncio
+async def test_next_block_is_prefetched_off_the_loop(tmp_path):
+    alloc = HiLoAllocator(str(tmp_path / "ids.db"), block_size=10, low_water=5)
+    ids = [alloc.next_id() for _ in range(6)]
+    assert alloc._prefetch is not None
+    await alloc._prefetch
+    ids += [alloc.next_id() for _ in range(8)]
+    assert ids == list(range(1, 15))
+    assert alloc.reservations == 2
+    alloc.close()
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from live_cache import LiveCache  # noqa: E402
+
+
+def _mv(ts, energy_wh=None, power_w=None, soc=None):
+    sampled = []
+    if energy_wh is not None:
+        sampled.append({"value": str(energy_wh), "measurand": "Energy.Active.Import.Register", "unit": "Wh"})
+    if power_w is not None:
+        sampled.append({"value": str(power_w), "measurand": "Power.Active.Import", "unit": "W"})
+    if soc is not None:
+        sampled.append({"value": str(soc), "measurand": "SoC", "unit": "Percent"})
+    return {"timestamp": f"2024-01-01T00:{ts // 60:02d}:{ts % 60:02d}Z", "sampledValue": sampled}
+
+
+def test_session_aggregates_follow_start_meter_values_and_stop():
+    cache = LiveCache()
+    cache.start("CP1", 1, 7, meter_start=1000, timestamp="2024-01-01T00:00:00Z")
+    cache.update("CP1", 1, 7, [_mv(60, 1500, 30000, soc=40)])
+    entry = cache.update("CP1", 1, 7, [_mv(120, 2000, 36000, soc=42)])
+    assert entry.power_w == 36000 and entry.soc == 42
+    assert entry.energy_delivered_wh == 1000
+    assert entry.avg_power_w == pytest.approx(30000)
+    assert entry.peak_power_w == 36000
+    assert cache.by_transaction(7) is entry
+
+    # a resent older reading leaves the newer state alone
+    cache.update("CP1", 1, 7, [_mv(90, 1700, 1)])
+    assert entry.power_w == 36000 and entry.readings == 2
+
+    cache.stop(7, meter_stop=2100)
+    assert cache.by_transaction(7) is None
+    assert entry.transaction_id is None and entry.power_w == 0 and entry.energy_wh == 2100
+    assert [e.connector_id for e in cache.select(cpid="CP1", charging=False)] == [1]
+
+
+def test_power_derived_from_energy_and_unknown_sessions():
+    cache = LiveCache()
+    # the central restarted mid-session: no StartTransaction seen
+    cache.update("CP2", 2, 99, [_mv(0, 5000)])
+    entry = cache.update("CP2", 2, 99, [_mv(30, 5100), _mv(60, 5200)])
+    assert entry.power_w == pytest.approx(12000)
+    assert entry.meter_start == 5000 and entry.energy_delivered_wh == 200
+    assert entry.to_dict()["transaction_id"] == 99
+
+    cache.update("CP3", 1, None, [_mv(0, 1, 100)])
+    assert {e.cpid for e in cache.select(charging=True)} == {"CP2"}
+    cache.drop("CP2")
+    assert cache.by_transaction(99) is None and len(cache) == 1
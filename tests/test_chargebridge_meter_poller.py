@@ -0,0 +1,73 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from meter_poller import Cabinet, MeterPoller, ModbusError, ModbusTCPClient, plan_reads  # noqa: E402
+from modbus_standin import ModbusStandIn  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def cabinets():
+    devices = []
+    for _ in range(3):
+        device = ModbusStandIn()
+        device.add_meter(10, energy_wh=1000, power_w=0, battery_wh=1000, soc=40)
+        device.add_meter(20, energy_wh=5000, power_w=0)
+        await device.start()
+        devices.append(device)
+    try:
+        yield devices
+    finally:
+        for device in devices:
+            await device.stop()
+
+
+def test_plan_reads_merges_nearby_fields():
+    assert plan_reads([(10, 2), (12, 2), (14, 1), (20, 2), (200, 1)]) == [(10, 12), (200, 1)]
+    assert plan_reads([(0, 100), (100, 50)]) == [(0, 100), (100, 50)]
+
+
+@pytest.mark.asyncio
+async def test_client_reads_and_reports_exceptions(cabinets):
+    client = ModbusTCPClient(cabinets[0].host, cabinets[0].port)
+    assert (await client.read_holding_registers(1, 10, 2)) == [0, 1000]
+    with pytest.raises(ModbusError) as err:
+        await client.read_holding_registers(1, 500, 2)
+    assert err.value.code == 2
+    assert (await client.read_holding_registers(1, 20, 2)) == [0, 5000]
+    assert client.connects == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_poller_batches_and_adapts_rate(cabinets):
+    poller = MeterPoller(
+        [Cabinet(f"cab{i}", d.host, d.port, connectors={1: 10, 2: 20}) for i, d in enumerate(cabinets)],
+        active_interval=0.02, idle_interval=5,
+    ).start()
+    readings = poller.subscribe("cab0", 1)
+    try:
+        await asyncio.sleep(0.1)
+        # one batched read per cabinet so far, then idle
+        assert [d.requests for d in cabinets] == [1, 1, 1]
+        assert poller.latest("cab1")[2]["energy_wh"] == 5000
+
+        cabinets[0].set_power(10, 3_600_000)  # 1 Wh per ms
+        poller.set_session("cab0", 1, True)
+        got = [await asyncio.wait_for(readings.__anext__(), 1) for _ in range(8)]
+    finally:
+        await poller.close()
+
+    energy = [r.energy_wh for r in got]
+    assert energy == sorted(energy) and energy[-1] > energy[0] + 100
+    assert got[-1].power_w == 3_600_000 and got[-1].soc > 40
+    stats = poller.stats()
+    assert stats["cab0"]["polls"] >= 8 and stats["cab1"]["polls"] == 1
+    assert stats["cab0"]["reads_per_poll"] == 1
+    assert cabinets[0].connections == stats["cab0"]["connects"] == 1
+    assert set(stats["cab0"]["jitter_ms"]) == {"p50", "p95", "max"}
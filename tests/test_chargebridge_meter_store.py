@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from meter_store import MeterStore, parse_meter_values  # noqa: E402
+
+T0 = 1_700_000_040.0  # a minute boundary
+
+
+def _mv(ts, energy_kwh, power_w, phase_a=None):
+    sampled = [
+        {"value": str(energy_kwh), "measurand": "Energy.Active.Import.Register", "unit": "kWh"},
+        {"value": str(power_w), "measurand": "Power.Active.Import", "unit": "W"},
+    ]
+    if phase_a is not None:
+        sampled.append({"value": str(phase_a), "measurand": "Current.Import", "unit": "A", "phase": "L1"})
+    return [{"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + "Z", "sampledValue": sampled}]
+
+
+def test_parse_scales_units_and_skips_bad_values():
+    mv = _mv(T0, 1.5, 7000, phase_a=16)
+    mv[0]["sampledValue"].append({"value": "n/a", "measurand": "SoC"})
+    rows = list(parse_meter_values("CP1", 1, 42, mv))
+    assert rows == [
+        (T0, "CP1", 1, 42, "Energy.Active.Import.Register", "", 1500.0),
+        (T0, "CP1", 1, 42, "Power.Active.Import", "", 7000.0),
+        (T0, "CP1", 1, 42, "Current.Import", "L1", 16.0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ingest_flush_query_and_rollups(tmp_path):
+    store = MeterStore(str(tmp_path), rollups={60: 86400 * 365 * 100, 3600: 86400 * 365 * 100})
+    for i in range(120):
+        # one reading every second for two minutes on two connectors
+        store.ingest("CP1", 1, 7, _mv(T0 + i, 10 + i / 1000, 7000 + i))
+        store.ingest("CP1", 2, None, _mv(T0 + i, 20, 0))
+    assert store.pending == 480
+
+    raw = await store.query(cpid="CP1", connector_id=1, measurand="Power.Active.Import", since=T0 + 10, until=T0 + 13)
+    assert [(r["ts"], r["value"], r["transaction_id"]) for r in raw] == [
+        (T0 + 10, 7010.0, 7), (T0 + 11, 7011.0, 7), (T0 + 12, 7012.0, 7),
+    ]
+    assert (await store.query(connector_id=2, limit=1))[0]["transaction_id"] is None
+
+    # a late sample for the first minute after it was written out
+    await store.close()
+    store = MeterStore(str(tmp_path), rollups={60: 86400 * 365 * 100, 3600: 86400 * 365 * 100})
+    store.ingest("CP1", 1, 7, _mv(T0 + 30, 10.5, 9000))
+    await store.close()
+
+    minutes = await store.query(cpid="CP1", connector_id=1, measurand="Power.Active.Import", bucket=60)
+    assert [(r["bucket"], r["count"], r["min"], r["max"]) for r in minutes] == [
+        (T0, 61, 7000.0, 9000.0), (T0 + 60, 60, 7060.0, 7119.0),
+    ]
+    assert minutes[0]["sum"] == sum(7000 + i for i in range(60)) + 9000
+    energy = await store.query(cpid="CP1", connector_id=1, measurand="Energy.Active.Import.Register", bucket=60)
+    assert energy[1]["max"] - energy[1]["min"] == pytest.approx(59.0)
+    hours = await store.query(cpid="CP1", connector_id=1, measurand="Power.Active.Import", bucket=3600)
+    assert sum(r["count"] for r in hours) == 121
+    with pytest.raises(ValueError):
+        await store.query(bucket=300)
+
+
+@pytest.mark.asyncio
+async def test_retention_and_truncated_blocks(tmp_path):
+    store = MeterStore(str(tmp_path), raw_retention_sec=3600, rollups={60: 3600}, retention_every_sec=0)
+    old = tmp_path / "raw" / "2000010100.seg"
+    old.write_bytes(b"")
+    store.ingest("CP1", 1, 1, _mv(T0, 1, 1))
+    await store.flush()
+    assert not old.exists()
+
+    # simulate a crash in the middle of the next block
+    seg = next((tmp_path / "raw").iterdir())
+    size = seg.stat().st_size
+    store.ingest("CP1", 1, 1, _mv(T0 + 1, 1, 2))
+    await store.flush()
+    with open(seg, "r+b") as fh:
+        fh.truncate(size + (os.path.getsize(seg) - size) // 2)
+    rows = await store.query(measurand="Power.Active.Import")
+    assert [r["value"] for r in rows] == [1.0]
+    await store.close()
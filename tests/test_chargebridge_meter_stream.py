@@ -0,0 +1,99 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from charging_session import ChargingSession  # noqa: E402
+from meter_stream import MeterStream, Reading  # noqa: E402
+from ocpp_client import OCPPClient  # noqa: E402
+
+
+async def _meter(count, period=0.0):
+    for i in range(1, count + 1):
+        yield Reading(energy_wh=i * 10, power_w=36000)
+        await asyncio.sleep(period)
+
+
+class SlowCSMS:
+    def __init__(self, delay=0.0, fail=0):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    async def send(self, meter_value):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("link down")
+        self.batches.append([int(mv["sampledValue"][0]["value"]) for mv in meter_value])
+        return {}
+
+
+async def _run(csms, source, **options):
+    stream = MeterStream(csms.send, source, retry_sec=0.01, **options).start()
+    await asyncio.wait_for(stream._drain_task, 5)
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_batches_form_while_a_call_is_in_flight():
+    csms = SlowCSMS(delay=0.02)
+    stream = await _run(csms, _meter(50, period=0.002), batch_size=10)
+    sent = [wh for batch in csms.batches for wh in batch]
+    assert sent == [i * 10 for i in range(1, 51)]
+    assert stream.stats.calls < 20
+    assert max(len(b) for b in csms.batches) <= 10
+
+
+@pytest.mark.asyncio
+async def test_bounded_buffer_drops_oldest_and_block_loses_nothing():
+    csms = SlowCSMS(delay=0.01)
+    stream = await _run(csms, _meter(200), buffer_size=5)
+    assert stream.stats.dropped > 0
+    assert stream.stats.sent + stream.stats.dropped == 200
+    assert csms.batches[-1] == [2000]
+
+    csms = SlowCSMS(delay=0.001)
+    stream = await _run(csms, _meter(50), buffer_size=5, batch_size=5, overflow="block")
+    assert stream.stats.dropped == 0
+    assert [wh for batch in csms.batches for wh in batch] == [i * 10 for i in range(1, 51)]
+
+
+@pytest.mark.asyncio
+async def test_coalescing_keeps_latest_reading():
+    csms = SlowCSMS()
+    stream = await _run(csms, _meter(100, period=0.001), coalesce_sec=10, max_delay_sec=10, batch_size=5)
+    assert stream.stats.coalesced == 99
+    assert csms.batches == [[1000]]
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_retried():
+    csms = SlowCSMS(fail=2)
+    stream = await _run(csms, _meter(3))
+    assert stream.stats.errors == 2
+    assert [wh for batch in csms.batches for wh in batch] == [10, 20, 30]
+
+
+@pytest.mark.asyncio
+async def test_session_streams_until_stop(bridge_csms):
+    session = ChargingSession(OCPPClient(f"{bridge_csms.url}/CP_1", "CP_1"), connector_id=2, id_tag="T")
+    await session.start(meter_start=0)
+    await bridge_csms.calls.get()
+    session.stream_meter(_meter(1000, period=0.001), batch_size=20, max_delay_sec=0.05)
+    await asyncio.sleep(0.2)
+    await session.stop()
+
+    calls = []
+    while not bridge_csms.calls.empty():
+        calls.append(await bridge_csms.calls.get())
+    meter_calls = [c["payload"] for c in calls if c["action"] == "MeterValues"]
+    stop = calls[-1]
+    assert stop["action"] == "StopTransaction"
+    assert meter_calls and all(p["transactionId"] == session.transaction_id for p in meter_calls)
+    assert all(1 <= len(p["meterValue"]) <= 20 for p in meter_calls)
+    last = meter_calls[-1]["meterValue"][-1]["sampledValue"][0]["value"]
+    assert stop["payload"]["meterStop"] == int(last) == session.meter_stream.last.energy_wh
@@ -0,0 +1,80 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from provisioning import ProvisioningQueue  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_chargers_do_not_overlap():
+    queue = ProvisioningQueue(concurrency=4)
+    running, peak, log = set(), [0], []
+
+    def job(cpid, n):
+        async def run(attempt):
+            assert cpid not in running
+            running.add(cpid)
+            peak[0] = max(peak[0], len(running))
+            await asyncio.sleep(0.01)
+            log.append((cpid, n))
+            running.discard(cpid)
+        return run
+
+    for i in range(20):
+        queue.submit(f"CP{i}", job(f"CP{i}", 1))
+    await asyncio.sleep(0)
+    queue.submit("CP0", job("CP0", 2))  # reboot while CP0 runs: queued behind it
+    queue.submit("CP19", job("CP19", 2))  # reboot before CP19 started: replaces it
+    while queue.stats()["queued"] or queue.stats()["running"]:
+        await asyncio.sleep(0.01)
+    assert peak[0] == 4
+    assert [n for cpid, n in log if cpid == "CP0"] == [1, 2]
+    assert [n for cpid, n in log if cpid == "CP19"] == [2]
+    stats = queue.stats()
+    assert stats["provisioned"] == 21
+    assert stats["timeToProvisioned"]["count"] == 21
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_failures_are_retried_then_given_up():
+    queue = ProvisioningQueue(concurrency=2, retries=2, retry_delay=0.01)
+    attempts = {"ok": [], "bad": []}
+
+    async def flaky(attempt):
+        attempts["ok"].append(attempt)
+        if attempt < 1:
+            raise ConnectionError("charger busy")
+
+    async def broken(attempt):
+        attempts["bad"].append(attempt)
+        raise ConnectionError("no answer")
+
+    queue.submit("OK", flaky)
+    queue.submit("BAD", broken)
+    await asyncio.sleep(0.2)
+    assert attempts == {"ok": [0, 1], "bad": [0, 1, 2]}
+    stats = queue.stats()
+    assert (stats["provisioned"], stats["failed"], stats["retried"], stats["queued"]) == (1, 1, 3, 0)
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_discard_stops_retries():
+    queue = ProvisioningQueue(concurrency=1, retries=5, retry_delay=0.02)
+    attempts = []
+
+    async def broken(attempt):
+        attempts.append(attempt)
+        raise ConnectionError("closed")
+
+    queue.submit("CP1", broken)
+    await asyncio.sleep(0.01)
+    queue.discard("CP1")
+    await asyncio.sleep(0.1)
+    assert attempts == [0]
+    await queue.close()
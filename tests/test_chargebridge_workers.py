@@ -0,0 +1,76 @@
+import asyncio
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "ChargeBridge"))
+
+from workers import Registry, RemoteError, WorkerLink, reuse_port_socket  # noqa: E402
+
+
+def test_registry_newest_connection_wins(tmp_path):
+    path = str(tmp_path / "registry.db")
+    a, b = Registry(path), Registry(path)
+    a.claim("CP1", 0)
+    a.claim("CP2", 0)
+    b.claim("CP1", 1)  # CP1 reconnected to worker 1
+    assert b.owner("CP1") == 1
+    assert a.release("CP1", 0) is False  # the stale socket closing does not remove it
+    assert a.owner("CP1") == 1
+    b.clear(0)
+    assert a.owners() == {"CP1": 1}
+    assert b.release("CP1", 1) is True
+    assert a.owner("CP1") is None
+    a.close()
+    b.close()
+
+
+@pytest.mark.asyncio
+async def test_link_forwards_concurrent_calls(tmp_path):
+    async def start(body):
+        await asyncio.sleep(0.01 * (body["n"] % 3))
+        if body["n"] == 7:
+            return 409, {"detail": "RemoteStart rejected"}
+        return 200, {"n": body["n"], "worker": 1}
+
+    async def broken(body):
+        raise RuntimeError("boom")
+
+    front = WorkerLink(str(tmp_path), 0, {})
+    owner = WorkerLink(str(tmp_path), 1, {"start": start, "broken": broken})
+    await front.start()
+    await owner.start()
+    try:
+        results = await asyncio.gather(
+            *(front.call(1, "start", {"n": n}) for n in range(20)), return_exceptions=True
+        )
+        assert [r["n"] for r in results if isinstance(r, dict)] == [n for n in range(20) if n != 7]
+        assert isinstance(results[7], RemoteError) and results[7].status == 409
+        assert len(front._peers) == 1  # one connection carried all of them
+        with pytest.raises(RemoteError) as err:
+            await front.call(1, "broken")
+        assert err.value.status == 500
+        with pytest.raises(RemoteError) as err:
+            await front.call(1, "nope")
+        assert err.value.status == 404
+        with pytest.raises(RemoteError) as err:
+            await front.call(2, "start", {"n": 1})  # no such worker
+        assert err.value.status == 503
+    finally:
+        await front.close()
+        await owner.close()
+
+
+def test_reuse_port_sockets_share_a_port():
+    first = reuse_port_socket("127.0.0.1", 0)
+    port = first.getsockname()[1]
+    second = reuse_port_socket("127.0.0.1", port)
+    try:
+        assert second.getsockname()[1] == port
+        with socket.create_connection(("127.0.0.1", port), timeout=2):
+            pass
+    finally:
+        first.close()
+        second.close()
@@ -14,8 +14,9 @@ async def test_fault_and_suspend(simulator):
 
     # ensure boot and initial statuses have been processed
     await asyncio.wait_for(csms_cp.boot_notifications.get(), timeout=5)
-    while not csms_cp.status_notifications.empty():
-        csms_cp.status_notifications.get_nowait()
+    # connectors 1, 2 and 0 report Available after the boot
+    for _ in range(3):
+        await asyncio.wait_for(csms_cp.status_notifications.get(), timeout=5)
     async def get_latest_status():
         status = await asyncio.wait_for(csms_cp.status_notifications.get(), timeout=5)
         while not csms_cp.status_notifications.empty():
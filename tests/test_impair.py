@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from sim.impair import Phase, Profile
+
+
+def test_profile_phases_and_loop():
+    profile = Profile(
+        [Phase(duration_sec=10, latency_ms=100), Phase(duration_sec=5, half_open=True)],
+        loop=True,
+    )
+    assert profile.phase_at(3).latency_ms == 100
+    assert profile.phase_at(12).half_open is True
+    # 15 s timeline loops back to the first phase
+    assert profile.phase_at(17).latency_ms == 100
+
+    profile.loop = False
+    assert profile.phase_at(100).half_open is True
+
+
+@pytest.mark.asyncio
+async def test_latency_profile_delays_frames(impaired_simulator):
+    client = impaired_simulator["client"]
+    csms_cp = impaired_simulator["csms"].cp
+    proxy = impaired_simulator["proxy"]
+
+    await asyncio.wait_for(csms_cp.boot_notifications.get(), timeout=5)
+    await asyncio.sleep(0.2)
+    while not csms_cp.status_notifications.empty():
+        csms_cp.status_notifications.get_nowait()
+
+    proxy.profiles["slow"] = Profile([Phase(latency_ms=100)])
+    proxy.set_route("TestCP*", "slow")
+
+    t0 = time.monotonic()
+    resp = await client.post("/plug/1")
+    elapsed = time.monotonic() - t0
+    assert resp.json()["ok"] is True
+    await asyncio.wait_for(csms_cp.status_notifications.get(), timeout=5)
+    # the StatusNotification round-trip crosses the link twice
+    assert elapsed >= 0.2
+    rtt = proxy.summary()["TestCP01"]["rtt_ms"]
+    assert rtt["max"] >= 200
+
+
+@pytest.mark.asyncio
+async def test_dropped_link_reconnects(impaired_simulator):
+    csms = impaired_simulator["csms"]
+    proxy = impaired_simulator["proxy"]
+
+    await asyncio.wait_for(csms.cp.boot_notifications.get(), timeout=5)
+    first = csms.cp
+    csms.connected.clear()
+    assert proxy.drop("TestCP01") == 1
+
+    await asyncio.wait_for(csms.connected.wait(), timeout=5)
+    assert csms.cp is not first
+    await asyncio.wait_for(csms.cp.boot_notifications.get(), timeout=5)
+
+    m = proxy.summary()["TestCP01"]
+    assert m["connections"] == 2
+    assert m["injected_drops"] == 1
+    assert m["reconnect_gap_sec"]["count"] == 1
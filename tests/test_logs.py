@@ -0,0 +1,77 @@
+import io
+import logging
+import threading
+
+import pytest
+
+from sim import logs
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    yield
+    logs.shutdown_logging()
+    logs.configure_sampling()
+    logs.suppressed.clear()
+    root.handlers, level = saved
+    root.setLevel(level)
+
+
+def test_limiter_keeps_one_in_n():
+    limiter = logs.CategoryLimiter(every=4)
+    assert [limiter.allow() for _ in range(8)] == [False, False, False, True] * 2
+
+
+def test_limiter_rate_cap():
+    limiter = logs.CategoryLimiter(rate=5)
+    # a burst only gets the bucket's worth of tokens
+    assert sum(limiter.allow() for _ in range(100)) == 5
+
+
+def test_sampled_events_written_by_background_thread(restore_logging):
+    out = io.StringIO()
+    logs.configure_sampling("MeterValues=10")
+    logs.setup_logging("INFO", stream=out)
+    for i in range(100):
+        logs.event("MeterValues", "MeterValues", cid=1, energy_wh=i)
+    logs.event("StatusNotification", "StatusNotification sent", connector=1, status="Charging")
+    logs.shutdown_logging()
+
+    lines = out.getvalue().splitlines()
+    meter = [line for line in lines if "MeterValues" in line]
+    assert len(meter) == 10
+    assert meter[0].endswith("cid=1 energy_wh=9")
+    assert any("status=Charging" in line for line in lines)
+    assert logs.suppressed["MeterValues"] == 90
+
+
+def test_formatting_deferred_to_writer(restore_logging):
+    class Lazy:
+        formatted_in = None
+
+        def __str__(self):
+            Lazy.formatted_in = threading.current_thread().name
+            return "lazy"
+
+    out = io.StringIO()
+    logs.setup_logging("INFO", stream=out)
+    logging.getLogger("sim.test").info("value=%s", Lazy())
+    logs.shutdown_logging()
+
+    assert "value=lazy" in out.getvalue()
+    assert Lazy.formatted_in != threading.current_thread().name
+
+
+def test_mutable_args_snapshotted_at_call(restore_logging):
+    out = io.StringIO()
+    logs.setup_logging("INFO", stream=out)
+    connectors = [1]
+    logging.getLogger("sim.test").info("connectors=%s", connectors)
+    logs.event("Test", "fields", ids=connectors)
+    connectors.append(2)
+    logs.shutdown_logging()
+
+    assert "connectors=[1]" in out.getvalue()
+    assert "ids=[1]" in out.getvalue()
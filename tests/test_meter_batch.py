@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from sim.meter import MeterSample, SampleBuffer
+
+
+@pytest.fixture
+def sim_env():
+    return {"METER_PERIOD_SEC": "0.1", "METER_BATCH_SAMPLES": "4"}
+
+
+def _sample(wh: int) -> MeterSample:
+    return MeterSample("t", wh, 32.0, 230.0, 7000.0, 50.0, 30.0)
+
+
+def test_sample_buffer_due_and_restore():
+    buf = SampleBuffer(max_samples=3, max_age_sec=5.0, capacity=4)
+    buf.add(_sample(1), now=0.0)
+    assert not buf.due(1.0)
+    # the oldest sample ages out before the count limit is reached
+    assert buf.due(5.0)
+
+    buf.add(_sample(2), now=1.0)
+    batch = buf.drain()
+    assert [s.energy_wh for s in batch] == [1, 2]
+
+    # failed send: the batch goes back ahead of newer samples, bounded
+    buf.add(_sample(3), now=2.0)
+    buf.add(_sample(4), now=2.0)
+    buf.add(_sample(5), now=2.0)
+    buf.restore(batch, first_at=0.0)
+    assert [s.energy_wh for s in buf.samples] == [2, 3, 4, 5]
+    assert buf.dropped == 1
+    assert buf.first_at == 0.0
+
+
+@pytest.mark.asyncio
+async def test_meter_values_batched(simulator):
+    client = simulator["client"]
+    csms = simulator["csms"].cp
+
+    await client.post("/plug/1")
+    await client.post("/local_start/1")
+    await asyncio.wait_for(csms.start_requests.get(), timeout=5)
+
+    mv = await asyncio.wait_for(csms.meter_values.get(), timeout=5)
+    assert mv["connector_id"] == 1
+    assert len(mv["meter_value"]) == 4
+    await asyncio.sleep(0.1)
+
+    stats = (await client.get("/stats")).json()
+    assert stats["meter"]["frames"] >= 1
+    assert stats["meter"]["samples"] == 4 * stats["meter"]["frames"]
+
+
+@pytest.mark.asyncio
+async def test_no_samples_leak_into_next_session(simulator):
+    client = simulator["client"]
+    csms = simulator["csms"].cp
+
+    await client.post("/plug/1")
+    await client.post("/local_start/1")
+    await asyncio.wait_for(csms.start_requests.get(), timeout=5)
+    await asyncio.wait_for(csms.meter_values.get(), timeout=5)
+    await client.post("/local_stop/1")
+    await asyncio.wait_for(csms.stop_requests.get(), timeout=5)
+    # let Finishing -> Available play out, then forget the first session
+    await asyncio.sleep(0.2)
+    while not csms.meter_values.empty():
+        csms.meter_values.get_nowait()
+
+    started = datetime.now(timezone.utc)
+    await client.post("/local_start/1")
+    await asyncio.wait_for(csms.start_requests.get(), timeout=5)
+    mv = await asyncio.wait_for(csms.meter_values.get(), timeout=5)
+    stamps = [datetime.fromisoformat(m["timestamp"]) for m in mv["meter_value"]]
+    assert min(stamps) >= started
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_boot_notification_201(simulator_201):
+    csms_cp = simulator_201["csms"].cp
+    station = await asyncio.wait_for(csms_cp.boot_notifications.get(), timeout=5)
+    assert station["model"] == "F3-EU180-CC"
+    assert station["vendor_name"] == "Gresgying"
+
+
+@pytest.mark.asyncio
+async def test_remote_start_batched_updates_and_stop_201(simulator_201):
+    client = simulator_201["client"]
+    csms_cp = simulator_201["csms"].cp
+    evse = simulator_201["evse"]
+
+    resp = await client.post("/plug/1")
+    assert resp.json()["ok"] is True
+
+    res = await csms_cp.request_start(id_token="REMOTETAG", evse_id=1, remote_start_id=7)
+    assert res.status == "Accepted"
+    started = await asyncio.wait_for(csms_cp.transaction_events.get(), timeout=5)
+    assert started["event_type"] == "Started"
+    assert started["seq_no"] == 0
+    assert started["transaction_info"]["remote_start_id"] == 7
+    tx_id = started["transaction_info"]["transaction_id"]
+    assert evse.model.get_by_tx(tx_id).id == 1
+
+    # METER_BATCH_SAMPLES=3: each Updated event carries three samples
+    updated = await asyncio.wait_for(csms_cp.transaction_events.get(), timeout=5)
+    assert updated["event_type"] == "Updated"
+    assert updated["seq_no"] == 1
+    assert len(updated["meter_value"]) == 3
+
+    res = await csms_cp.request_stop(transaction_id=tx_id)
+    assert res.status == "Accepted"
+    while True:
+        ev = await asyncio.wait_for(csms_cp.transaction_events.get(), timeout=5)
+        if ev["event_type"] == "Ended":
+            break
+    assert ev["transaction_info"]["stopped_reason"] == "Remote"
+    await asyncio.sleep(0.1)
+    assert evse.model.get_by_tx(tx_id) is None
+
+    stats = (await client.get("/stats")).json()
+    assert stats["ocpp_version"] == "2.0.1"
+    assert stats["calls"]["TransactionEvent"] >= 3
+    assert "MeterValues" not in stats["calls"]
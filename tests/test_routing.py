@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+
+from sim import routing
+from sim.state_machine import EVSEModel
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    async def recv(self):
+        await asyncio.Future()
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+def _cp(conn=None):
+    # imported here: sim.ocpp_handlers pulls in sim.config, which must not be
+    # frozen at collection time before the simulator fixtures set CSMS_URL
+    from sim.ocpp_handlers import EVSEChargePoint
+
+    assert routing.install()
+    return EVSEChargePoint("CP1", conn or RecordingConnection(), EVSEModel(2), _noop, _noop, _noop)
+
+
+def test_cached_routes_match_library():
+    cp = _cp()
+    assert isinstance(cp.route_map, routing.BoundRoutes)
+    expected = routing._create_route_map(cp)
+    assert set(cp.route_map) == set(expected)
+    for action, handlers in expected.items():
+        assert cp.route_map[action] == handlers
+    # one table per class, shared by every instance
+    assert _cp().route_map._table is cp.route_map._table
+
+
+@pytest.mark.asyncio
+async def test_cached_routes_dispatch():
+    conn = RecordingConnection()
+    cp = _cp(conn)
+    await cp.route_message(json.dumps([2, "42", "DataTransfer", {"vendorId": "x"}]))
+    assert conn.sent[0][:2] == [3, "42"]
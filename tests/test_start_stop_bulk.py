@@ -0,0 +1,90 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import start_stop
+
+
+class _API(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body in one segment; unbuffered writes hit Nagle plus
+    # delayed ACK on every keep-alive response
+    wbufsize = -1
+    connections = 0
+    calls: list = []
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.calls.append((self.path, body))
+        if body["cpid"] == "GATEWAY":
+            status = 504  # as a proxy that timed out on the CSMS
+        elif self.path == "/api/v1/stop" and body["connectorId"] == 2:
+            status = 404
+        else:
+            status = 200
+        data = json.dumps({"ok": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    _API.connections = 0
+    _API.calls = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _API)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(start_stop, "API_BASE", f"http://127.0.0.1:{server.server_port}")
+    yield _API
+    server.shutdown()
+    server.server_close()
+
+
+def test_read_ops_csv_and_jsonl(tmp_path):
+    csv_file = tmp_path / "ops.csv"
+    csv_file.write_text("op,cpid,connectorId,idTag\nstart,CP1,1,TAG\nstop,CP1,1,\n")
+    jsonl_file = tmp_path / "ops.jsonl"
+    jsonl_file.write_text('{"op": "start", "cpid": "CP2", "connectorId": 2}\n{"op": "release", "cpid": "CP2", "connectorId": 2}\n')
+    assert [(o.op, o.cpid, o.connector_id, o.id_tag) for o in start_stop.read_ops(str(csv_file))] == [
+        ("start", "CP1", 1, "TAG"), ("stop", "CP1", 1, None),
+    ]
+    ops = start_stop.read_ops(str(jsonl_file))
+    assert [o.id_tag for o in ops] == [start_stop.DEFAULT_IDTAG, None]
+
+
+def test_bulk_reuses_connections_and_falls_back_to_release(api):
+    ops = [
+        start_stop.BulkOp(op, f"CP{i}", connector, "TAG" if op == "start" else None)
+        for i in range(50)
+        for op, connector in (("start", 1), ("stop", 1), ("stop", 2))
+    ]
+    results = start_stop.run_bulk(ops, workers=4)
+
+    assert all(r.ok for r in results)
+    assert api.connections <= 4
+    released = [r for r in results if r.released]
+    assert len(released) == 50 and {r.op.connector_id for r in released} == {2}
+    assert sum(path == "/api/v1/release" for path, _ in api.calls) == 50
+
+    summary = start_stop.summarize(results, 1.0)
+    assert summary["ops"]["start"]["ok"] == 50
+    assert summary["ops"]["stop"] == {**summary["ops"]["stop"], "count": 100, "released": 50, "failed": 0}
+
+
+def test_bulk_does_not_resend_after_gateway_error(api):
+    # the CSMS may have started the transaction before the proxy gave up
+    results = start_stop.run_bulk([start_stop.BulkOp("start", "GATEWAY", 1, "TAG")], workers=1, retries=3)
+
+    assert not results[0].ok
+    assert api.calls == [("/api/v1/start", {"cpid": "GATEWAY", "connectorId": 1, "idTag": "TAG"})]
@@ -2,7 +2,7 @@ import pytest
 import httpx
 from ocpp.v16.enums import RemoteStartStopStatus
 
-from central import app, connected_cps
+from central import CentralSystem, app, connected_cps, find_tx, index_tx, unindex_tx
 
 
 class DummyCP:
@@ -28,4 +28,43 @@ async def test_stop_invalid_transaction_id():
         )
     assert resp.status_code == 404
     assert cp.recorded == []
-    connected_cps.pop("CP1", None)
\ No newline at end of file
+    connected_cps.pop("CP1", None)
+
+
+@pytest.mark.asyncio
+async def test_stop_by_transaction_id_alone():
+    cp = DummyCP()
+    connected_cps["CP1"] = cp
+    index_tx("CP1", 1, cp.active_tx[1])
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/api/v1/stop", json={"transactionId": 100})
+            wrong_cp = await client.post("/api/v1/stop", json={"cpid": "CP2", "transactionId": 100})
+            missing = await client.post("/api/v1/stop", json={})
+        assert resp.status_code == 200
+        assert resp.json()["cpid"] == "CP1"
+        assert cp.recorded == [100]
+        assert wrong_cp.status_code == 404
+        assert missing.status_code == 422
+    finally:
+        unindex_tx(100)
+        connected_cps.pop("CP1", None)
+
+
+@pytest.mark.asyncio
+async def test_tx_index_follows_start_stop_and_disconnect():
+    cs = CentralSystem("CP7", None)
+    try:
+        start = await cs.on_start_transaction(1, "TAG", 0, "2024-01-01T00:00:00Z")
+        second = await cs.on_start_transaction(2, "TAG", 0, "2024-01-01T00:00:00Z")
+        tx, tx2 = start.transaction_id, second.transaction_id
+        assert find_tx(tx) == {"cpid": "CP7", "connector_id": 1, "session": cs.active_tx[1]}
+        assert find_tx(tx, "OTHER") is None
+
+        await cs.on_stop_transaction(tx, 10, "2024-01-01T01:00:00Z")
+        assert find_tx(tx) is None and 1 not in cs.active_tx
+        assert find_tx(tx2)["connector_id"] == 2
+    finally:
+        cs.drop_transactions()
+    assert find_tx(tx2) is None
@@ -0,0 +1,118 @@
+import asyncio
+import math
+
+import pytest
+
+from sim.traffic import (
+    ARRIVE,
+    DEPART,
+    STOP,
+    Lognormal,
+    TrafficGenerator,
+    TrafficProfile,
+    TrafficSchedule,
+    concurrency_by_hour,
+)
+
+
+def _flat(**kwargs) -> TrafficProfile:
+    return TrafficProfile(hourly=[1.0] * 24, **kwargs)
+
+
+def test_schedule_is_seeded_and_ordered():
+    def run(seed):
+        schedule = TrafficSchedule(_flat(), range(1, 51), 7000, seed=seed)
+        return [schedule.pop()[:3] for _ in range(500)]
+
+    events = run(7)
+    assert events == run(7)
+    assert events != run(8)
+    times = [t for t, _, _ in events]
+    assert times == sorted(times)
+    assert {kind for _, kind, _ in events} == {ARRIVE, STOP, DEPART}
+
+
+def test_fleet_concurrency_follows_littles_law():
+    # 0.5 arrivals/connector/h x 1 h dwell: about half the fleet busy
+    profile = _flat(arrivals_per_connector_hour=0.5, dwell_min=Lognormal(60, 0.3))
+    schedule = TrafficSchedule(profile, range(1, 2001), 7000, seed=1)
+    rows = concurrency_by_hour(schedule, 12)
+    steady = [row["mean_active"] for row in rows[3:]]
+    assert 900 < sum(steady) / len(steady) < 1100
+    assert schedule.peak_active <= 2000
+
+
+def test_full_site_balks_and_respects_available():
+    profile = _flat(arrivals_per_connector_hour=20, dwell_min=Lognormal(600, 0.1))
+    schedule = TrafficSchedule(profile, [1, 2, 3], 7000, seed=3, available=lambda cid: cid != 2)
+    used = set()
+    for _ in range(200):
+        _, kind, cid, _ = schedule.pop()
+        if kind == ARRIVE:
+            used.add(cid)
+    assert used == {1, 3}
+    assert schedule.balked > 0
+    assert schedule.active <= 2
+
+
+@pytest.mark.asyncio
+async def test_zero_rate_profile_ends_instead_of_spinning():
+    for profile in (_flat(arrivals_per_connector_hour=0), TrafficProfile(hourly=[0.0] * 24)):
+        schedule = TrafficSchedule(profile, [1], 7000)
+        assert schedule.peek_time() == math.inf
+        assert [row["peak_active"] for row in concurrency_by_hour(schedule, 3)] == [0, 0, 0]
+        with pytest.raises(IndexError):
+            schedule.pop()
+
+    async def never(cid, info):
+        raise AssertionError("no event expected")
+
+    gen = TrafficGenerator(TrafficSchedule(_flat(arrivals_per_connector_hour=0), [1], 7000), never, never, never)
+    await asyncio.wait_for(gen.run(), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_generator_drives_sessions(simulator):
+    csms = simulator["csms"].cp
+    evse = simulator["evse"]
+    await asyncio.wait_for(csms.boot_notifications.get(), timeout=5)
+
+    # one simulated hour per second, short sessions
+    profile = _flat(arrivals_per_connector_hour=30, dwell_min=Lognormal(1, 0.1))
+    gen = evse.make_traffic(profile, seed=5, speed=3600)
+    task = asyncio.create_task(gen.run())
+    try:
+        start = await asyncio.wait_for(csms.start_requests.get(), timeout=5)
+        assert start["id_tag"] == f"EV-{start['connector_id']}"
+        await asyncio.wait_for(csms.stop_requests.get(), timeout=5)
+    finally:
+        task.cancel()
+    assert gen.stats()["sessions"] >= 1
+    assert gen.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_generator_orders_events_per_connector():
+    # dwell far shorter than charge time: STOP and DEPART are due together
+    profile = _flat(arrivals_per_connector_hour=30, dwell_min=Lognormal(1, 0.1), energy_kwh=Lognormal(50, 0.1))
+    log = []
+
+    def record(kind, delay):
+        async def cb(cid, info):
+            await asyncio.sleep(delay)
+            log.append((cid, kind))
+        return cb
+
+    gen = TrafficGenerator(
+        TrafficSchedule(profile, [1, 2], 7000, seed=2),
+        record(ARRIVE, 0.01), record(STOP, 0.05), record(DEPART, 0), speed=3600,
+    )
+    task = asyncio.create_task(gen.run())
+    await asyncio.sleep(1)
+    task.cancel()
+    for cid in (1, 2):
+        kinds = [kind for c, kind in log if c == cid]
+        assert len(kinds) >= 3
+        # arrive, stop, depart, arrive, ... never reordered
+        for i, kind in enumerate(kinds):
+            assert kind == (ARRIVE, STOP, DEPART)[i % 3]
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+from ocpp.v16 import call
+from websockets.exceptions import ConnectionClosedOK
+
+from conftest import MockCSMS
+from sim.ocpp_handlers import EVSEChargePoint
+from sim.state_machine import EVSEModel
+from sim.transport import MemoryServer, memory_pair
+
+
+@pytest.mark.asyncio
+async def test_pair_delivers_in_order_and_closes_both_ends():
+    a, b = memory_pair("/ocpp/CP1", "ocpp1.6")
+    for i in range(3):
+        await a.send(str(i))
+    assert [await b.recv() for _ in range(3)] == ["0", "1", "2"]
+    pending = asyncio.create_task(a.recv())
+    await asyncio.sleep(0)
+    await b.close()
+    with pytest.raises(ConnectionClosedOK):
+        await pending
+    with pytest.raises(ConnectionClosedOK):
+        await b.send("late")
+    assert [m async for m in a] == []
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_thousand_charge_points_boot_in_one_process():
+    csms_cps = {}
+    booted = asyncio.Queue()
+
+    async def on_connect(ws, path):
+        cpid = path.rsplit("/", 1)[-1]
+        csms_cps[cpid] = MockCSMS(cpid, ws)
+        csms_cps[cpid].boot_notifications = booted
+        await csms_cps[cpid].start()
+
+    server = MemoryServer(on_connect)
+    count = 1000
+
+    async def charge_point(i):
+        async with server.connect(f"{server.url}/CP{i:04d}", subprotocols=["ocpp1.6"]) as ws:
+            cp = EVSEChargePoint(f"CP{i:04d}", ws, EVSEModel(2), _noop, _noop, _noop)
+            reader = asyncio.create_task(cp.start())
+            await cp.call(call.BootNotificationPayload(charge_point_model="M", charge_point_vendor="V"))
+            reader.cancel()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(charge_point(i) for i in range(count)))
+    elapsed = time.perf_counter() - t0
+    await server.close()
+
+    assert booted.qsize() == count
+    assert server.connections == len(csms_cps) == count
+    assert elapsed < 10